@@ -3,13 +3,15 @@ gui for interaction with the database
 based on pyqt6
 """
 import sqlite3
-import time
 
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QIcon, QPixmap, QMovie
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QLabel, QVBoxLayout, QHBoxLayout,
                              QComboBox, \
-                             QCheckBox)
+                             QCheckBox, QTableView, QMessageBox, QLineEdit)
+
+from archive_repository import ArchiveRepository
+from spec_table import SpecTableModel
 
 # Adjustable Variables
 title = "GraphicArchive"  # changes window title
@@ -20,6 +22,7 @@ w_width = 800  # sets window width
 w_height = 600  # sets window height
 icon = "graphicArchive_logo.ico"  # changes app icon
 loading_gif = "loading.gif"  # loading animation
+db_file = "CamerAarchive.db"  # archive database, opened read-only
 
 
 class LoadingScreen(QWidget):
@@ -67,18 +70,33 @@ class LoadingScreen(QWidget):
 
 
 class WorkerThread(QThread):
+    """
+    Loads the catalog of brands, classes and models in the background while the loading screen is shown.
+
+    Attributes:
+        catalog (Catalog): The loaded catalog, None until loading finished or if it failed.
+        error (Exception): Why loading failed, None otherwise.
+    """
     progress_signal = pyqtSignal(int)
 
-    def __init__(self):
+    def __init__(self, repository):
         super().__init__()
+        self.repository = repository
+        self.catalog = None
+        self.error = None
 
     def run(self):
-        time.sleep(3)  # Simulate work being done (e.g., loading a database)
+        try:
+            self.catalog = self.repository.catalog()
+        except (sqlite3.Error, OSError, ValueError) as e:
+            # OSError / ValueError: the catalog snapshot couldn't be read
+            print(f"Loading the catalog failed: {e}")
+            self.error = e
         self.progress_signal.emit(100)
 
 
 class App(QMainWindow):
-    def __init__(self):
+    def __init__(self, repository=None, catalog=None):
         super().__init__()
         self.setWindowTitle(title)
         self.setGeometry(left, top, w_width, w_height)
@@ -96,7 +114,7 @@ class App(QMainWindow):
         # Set default selection
         self.both_selection.setChecked(True)
 
-        self.db_interaction = DB_Interaction(self)
+        self.db_interaction = DB_Interaction(self, repository, catalog)
 
         self.brands = self.db_interaction.get_brands()
 
@@ -159,6 +177,16 @@ class App(QMainWindow):
         # Set default selection
         self.both_selection.setChecked(True)
 
+        search_label = QLabel("Suche")
+        input_layout.addWidget(search_label)
+
+        # ranked full-text search over model names and all specs, fills the product list
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("z.B. IBIS 4K 60p")
+        self.search_input.returnPressed.connect(self.on_search)
+        input_layout.addWidget(self.search_input)
+        self.search_kinds = {}
+
         brand_label = QLabel("Marke")
         input_layout.addWidget(brand_label)
 
@@ -185,12 +213,21 @@ class App(QMainWindow):
         input_layout.addWidget(product_input_label)
         self.product_input = QComboBox()
         self.on_brand_selected()
+        self.product_input.currentIndexChanged.connect(self.on_product_selected)
         input_layout.addWidget(self.product_input)
 
         in_out_layout.addLayout(input_layout)
 
         output_layout = QVBoxLayout()
 
+        # specs of the selected product, streamed into the table as it scrolls
+        self.spec_model = SpecTableModel(self.db_interaction.repository, self)
+        self.spec_view = QTableView()
+        self.spec_view.setModel(self.spec_model)
+        self.spec_view.verticalHeader().hide()
+        self.spec_view.horizontalHeader().setStretchLastSection(True)
+        output_layout.addWidget(self.spec_view)
+
         in_out_layout.addLayout(output_layout)
 
         main_layout.addLayout(in_out_layout)
@@ -251,63 +288,59 @@ class App(QMainWindow):
         selected_brand = self.brand_input.currentText()
         available_products = self.db_interaction.get_products(selected_category, self.selected_brand)
         print(available_products)
+        self.search_kinds = {}
         self.product_input.clear()
         self.product_input.addItems(available_products)
 
+    def on_search(self):
+        results = self.db_interaction.search_products(self.search_input.text())
+        if results:
+            # search results may mix cameras and lenses
+            self.search_kinds = {model: kind for kind, brand, model in results}
+            self.product_input.clear()
+            self.product_input.addItems(list(self.search_kinds))
+
+    def on_product_selected(self):
+        selected_product = self.product_input.currentText()
+        if selected_product:
+            kind = self.search_kinds.get(selected_product, 'lens' if self.lens_cam == 2 else 'camera')
+            self.spec_model.show_products(kind, [selected_product])
+        else:
+            self.spec_model.clear()
+
 
 class DB_Interaction:
-    def __init__(self, app=None):
-        self.setup_db_connection()
+    def __init__(self, app=None, repository=None, catalog=None):
+        self.setup_db_connection(repository)
+        # selection lists come from the preloaded catalog, without one they stay empty
+        self.catalog = catalog
         self.app = app
 
-    def setup_db_connection(self):
-        self.conn = sqlite3.connect("CamerAarchive.db")
-        self.c = self.conn.cursor()
+    def setup_db_connection(self, repository=None):
+        # pooled read-only WAL readers, a running scrape doesn't lock them out
+        self.repository = repository if repository is not None else ArchiveRepository(db_file)
 
     def close_db_connection(self):
-        self.conn.close()
-
-    def query_db(self, query):
-        self.c.execute(query)
-
-    def query_db_with_argument(self, query, variable):
-        self.c.execute(query, (variable,))
-
-    def query_db_with_two_arguments(self, query, variable1, variable2):
-        self.c.execute(query, (variable1, variable2))
+        self.repository.close()
 
     def get_brands(self):
+        if self.catalog is None:
+            return []
         if self.app.lens_cam == 1:
-            unique_brands = self.get_brands_per_mode(
-                "SELECT DISTINCT brand FROM camerAarchive"
-            )
+            unique_brands = self.catalog.brands('camera')
         elif self.app.lens_cam == 2:
-            unique_brands = self.get_brands_per_mode(
-                "SELECT DISTINCT brand FROM lensAarchive"
-            )
+            unique_brands = self.catalog.brands('lens')
         elif self.app.lens_cam == 3:
-            self.query_db("SELECT DISTINCT brand FROM camerAarchive")
-            cam_brands = {brand[0] for brand in self.c.fetchall()}
-            self.query_db("SELECT DISTINCT brand FROM lensAarchive")
-            lens_brands = {brand[0] for brand in self.c.fetchall()}
-            unique_brands = cam_brands.union(lens_brands)
+            unique_brands = self.catalog.brands()
 
-        return list(unique_brands)
-
-    def get_brands_per_mode(self, arg0):
-        self.query_db(arg0)
-        return {brand[0] for brand in self.c.fetchall()}
+        return unique_brands
 
     def get_categories(self, brand):
         cam_classes = []
-        if self.app.lens_cam == 1:
-            self.query_db_with_argument("SELECT DISTINCT Kameraklassen FROM camerAarchive WHERE brand = ?", brand)
-            cam_classes = {cam_class[0] for cam_class in self.c.fetchall()}
-        # self.query_db_with_argument("SELECT DISTINCT Kameraklassen FROM lensAarchive WHERE brand = ?", brand)
-        # lens_classes = {lens_class[0] for lens_class in self.c.fetchall()}
+        if self.catalog is not None and self.app.lens_cam == 1:
+            cam_classes = self.catalog.classes(brand)
 
-        unique_classes = cam_classes if cam_classes is not None else []
-        return list(unique_classes)
+        return cam_classes
 
     def get_products_cam(self, cam_class, brand):
         brand = str(brand) if brand is not None else ''
@@ -316,29 +349,32 @@ class DB_Interaction:
               f"\nBrand: {brand}"
               f"\nCam_Class: {cam_class}")
 
-        self.query_db_with_two_arguments("SELECT model FROM camerAarchive WHERE brand = ? AND Kameraklassen = ?", brand,
-                                         cam_class)
-        products = self.c.fetchall()
-        print(f"SQL Used: "
-              f"\nSELECT model FROM camerAarchive WHERE brand = {brand} AND Kameraklassen = {cam_class}")
+        products = self.catalog.products('camera', brand, cam_class) if self.catalog is not None else []
         print(f"\nReturned products:"
-              f"\n{list(products)}")
+              f"\n{products}")
 
-        return [product[0] for product in products]
+        return products
+
+    def get_product_specs(self, kind, model):
+        return self.repository.product_specs(kind, model)
+
+    def search_products(self, text):
+        kind = {1: 'camera', 2: 'lens'}.get(self.app.lens_cam) if self.app else None
+        results = self.repository.search(text, kind)
+        print(f"\nSearch results for '{text}':"
+              f"\n{results}")
+
+        return results
 
     def get_products_lens(self, lens_class, brand):
         lens_class = str(lens_class) if lens_class is not None else ''
         brand = str(brand) if brand is not None else ''
 
-        self.query_db_with_two_arguments("SELECT model FROM lensAarchive WHERE brand = ? AND Lensklassen = ?", brand,
-                                         lens_class)
-        lens_products = self.c.fetchall()
-        print(f"SQL Used: "
-              f"\nSELECT model FROM lensAarchive WHERE brand = {brand} AND Lensklassen = {lens_class}")
+        lens_products = self.repository.products('lens', brand, lens_class)
         print(f"\nReturned products:"
-              f"\n{list(lens_products)}")
+              f"\n{lens_products}")
 
-        return [product[0] for product in lens_products]
+        return lens_products
 
 
 if __name__ == "__main__":
@@ -350,19 +386,28 @@ if __name__ == "__main__":
     loading_screen.setGeometry(500, 300, 300, 200)
     loading_screen.show()
 
-    # Create a worker thread to simulate loading
-    worker = WorkerThread()
+    # Create a worker thread loading the catalog
+    repository = ArchiveRepository(db_file)
+    worker = WorkerThread(repository)
 
     # Connect worker thread to loading screen
     worker.progress_signal.connect(lambda value: None)  # Update this if needed
     worker.finished.connect(loading_screen.close_loading_screen)
 
-    # Once loading is complete, show the main application window
-    loading_screen.loading_complete.connect(lambda: ex.show())
+    def show_app():
+        # Once loading is complete, build the main application window from the catalog and show it
+        global ex
+        if worker.catalog is None:
+            # the database would fail the same way on the gui thread
+            QMessageBox.critical(None, title, f"Das Archiv {db_file} konnte nicht geladen werden:\n{worker.error}")
+            app.quit()
+            return
+        ex = App(repository, worker.catalog)
+        ex.setMinimumSize(400, 300)  # Set a minimum size for the window
+        ex.show()
 
-    worker.start()
+    loading_screen.loading_complete.connect(show_app)
 
-    ex = App()
-    ex.setMinimumSize(400, 300)  # Set a minimum size for the window
+    worker.start()
 
     app.exec()
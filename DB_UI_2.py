@@ -3,15 +3,19 @@ gui for interaction with the database
 based on pyqt6
 """
 import sqlite3
-import time
 
-from PyQt6.QtCore import Qt, QThread, pyqtSignal
+from PyQt6.QtCore import Qt, QThread, pyqtSignal, QStringListModel, QTimer
 from PyQt6.QtGui import QIcon, QPixmap, QMovie
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QLabel, QVBoxLayout, QHBoxLayout,
                              QComboBox,
-                             QGridLayout)
+                             QGridLayout, QLineEdit, QTableView, QCompleter)
 from PyQt6_SwitchControl import SwitchControl
 
+from archive_repository import ArchiveRepository
+from name_index import NameIndex, display_name
+from query_executor import QueryExecutor
+from spec_table import SpecTableModel
+
 # Adjustable Variables
 title = "GraphicArchive"  # changes window title
 image = "graphicArchive_logo.png"  # changes banner image
@@ -21,6 +25,8 @@ w_width = 800  # sets window width
 w_height = 600  # sets window height
 icon = "graphicArchive_logo.ico"  # changes app icon
 loading_gif = "loading.gif"  # loading animation
+db_file = "CamerAarchive.db"  # archive database, opened read-only
+catalog_check_interval = 10  # seconds between checks whether a running scrape changed the catalog
 
 
 class LoadingScreen(QWidget):
@@ -71,18 +77,38 @@ class LoadingScreen(QWidget):
 
 
 class WorkerThread(QThread):
+    """
+    Loads the catalog of brands, classes and models in the background while the loading screen is shown, and
+    builds the type-ahead index of the model names from it.
+
+    Attributes:
+        catalog (Catalog): The loaded catalog, None until loading finished or if it failed.
+        name_index (NameIndex): The type-ahead index, None until loading finished or if it failed.
+        error (Exception): Why loading failed, None otherwise.
+    """
     progress_signal = pyqtSignal(int)
 
-    def __init__(self):
+    def __init__(self, repository):
         super().__init__()
+        self.repository = repository
+        self.catalog = None
+        self.name_index = None
+        self.error = None
 
     def run(self):
-        time.sleep(3)  # Simulate work being done (e.g., loading a database)
+        try:
+            self.catalog = self.repository.catalog()
+            self.name_index = NameIndex(self.catalog.entries())
+        except (sqlite3.Error, OSError, ValueError) as e:
+            # OSError / ValueError: the catalog snapshot couldn't be read
+            print(f"Loading the catalog failed: {e}")
+            self.catalog = None
+            self.error = e
         self.progress_signal.emit(100)
 
 
 class App(QMainWindow):
-    def __init__(self):
+    def __init__(self, repository=None, catalog=None, name_index=None, error=None):
         super().__init__()
         self.setWindowTitle(title)
         self.setGeometry(left, top, w_width, w_height)
@@ -110,7 +136,28 @@ class App(QMainWindow):
         }
         self.toggle_state = False
 
+        # long-lived read-only connections shared by all handlers
+        self.repository = repository if repository is not None else ArchiveRepository(db_file)
+        # selection lists come from the preloaded catalog, without one they stay empty until 'check_catalog'
+        # manages to load it
+        self.catalog = catalog
+        # lookups run off the gui thread, results of superseded selections are dropped
+        self.executor = QueryExecutor(self.repository, self)
+        # specs of the selected product, streamed into the table as it scrolls
+        self.spec_model = SpecTableModel(self.repository, self)
+
+        # type-ahead suggestions of the search box
+        self.name_index = name_index if name_index is not None else NameIndex()
+        self.suggestions = {}
+        self.suggestion_model = QStringListModel(self)
+        # follow a running scrape, the index only gets the products that changed
+        self.catalog_timer = QTimer(self)
+        self.catalog_timer.timeout.connect(self.check_catalog)
+        self.catalog_timer.start(catalog_check_interval * 1000)
+
         self.initUI()
+        if self.catalog is None:
+            self.statusBar().showMessage(f"Archiv nicht verfügbar: {error}" if error else "Archiv wird geladen")
 
     def initUI(self):
         central_widget = QWidget()
@@ -221,16 +268,25 @@ class App(QMainWindow):
         self.setWindowTitle("GraphicArchive - CamerArchive")
         camera_mode_layout = QVBoxLayout()
 
+        search_input_label = QLabel("Suche")
+        camera_mode_layout.addWidget(search_input_label)
+
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("z.B. IBIS 4K 60p")
+        self.search_input.returnPressed.connect(self.on_cam_search)
+        # suggests cameras and lenses while typing, Enter without a suggestion searches all specs
+        self.search_completer = QCompleter(self.suggestion_model, self)
+        self.search_completer.setCompletionMode(QCompleter.CompletionMode.UnfilteredPopupCompletion)
+        self.search_completer.activated.connect(self.on_suggestion_activated)
+        self.search_input.setCompleter(self.search_completer)
+        self.search_input.textEdited.connect(self.on_search_edited)
+        camera_mode_layout.addWidget(self.search_input)
+
         brand_input_label = QLabel("Marke")
         camera_mode_layout.addWidget(brand_input_label)
 
         # get brands from db
-        conn = sqlite3.connect("CamerAarchive.db")
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT DISTINCT brand FROM camerAarchive")
-        brands = [brand[0] for brand in cursor.fetchall()]
-        conn.close()
+        brands = self.catalog.brands('camera') if self.catalog is not None else []
 
         self.brand_input = QComboBox()
         self.brand_input.clear()
@@ -252,6 +308,12 @@ class App(QMainWindow):
         self.product_input.currentIndexChanged.connect(self.on_cam_product_changed)
         camera_mode_layout.addWidget(self.product_input)
 
+        self.spec_view = QTableView()
+        self.spec_view.setModel(self.spec_model)
+        self.spec_view.verticalHeader().hide()
+        self.spec_view.horizontalHeader().setStretchLastSection(True)
+        camera_mode_layout.addWidget(self.spec_view)
+
         self.on_cam_brand_changed()
         self.on_cam_category_changed()
 
@@ -265,47 +327,96 @@ class App(QMainWindow):
     def on_cam_brand_changed(self):
         self.selected_brand = self.brand_input.currentText()
         print(self.selected_brand)
+        if self.catalog is None:
+            return
 
-        conn = sqlite3.connect("CamerAarchive.db")
-        cursor = conn.cursor()
+        # a search still running would replace the products of the new brand
+        self.executor.cancel('products')
+        # Retrieve all categories for the selected brand from the in-memory catalog, no database query needed
+        self.show_cam_categories(self.catalog.classes(self.selected_brand))
 
-        # Retrieve all categories for the selected brand
-        cursor.execute("SELECT DISTINCT Kameraklassen FROM camerAarchive WHERE brand = ?",
-                       (self.selected_brand,))
-        raw_categories = cursor.fetchall()
-
-        # Split categories by comma and filter them
-        individual_categories = set()
-        for entry in raw_categories:
-            categories = entry[0].split(",")  # Split by comma
-            for category in categories:
-                individual_categories.add(
-                    category.strip())  # Add each category, stripped of extra spaces
-
-        print(individual_categories)
+    def show_cam_categories(self, categories):
+        print(categories)
 
         self.category_input.clear()
-        self.category_input.addItems(sorted(individual_categories))  # Sort for readability
-        conn.close()
+        self.category_input.addItems(categories)
 
     def on_cam_category_changed(self):
+        if self.catalog is None:
+            return
         selected_category = self.category_input.currentText()
 
-        conn = sqlite3.connect("CamerAarchive.db")
-        cursor = conn.cursor()
-
-        cursor.execute("SELECT model FROM camerAarchive WHERE brand = ? AND Kameraklassen LIKE ?",
-                       (self.selected_brand,
-                        selected_category))
-        products = {product[0] for product in cursor.fetchall()}
-
-        conn.close()
+        self.executor.cancel('products')
+        self.show_cam_products(self.catalog.products('camera', self.selected_brand, selected_category))
 
+    def show_cam_products(self, products):
         self.product_input.clear()
         self.product_input.addItems(products)
 
+    def on_cam_search(self):
+        # ranked full-text search over model names and all specs, replaces the product list like a category does
+        self.executor.submit('products', self.repository.search, (self.search_input.text(), 'camera'),
+                             self.show_cam_search_results)
+
+    def show_cam_search_results(self, results):
+        if results:
+            self.show_cam_products([model for kind, brand, model in results])
+
+    def on_search_edited(self, text):
+        self.suggestions = {display_name(brand, model): (kind, brand, model)
+                            for kind, brand, model in self.name_index.search(text)}
+        self.suggestion_model.setStringList(list(self.suggestions))
+        if self.suggestions:
+            self.search_completer.complete()
+
+    def on_suggestion_activated(self, text):
+        if (suggestion := self.suggestions.get(text)) is not None:
+            kind, brand, model = suggestion
+            self.spec_model.show_products(kind, [model])
+
+    def check_catalog(self):
+        # the only lookups left for the executor: the catalog itself, full-text search and the spec table
+        if self.catalog is None:
+            # loading the catalog failed at startup, retry it along with the index
+            self.executor.submit('catalog', self.load_catalog, (), self.on_catalog_loaded)
+        else:
+            self.executor.submit('catalog', self.load_catalog_changes, (self.catalog,), self.on_catalog_changed)
+
+    def load_catalog(self):
+        catalog = self.repository.catalog()
+        return catalog, NameIndex(catalog.entries())
+
+    def on_catalog_loaded(self, loaded):
+        self.catalog, self.name_index = loaded
+        print("Catalog loaded")
+        self.statusBar().clearMessage()
+        if not self.toggle_state:
+            self.brand_input.addItems(self.catalog.brands('camera'))
+
+    def load_catalog_changes(self, catalog):
+        # runs on the executor, only the few changed products are left for the gui thread
+        if (changed_catalog := self.repository.changed_catalog(catalog.version)) is None:
+            return None
+        old_entries, new_entries = set(catalog.entries()), set(changed_catalog.entries())
+        return changed_catalog, old_entries - new_entries, new_entries - old_entries
+
+    def on_catalog_changed(self, changes):
+        if changes is None:
+            return
+        self.catalog, removed, added = changes
+        for kind, brand, model in removed:
+            self.name_index.remove(kind, model)
+        for kind, brand, model in added:
+            self.name_index.add(kind, brand, model)
+        print(f"Catalog updated: {len(added)} products added, {len(removed)} removed")
+
     def on_cam_product_changed(self):
-        return
+        selected_product = self.product_input.currentText()
+
+        if selected_product:
+            self.spec_model.show_products('camera', [selected_product])
+        else:
+            self.spec_model.clear()
 
     def update_pixmap(self):
         # Limit the width of the pixmap to a quarter of the full screen width
@@ -330,19 +441,23 @@ if __name__ == "__main__":
     loading_screen.setGeometry(500, 300, 300, 200)
     loading_screen.show()
 
-    # Create a worker thread to simulate loading
-    worker = WorkerThread()
+    # Create a worker thread loading the catalog
+    repository = ArchiveRepository(db_file)
+    worker = WorkerThread(repository)
 
     # Connect worker thread to loading screen
     worker.progress_signal.connect(lambda value: None)  # Update this if needed
     worker.finished.connect(loading_screen.close_loading_screen)
 
-    # Once loading is complete, show the main application window
-    loading_screen.loading_complete.connect(lambda: ex.show())
+    def show_app():
+        # Once loading is complete, build the main application window from the catalog and show it
+        global ex
+        ex = App(repository, worker.catalog, worker.name_index, worker.error)
+        ex.setMinimumSize(400, 300)  # Set a minimum size for the window
+        ex.show()
 
-    worker.start()
+    loading_screen.loading_complete.connect(show_app)
 
-    ex = App()
-    ex.setMinimumSize(400, 300)  # Set a minimum size for the window
+    worker.start()
 
     app.exec()
@@ -0,0 +1,275 @@
+"""
+in-memory catalog of the archive for the guis
+holds every brand, camera class and model name once, so the selection widgets never wait for the database
+the scraper saves it as a snapshot file next to the database, which the guis map at startup
+"""
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_left, bisect_right
+
+import archive_db
+
+# Adjustable Variables
+snapshot_suffix = ".catalog"  # extension of the catalog snapshot, stored next to the database
+
+snapshot_magic = b'CATALOG\0'
+snapshot_format = 1  # increase when the layout below changes, older snapshots are ignored then
+# magic, format, catalog version, name count, name bytes, product count of every kind, camera class count
+snapshot_header = struct.Struct('=8sIqII' + 'I' * len(archive_db.archive_tables) + 'I')
+
+
+def snapshot_path(db_path):
+    """
+    Returns the catalog snapshot file belonging to a database file.
+    """
+    return os.path.splitext(db_path)[0] + snapshot_suffix
+
+
+class SnapshotNames:
+    """
+    The sorted names of a mapped snapshot, decoded from the file when accessed.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        return str(self.data[self.offsets[index]:self.offsets[index + 1]], 'utf-8')
+
+
+class Catalog:
+    """
+    Compact index of the brands, camera classes and models in the archive.
+
+    Every name is stored once in the alphabetically sorted 'names', so a name's position is its ID and IDs sort
+    like the names themselves. Products and camera classes are kept as parallel arrays of IDs sorted by brand,
+    so the products of a brand (or of a class of a brand) are one contiguous range found by binary search.
+
+    Offers the same lookups as 'ArchiveRepository', so the guis can use either of them.
+
+    The snapshot file holds the same arrays, followed by the UTF-8 encoded names. A mapped snapshot uses the
+    arrays straight from the file and only decodes the names it looks at, so opening it costs next to nothing.
+
+    Methods:
+        load(conn): Builds the catalog from the archive.
+        open_snapshot(path, version): Maps a snapshot file.
+        save(path): Writes the catalog as a snapshot file.
+        brands(kind): Brands of cameras, lenses or both.
+        classes(brand): Camera classes of a brand.
+        products(kind, brand, product_class): Models of a brand, optionally of one camera class.
+        entries(): All products.
+    """
+
+    def __init__(self, names, products, classes, version=None):
+        """
+        Initializes the catalog.
+
+        Args:
+            names (list): All names, sorted.
+            products (dict): Kind mapped to (brand IDs, model IDs), sorted by brand and model.
+            classes (tuple): (brand IDs, class IDs, model IDs) of the cameras, sorted by brand, class and model.
+            version (int): Catalog version of the archive the catalog was built from, see
+                'archive_db.catalog_version'.
+        """
+        self.names = names
+        self.product_ids = products
+        self.class_ids = classes
+        self.version = version
+
+    @classmethod
+    def load(cls, conn):
+        """
+        Builds the catalog from the archive.
+
+        Args:
+            conn (sqlite3.Connection): Connection to the archive.
+
+        Returns:
+            Catalog: The catalog.
+        """
+        # one read transaction, so the version matches the rows even while the scraper writes
+        own_transaction = not conn.in_transaction
+        if own_transaction:
+            conn.execute("BEGIN")
+        try:
+            version = archive_db.catalog_version(conn)
+            product_rows = {}
+            for kind, table in archive_db.archive_tables.items():
+                product_rows[kind] = set(conn.execute(f"SELECT brand, model FROM {table} "
+                                                      "WHERE brand <> '' AND model <> ''"))
+            class_rows = set(conn.execute("SELECT brand, class, model FROM cameraClasses WHERE brand <> ''"))
+        finally:
+            if own_transaction:
+                conn.commit()
+
+        names = sorted({name for rows in (*product_rows.values(), class_rows) for row in rows for name in row})
+        name_ids = {name: index for index, name in enumerate(names)}
+
+        products = {}
+        for kind, rows in product_rows.items():
+            ids = sorted((name_ids[brand], name_ids[model]) for brand, model in rows)
+            products[kind] = (array('I', (brand for brand, model in ids)),
+                              array('I', (model for brand, model in ids)))
+        ids = sorted((name_ids[brand], name_ids[camera_class], name_ids[model])
+                     for brand, camera_class, model in class_rows)
+        classes = tuple(array('I', (row[column] for row in ids)) for column in range(3))
+        return cls(names, products, classes, version)
+
+    @classmethod
+    def open_snapshot(cls, path, version):
+        """
+        Maps a catalog snapshot file, if it was saved from the given catalog version.
+
+        Args:
+            path (str): The snapshot file, see 'snapshot_path'.
+            version (int): Current catalog version of the archive.
+
+        Returns:
+            Catalog: The catalog, or None if the file is missing, damaged, of another format or outdated.
+        """
+        try:
+            with open(path, 'rb') as file:
+                mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            # ValueError: empty file
+            return None
+        if len(mapped) < snapshot_header.size:
+            mapped.close()
+            return None
+        magic, file_format, file_version, name_count, name_bytes, *counts = snapshot_header.unpack_from(mapped)
+        *product_counts, class_count = counts
+        id_count = name_count + 1 + 2 * sum(product_counts) + 3 * class_count
+        if (magic != snapshot_magic or file_format != snapshot_format or file_version != version
+                or len(mapped) != snapshot_header.size + 4 * id_count + name_bytes):
+            mapped.close()
+            return None
+
+        view = memoryview(mapped)
+        position = snapshot_header.size
+
+        def take(count):
+            nonlocal position
+            ids = view[position:position + 4 * count].cast('I')
+            position += 4 * count
+            return ids
+
+        offsets = take(name_count + 1)
+        products = {kind: (take(count), take(count)) for kind, count in zip(archive_db.archive_tables, product_counts)}
+        classes = (take(class_count), take(class_count), take(class_count))
+        return cls(SnapshotNames(offsets, view[position:]), products, classes, version)
+
+    def save(self, path):
+        """
+        Writes the catalog as a snapshot file, replacing the previous one at once so no gui maps half a file.
+
+        Args:
+            path (str): The snapshot file, see 'snapshot_path'.
+        """
+        names = [name.encode('utf-8') for name in self.names]
+        offsets = array('I', [0])
+        for name in names:
+            offsets.append(offsets[-1] + len(name))
+
+        temp_path = path + '.tmp'
+        with open(temp_path, 'wb') as file:
+            file.write(snapshot_header.pack(snapshot_magic, snapshot_format, self.version, len(names), offsets[-1],
+                                            *(len(self.product_ids[kind][0]) for kind in archive_db.archive_tables),
+                                            len(self.class_ids[0])))
+            file.write(offsets)
+            for kind in archive_db.archive_tables:
+                for ids in self.product_ids[kind]:
+                    file.write(ids)
+            for ids in self.class_ids:
+                file.write(ids)
+            file.write(b''.join(names))
+        os.replace(temp_path, path)
+
+    def name_id(self, name):
+        """
+        Returns the ID of a name, or None if the catalog doesn't contain it.
+        """
+        index = bisect_left(self.names, name)
+        return index if index < len(self.names) and self.names[index] == name else None
+
+    @staticmethod
+    def id_range(ids, value, lo=0, hi=None):
+        """
+        Returns the slice of a sorted ID array holding a value, within lo and hi.
+        """
+        hi = len(ids) if hi is None else hi
+        return bisect_left(ids, value, lo, hi), bisect_right(ids, value, lo, hi)
+
+    def brands(self, kind=None):
+        """
+        Returns the brands in the catalog.
+
+        Args:
+            kind (str): 'camera' or 'lens', both if omitted.
+
+        Returns:
+            list: Brand names in alphabetical order.
+        """
+        kinds = [kind] if kind is not None else list(self.product_ids)
+        brand_ids = set()
+        for kind in kinds:
+            brand_ids.update(self.product_ids[kind][0])
+        return [self.names[brand_id] for brand_id in sorted(brand_ids)]
+
+    def classes(self, brand):
+        """
+        Returns the camera classes of a brand.
+
+        Args:
+            brand (str): The brand.
+
+        Returns:
+            list: Class names in alphabetical order.
+        """
+        if (brand_id := self.name_id(brand)) is None:
+            return []
+        start, end = self.id_range(self.class_ids[0], brand_id)
+        return [self.names[class_id] for class_id in dict.fromkeys(self.class_ids[1][start:end])]
+
+    def products(self, kind, brand, product_class=None):
+        """
+        Returns the models of a brand.
+
+        Args:
+            kind (str): 'camera' or 'lens'.
+            brand (str): The brand.
+            product_class (str): Only return cameras of this class (see 'classes'). Lens classes aren't part of
+                the catalog, use 'ArchiveRepository.products' for those.
+
+        Returns:
+            list: Model names in alphabetical order.
+        """
+        if (brand_id := self.name_id(brand)) is None:
+            return []
+        if product_class is None:
+            brand_ids, model_ids = self.product_ids[kind]
+            start, end = self.id_range(brand_ids, brand_id)
+        else:
+            if kind != 'camera':
+                raise ValueError("The catalog only holds camera classes")
+            if (class_id := self.name_id(product_class)) is None:
+                return []
+            brand_ids, class_ids, model_ids = self.class_ids
+            start, end = self.id_range(class_ids, class_id, *self.id_range(brand_ids, brand_id))
+        return [self.names[model_id] for model_id in model_ids[start:end]]
+
+    def entries(self):
+        """
+        Yields every product in the catalog.
+
+        Yields:
+            tuple: (kind, brand, model)
+        """
+        for kind, (brand_ids, model_ids) in self.product_ids.items():
+            for brand_id, model_id in zip(brand_ids, model_ids):
+                yield kind, self.names[brand_id], self.names[model_id]
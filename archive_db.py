@@ -0,0 +1,857 @@
+"""
+shared database helpers for the scraper and the guis
+covers the long-form (entity-attribute-value) storage mode and lookups that work on both storage modes
+"""
+import pathlib
+import re
+import sqlite3
+
+# Adjustable Variables
+cache_size_kib = 64 * 1024  # page cache per connection
+mmap_size = 256 * 1024 * 1024  # bytes of the database file read through memory mapping
+busy_timeout = 30  # seconds a connection waits for a lock before giving up
+
+# Wide table (or view) holding the specs of each kind of product
+archive_tables = {'camera': 'camerAarchive', 'lens': 'lensAarchive'}
+archive_kinds = {table: kind for kind, table in archive_tables.items()}
+# Camera spec listing the comma separated camera classes of a model
+camera_class_column = 'Kameraklassen'
+
+eav_schema = """
+    CREATE TABLE IF NOT EXISTS products (
+    product_id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    brand TEXT,
+    model TEXT NOT NULL,
+    UNIQUE (kind, model)
+    );
+    CREATE INDEX IF NOT EXISTS products_kind_brand ON products (kind, brand);
+
+    CREATE TABLE IF NOT EXISTS attributes (
+    attribute_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE COLLATE NOCASE
+    );
+
+    CREATE TABLE IF NOT EXISTS product_attribute_values (
+    product_id INTEGER NOT NULL REFERENCES products (product_id),
+    attribute_id INTEGER NOT NULL REFERENCES attributes (attribute_id),
+    value TEXT,
+    PRIMARY KEY (product_id, attribute_id)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS product_attribute_values_lookup ON product_attribute_values (attribute_id, value);
+"""
+
+
+class_schema = """
+    CREATE TABLE IF NOT EXISTS cameraClasses (
+    model TEXT NOT NULL,
+    brand TEXT,
+    class TEXT NOT NULL,
+    PRIMARY KEY (model, class)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS camera_classes_brand_class ON cameraClasses (brand, class);
+"""
+
+
+# brand and model outweigh matches in the spec values when ranking search results
+search_schema = """
+    CREATE VIRTUAL TABLE IF NOT EXISTS specSearch USING fts5(
+    brand, model, specs, kind UNINDEXED,
+    tokenize = 'unicode61 remove_diacritics 2'
+    );
+"""
+search_weights = (4.0, 10.0, 1.0)
+
+# Typed specs parsed from the datasheet texts, with their SQLite types
+metric_columns = {
+    'resolution_mp': 'REAL',  # effective megapixels
+    'weight_g'     : 'REAL',
+    'width_mm'     : 'REAL',  # lenses: diameter
+    'height_mm'    : 'REAL',  # lenses: length
+    'depth_mm'     : 'REAL',
+    'iso_min'      : 'INTEGER',
+    'iso_max'      : 'INTEGER',
+    'focal_min_mm' : 'REAL',
+    'focal_max_mm' : 'REAL',
+    'aperture'     : 'REAL',  # smallest f-number, i.e. the maximum aperture
+    'release_year' : 'INTEGER',
+}
+
+metrics_schema = f"""
+    CREATE TABLE IF NOT EXISTS specMetrics (
+    kind TEXT NOT NULL,
+    model TEXT NOT NULL,
+    brand TEXT,
+    {', '.join(f'{column} {column_type}' for column, column_type in metric_columns.items())},
+    PRIMARY KEY (kind, model)
+    ) WITHOUT ROWID;
+""" + ''.join(f"    CREATE INDEX IF NOT EXISTS spec_metrics_{column} ON specMetrics (kind, {column});\n"
+              for column in metric_columns)
+
+
+history_schema = """
+    CREATE TABLE IF NOT EXISTS specHistory (
+    kind TEXT NOT NULL,
+    model TEXT NOT NULL,
+    attribute TEXT NOT NULL COLLATE NOCASE,
+    run_id INTEGER NOT NULL,
+    value TEXT,
+    PRIMARY KEY (kind, model, attribute, run_id)
+    ) WITHOUT ROWID;
+"""
+
+
+def connect(path, read_only=False, check_same_thread=True, cached_statements=128):
+    """
+    Opens a connection to the archive, tuned for a scraper writing while the guis read.
+
+    Writing connections switch the database to write-ahead logging, so readers never block the writer and the
+    writer never blocks readers, with 'synchronous = NORMAL' (safe in WAL mode, only the last commits may be
+    lost on a power cut). Reading connections are opened in read-only URI mode. Both get a larger page cache and
+    memory-mapped reads.
+
+    Args:
+        path (str): The database file.
+        read_only (bool): Opens the database read-only, for the guis.
+        check_same_thread (bool): Passed on to 'sqlite3.connect'.
+        cached_statements (int): Prepared statements the connection keeps for reuse, passed on as well.
+
+    Returns:
+        sqlite3.Connection: The configured connection.
+    """
+    if read_only:
+        conn = sqlite3.connect(pathlib.Path(path).resolve().as_uri() + '?mode=ro', uri=True, timeout=busy_timeout,
+                               check_same_thread=check_same_thread, cached_statements=cached_statements)
+    else:
+        conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=check_same_thread,
+                               cached_statements=cached_statements)
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+    conn.execute(f"PRAGMA cache_size = {-cache_size_kib}")
+    conn.execute(f"PRAGMA mmap_size = {mmap_size}")
+    return conn
+
+
+def quote(identifier):
+    """
+    Quotes a table or column name for use in SQL.
+    """
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def object_type(conn, name):
+    """
+    Returns whether a name is a 'table' or a 'view' in the database, or None if it doesn't exist.
+    """
+    row = conn.execute("SELECT type FROM sqlite_master WHERE name = ? AND type IN ('table', 'view')",
+                       (name,)).fetchone()
+    return row[0] if row else None
+
+
+def is_eav(conn):
+    """
+    Tells whether a database stores its specs in the long-form tables.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the archive.
+
+    Returns:
+        bool: True if the archive uses the products/attributes/product_attribute_values tables.
+    """
+    return object_type(conn, 'product_attribute_values') == 'table'
+
+
+def create_eav_tables(conn):
+    """
+    Creates the long-form tables if they don't exist yet.
+
+    - products: one row per camera or lens, unique per kind and model
+    - attributes: one row per (transformed) legend
+    - product_attribute_values: one row per non-empty spec, indexed by attribute and value for lookups
+    """
+    conn.executescript(eav_schema)
+
+
+def kind_attributes(conn, kind):
+    """
+    Returns all attributes used by a kind of product.
+
+    Args:
+        conn (sqlite3.Connection): Connection to an archive in long-form storage.
+        kind (str): 'camera' or 'lens'.
+
+    Returns:
+        list: (attribute_id, name) tuples ordered by id, i.e. in the order the attributes were first seen.
+    """
+    return conn.execute("""
+        SELECT a.attribute_id, a.name FROM attributes a
+        WHERE EXISTS (SELECT 1 FROM product_attribute_values v JOIN products p ON p.product_id = v.product_id
+                      WHERE v.attribute_id = a.attribute_id AND p.kind = ?)
+        ORDER BY a.attribute_id
+    """, (kind,)).fetchall()
+
+
+def rebuild_wide_views(conn):
+    """
+    (Re)creates the camerAarchive and lensAarchive views over the long-form tables.
+
+    Each view pivots the values of its kind back into one row per product with a brand and model column and one
+    column per attribute, so queries written against the wide tables keep working.
+
+    Args:
+        conn (sqlite3.Connection): Connection to an archive in long-form storage.
+    """
+    for kind, view in archive_tables.items():
+        pivot_columns = ''.join(
+            f",\n    MAX(CASE WHEN v.attribute_id = {attribute_id} THEN v.value END) AS {quote(name)}"
+            for attribute_id, name in kind_attributes(conn, kind))
+
+        conn.execute(f"DROP VIEW IF EXISTS {view}")
+        # grouping by brand and model as well lets SQLite push filters on them into the view
+        conn.execute(f"""
+            CREATE VIEW {view} AS
+            SELECT p.brand AS brand, p.model AS model{pivot_columns}
+            FROM products p LEFT JOIN product_attribute_values v ON v.product_id = p.product_id
+            WHERE p.kind = '{kind}'
+            GROUP BY p.product_id, p.brand, p.model
+        """)
+
+
+def migrate_wide_to_eav(conn):
+    """
+    Moves the specs of existing wide tables into the long-form tables and replaces the tables with views.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the archive, the long-form tables must exist already.
+    """
+    for kind, table in archive_tables.items():
+        if object_type(conn, table) != 'table':
+            continue
+
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info('{table}')")
+                   if row[1].lower() not in ('brand', 'model')]
+
+        conn.execute(f"""
+            INSERT INTO products (kind, brand, model) SELECT ?, brand, model FROM {table} WHERE model IS NOT NULL
+            ON CONFLICT (kind, model) DO UPDATE SET brand = excluded.brand
+        """, (kind,))
+        conn.executemany("INSERT OR IGNORE INTO attributes (name) VALUES (?)", [(column,) for column in columns])
+
+        for column in columns:
+            conn.execute(f"""
+                INSERT OR REPLACE INTO product_attribute_values (product_id, attribute_id, value)
+                SELECT p.product_id, a.attribute_id, t.{quote(column)}
+                FROM {table} t
+                JOIN products p ON p.kind = ? AND p.model = t.model
+                JOIN attributes a ON a.name = ?
+                WHERE t.{quote(column)} IS NOT NULL AND t.{quote(column)} != ''
+            """, (kind, column))
+
+        conn.execute(f"DROP TABLE {table}")
+
+    rebuild_wide_views(conn)
+
+
+def products_by_attribute(conn, kind, attribute, value=None):
+    """
+    Looks up the products that have an attribute, optionally with a given value.
+
+    Uses the (attribute, value) index in long-form storage and falls back to a column filter on the wide tables.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the archive.
+        kind (str): 'camera' or 'lens'.
+        attribute (str): Transformed attribute (column) name.
+        value (str): Exact value to match, any non-NULL value if omitted.
+
+    Returns:
+        list: (brand, model, value) tuples.
+    """
+    if is_eav(conn):
+        query = """
+            SELECT p.brand, p.model, v.value FROM attributes a
+            JOIN product_attribute_values v ON v.attribute_id = a.attribute_id
+            JOIN products p ON p.product_id = v.product_id
+            WHERE a.name = ? AND p.kind = ?
+        """
+        params = [attribute, kind]
+        if value is not None:
+            query += " AND v.value = ?"
+            params.append(value)
+        return conn.execute(query, params).fetchall()
+
+    table = archive_tables[kind]
+    try:
+        query = f"SELECT brand, model, {quote(attribute)} FROM {table} WHERE {quote(attribute)} IS NOT NULL"
+        if value is not None:
+            return conn.execute(query + f" AND {quote(attribute)} = ?", (value,)).fetchall()
+        return conn.execute(query).fetchall()
+    except sqlite3.OperationalError:
+        # the attribute was never scraped, so there's no column for it
+        return []
+
+
+def create_class_table(conn):
+    """
+    Creates the camera class mapping if it doesn't exist yet and fills it from the archive the first time.
+
+    cameraClasses holds one row per camera and class, indexed by brand and class, so the guis can look up the
+    classes of a brand and the models of a class without splitting the Kameraklassen spec themselves.
+    """
+    exists = object_type(conn, 'cameraClasses') is not None
+    conn.executescript(class_schema)
+    if not exists:
+        rebuild_camera_classes(conn)
+        conn.commit()
+
+
+def split_classes(value):
+    """
+    Splits a Kameraklassen spec into its distinct, stripped camera classes.
+    """
+    return list(dict.fromkeys(part.strip() for part in (value or '').split(',') if part.strip()))
+
+
+def write_camera_classes(cursor, brand, model, value):
+    """
+    Replaces the classes of a camera in the mapping, without committing.
+
+    Only the classes that changed are deleted or inserted, so rescraping an unchanged camera doesn't bump the
+    catalog version (see 'create_catalog_version').
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the writing connection.
+        brand (str): The brand of the camera.
+        model (str): The model name of the camera.
+        value (str): The camera's Kameraklassen spec.
+    """
+    stored = set(cursor.execute("SELECT brand, class FROM cameraClasses WHERE model = ?", (model,)))
+    classes = {(brand, camera_class) for camera_class in split_classes(value)}
+    cursor.executemany("DELETE FROM cameraClasses WHERE model = ? AND class = ?",
+                       [(model, camera_class) for _, camera_class in stored - classes])
+    cursor.executemany("INSERT INTO cameraClasses (model, brand, class) VALUES (?, ?, ?)",
+                       [(model, brand, camera_class) for _, camera_class in classes - stored])
+
+
+def rebuild_camera_classes(conn):
+    """
+    Rebuilds the whole camera class mapping from the Kameraklassen specs in the archive, without committing.
+    """
+    conn.execute("DELETE FROM cameraClasses")
+    try:
+        rows = conn.execute(f"SELECT brand, model, {camera_class_column} FROM camerAarchive "
+                            f"WHERE {camera_class_column} IS NOT NULL").fetchall()
+    except sqlite3.OperationalError:
+        # no camera with classes has been scraped yet
+        return
+    cursor = conn.cursor()
+    for brand, model, value in rows:
+        write_camera_classes(cursor, brand, model, value)
+
+
+def camera_classes(conn, brand):
+    """
+    Returns the camera classes of a brand.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the archive.
+        brand (str): The brand.
+
+    Returns:
+        list: Class names in alphabetical order.
+    """
+    return [row[0] for row in
+            conn.execute("SELECT DISTINCT class FROM cameraClasses WHERE brand = ? ORDER BY class", (brand,))]
+
+
+def camera_models(conn, brand, camera_class, after='', limit=-1):
+    """
+    Returns the cameras of a brand that belong to a class.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the archive.
+        brand (str): The brand.
+        camera_class (str): Exact class name as returned by 'camera_classes'.
+        after (str): Only return models sorting after this one, for keyset pagination.
+        limit (int): Maximum number of models, -1 for all of them.
+
+    Returns:
+        list: Model names in alphabetical order.
+    """
+    return [row[0] for row in
+            conn.execute("SELECT model FROM cameraClasses WHERE brand = ? AND class = ? AND model > ? "
+                         "ORDER BY model LIMIT ?", (brand, camera_class, after, limit))]
+
+
+def create_search_table(conn):
+    """
+    Creates the full-text index over model names and spec values if it doesn't exist yet and fills it from the
+    archive the first time.
+
+    specSearch is an FTS5 table with one document per product, holding its brand, model and all of its spec
+    values (see 'index_product').
+    """
+    exists = object_type(conn, 'specSearch') is not None
+    conn.executescript(search_schema)
+    if not exists:
+        rebuild_search_index(conn)
+        conn.commit()
+
+
+def search_documents(conn, kind, model=None):
+    """
+    Returns the search documents of a kind of product: its brand, model and all of its spec values as one text.
+
+    In long-form storage the values are read from the long-form tables rather than the views, which are only
+    rebuilt after a write batch.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the archive.
+        kind (str): 'camera' or 'lens'.
+        model (str): Only return the document of this product.
+
+    Returns:
+        list: (brand, model, specs) tuples.
+    """
+    if is_eav(conn):
+        query = """SELECT p.brand, p.model, COALESCE(group_concat(v.value, ' '), '')
+                   FROM products p LEFT JOIN product_attribute_values v ON v.product_id = p.product_id
+                   WHERE p.kind = ?"""
+        params = [kind]
+        if model is not None:
+            query += " AND p.model = ?"
+            params.append(model)
+        return conn.execute(query + " GROUP BY p.product_id", params).fetchall()
+
+    table = archive_tables[kind]
+    if object_type(conn, table) is None:
+        return []
+    cursor = conn.execute(f"SELECT * FROM {table}" + (" WHERE model = ?" if model is not None else ""),
+                          () if model is None else (model,))
+    columns = [description[0].lower() for description in cursor.description]
+    documents = []
+    for row in cursor.fetchall():
+        product = dict(zip(columns, row))
+        specs = ' '.join(str(value) for column, value in product.items()
+                         if value and column not in ('brand', 'model'))
+        documents.append((product['brand'], product['model'], specs))
+    return documents
+
+
+def index_product(cursor, kind, model):
+    """
+    Replaces the search document of a product with its current specs, without committing.
+
+    The specs are read back from the archive, so specs from earlier scrapes that weren't on the latest datasheet
+    stay searchable, just like they stay in the archive.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the writing connection, the product's specs written already.
+        kind (str): 'camera' or 'lens'.
+        model (str): The model name of the product.
+    """
+    documents = search_documents(cursor.connection, kind, model)
+
+    if any(character.isalnum() for character in model):
+        # a phrase query on the model column finds the old document through the index
+        cursor.execute("""DELETE FROM specSearch WHERE rowid IN (
+                              SELECT rowid FROM specSearch WHERE specSearch MATCH ? AND kind = ? AND model = ?)""",
+                       (f'model : "{model.replace(chr(34), chr(34) * 2)}"', kind, model))
+    else:
+        cursor.execute("DELETE FROM specSearch WHERE kind = ? AND model = ?", (kind, model))
+
+    cursor.executemany("INSERT INTO specSearch (brand, model, specs, kind) VALUES (?, ?, ?, ?)",
+                       [document + (kind,) for document in documents])
+
+
+def rebuild_search_index(conn):
+    """
+    Rebuilds the whole full-text index from the archive, without committing.
+    """
+    conn.execute("DELETE FROM specSearch")
+    for kind in archive_tables:
+        conn.executemany("INSERT INTO specSearch (brand, model, specs, kind) VALUES (?, ?, ?, ?)",
+                         [document + (kind,) for document in search_documents(conn, kind)])
+
+
+def search_query(text):
+    """
+    Turns free text into an FTS5 query: every word has to match, the last one as a prefix.
+
+    Words are quoted, so characters with a meaning in the FTS5 query syntax are searched for literally.
+
+    Args:
+        text (str): Search input, e.g. 'IBIS 4K 60p'.
+
+    Returns:
+        str: The FTS5 query, empty if the text has no searchable words.
+    """
+    words = [word for word in text.split() if re.search(r'\w', word)]
+    phrases = ['"' + word.replace('"', '""') + '"' for word in words]
+    if phrases:
+        phrases[-1] += '*'
+    return ' '.join(phrases)
+
+
+def search(conn, text, kind=None, limit=50):
+    """
+    Searches model names and spec values, best matches first.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the archive.
+        text (str): Search input, see 'search_query'.
+        kind (str): 'camera' or 'lens' to search only one kind of product, both if omitted.
+        limit (int): Maximum number of results.
+
+    Returns:
+        list: (kind, brand, model) tuples ranked by bm25, model name matches weighted highest.
+    """
+    query = search_query(text)
+    if not query:
+        return []
+
+    sql = "SELECT kind, brand, model FROM specSearch WHERE specSearch MATCH ?"
+    params = [query]
+    if kind is not None:
+        sql += " AND kind = ?"
+        params.append(kind)
+    sql += f" ORDER BY bm25(specSearch, {', '.join(map(str, search_weights))}) LIMIT ?"
+    params.append(limit)
+    return conn.execute(sql, params).fetchall()
+
+
+number_pattern = r'\d+(?:[.,]\d+)*'
+
+
+def german_number(text):
+    """
+    Converts a number in German notation ('24,2', '51.200') to a float.
+    """
+    # a dot followed by exactly three digits separates thousands
+    return float(re.sub(r'(?<=\d)\.(?=\d{3}(?!\d))', '', text).replace(',', '.'))
+
+
+def parse_resolution(value):
+    """
+    Parses the effective megapixels, e.g. '24,2 Megapixel (effektiv)'. Specs listing the total resolution as well,
+    e.g. '25,3 Megapixel (gesamt), 24,2 Megapixel (effektiv)', give the effective one, otherwise the first one counts.
+    """
+    if match := (re.search(rf'({number_pattern})\s*(?:Megapixel|MP)\s*\(effektiv\)', value, re.IGNORECASE)
+                 or re.search(rf'({number_pattern})\s*(?:Megapixel|MP)\b', value, re.IGNORECASE)):
+        return {'resolution_mp': german_number(match[1])}
+
+
+def parse_weight(value):
+    """
+    Parses a weight in grams, e.g. 'ca. 650 g (betriebsbereit)' or '1,2 kg'.
+    """
+    if match := re.search(rf'({number_pattern})\s*(kg|g)\b', value):
+        return {'weight_g': german_number(match[1]) * (1000 if match[2] == 'kg' else 1)}
+
+
+def parse_dimensions(value):
+    """
+    Parses the dimensions in millimeters, e.g. '131 x 96 x 80 mm'.
+    """
+    if match := re.search(rf'({number_pattern})\s*x\s*({number_pattern})(?:\s*x\s*({number_pattern}))?\s*mm',
+                          value):
+        return {column: german_number(number)
+                for column, number in zip(('width_mm', 'height_mm', 'depth_mm'), match.groups()) if number}
+
+
+def parse_iso(value):
+    """
+    Parses the (extended) ISO range, e.g. 'ISO 100 bis 51.200 (erweiterbar auf ISO 50 bis 204.800)'.
+    """
+    # ISO values start at 25, smaller numbers are steps like '1/3 EV'
+    numbers = [german_number(number) for number in re.findall(number_pattern, value)]
+    if numbers := [int(number) for number in numbers if number >= 25 and number.is_integer()]:
+        return {'iso_min': min(numbers), 'iso_max': max(numbers)}
+
+
+def parse_focal_length(value):
+    """
+    Parses a focal length or zoom range, e.g. '24 - 70 mm'.
+    """
+    if match := re.search(rf'({number_pattern})(?:\s*[-–]\s*({number_pattern}))?\s*mm', value):
+        focal_min = german_number(match[1])
+        return {'focal_min_mm': focal_min, 'focal_max_mm': german_number(match[2]) if match[2] else focal_min}
+
+
+def parse_aperture(value):
+    """
+    Parses the maximum aperture as its f-number, e.g. 'F2,8' or '1:1,8'.
+    """
+    if numbers := re.findall(r'(?:\bF|\bf/|1:)\s*(\d+(?:,\d+)?)', value):
+        return {'aperture': min(german_number(number) for number in numbers)}
+
+
+def parse_release_year(value):
+    """
+    Parses the year of a market launch or announcement, e.g. '10/2021'.
+    """
+    if match := re.search(r'\b(19\d{2}|20\d{2})\b', value):
+        return {'release_year': int(match[1])}
+
+
+# (pattern of the lowercase transformed column name, parser of its value), the first column that parses wins.
+# The patterns are anchored to the start of the legends they mean, so e.g. 'Kleinste_Blende' (F22) never passes
+# for the maximum aperture and 'Videoaufloesung' never for the sensor resolution
+metric_rules = [
+    (r'^(sensor|aufl)', parse_resolution),
+    (r'^gewicht', parse_weight),
+    (r'^abmessung', parse_dimensions),
+    (r'^(iso(_|$)|empfindlichkeit)', parse_iso),
+    (r'^brennweite', parse_focal_length),
+    (r'^(lichtst|offenblende|gro(e)?sste_blende)', parse_aperture),
+    (r'^(markteinf|erschein|vorgestellt|ankuendig|ankundig)', parse_release_year),
+]
+
+
+def spec_metrics(column_values):
+    """
+    Parses the typed specs of a product out of its datasheet texts.
+
+    Args:
+        column_values (iterable): (transformed column name, value) pairs of the product.
+
+    Returns:
+        dict: Values of the 'metric_columns' that could be parsed, e.g. {'weight_g': 650.0}.
+    """
+    metrics = {}
+    for column, value in column_values:
+        if not value:
+            continue
+        for pattern, parser in metric_rules:
+            if re.search(pattern, column.lower()) and (parsed := parser(str(value))):
+                for metric, number in parsed.items():
+                    metrics.setdefault(metric, number)
+    return metrics
+
+
+def create_metrics_table(conn):
+    """
+    Creates the typed spec table if it doesn't exist yet and fills it from the archive the first time.
+
+    specMetrics holds one row per product with the 'metric_columns' parsed by 'spec_metrics', every column
+    indexed together with the kind of product, so range filters (see 'products_in_ranges') run on indexes.
+    """
+    exists = object_type(conn, 'specMetrics') is not None
+    conn.executescript(metrics_schema)
+    if not exists:
+        rebuild_spec_metrics(conn)
+        conn.commit()
+
+
+def write_spec_metrics(cursor, kind, brand, model, metrics):
+    """
+    Inserts or updates the typed specs of a product, without committing.
+
+    Like a spec missing from a datasheet doesn't remove it from the archive, a metric that couldn't be parsed
+    doesn't overwrite the one already stored.
+    """
+    if not metrics:
+        return
+    columns = list(metrics)
+    cursor.execute(f"""INSERT INTO specMetrics (kind, model, brand, {', '.join(columns)})
+                       VALUES (?, ?, ?{', ?' * len(columns)})
+                       ON CONFLICT(kind, model) DO UPDATE SET brand = excluded.brand,
+                       {', '.join(f'{column} = COALESCE(excluded.{column}, {column})' for column in columns)}""",
+                   [kind, model, brand] + [metrics[column] for column in columns])
+
+
+def archive_products(conn, kind):
+    """
+    Returns all products of a kind as dictionaries of their brand, model and non-empty specs.
+    """
+    table = archive_tables[kind]
+    if object_type(conn, table) is None:
+        return []
+    cursor = conn.execute(f"SELECT * FROM {table}")
+    columns = [description[0] for description in cursor.description]
+    return [{column: value for column, value in zip(columns, row) if value is not None}
+            for row in cursor.fetchall()]
+
+
+def rebuild_spec_metrics(conn):
+    """
+    Re-parses the typed specs of the whole archive, without committing.
+    """
+    conn.execute("DELETE FROM specMetrics")
+    cursor = conn.cursor()
+    for kind in archive_tables:
+        for product in archive_products(conn, kind):
+            write_spec_metrics(cursor, kind, product.get('brand'), product['model'], spec_metrics(product.items()))
+
+
+def rebuild_derived_tables(conn):
+    """
+    Rebuilds everything derived from the specs (camera classes, search index, typed specs), without committing.
+
+    Used after bulk writes that bypass the insert paths, like merging shards.
+    """
+    rebuild_camera_classes(conn)
+    rebuild_search_index(conn)
+    rebuild_spec_metrics(conn)
+
+
+def products_in_ranges(conn, kind, ranges, limit=None):
+    """
+    Filters products by ranges of their typed specs.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the archive.
+        kind (str): 'camera' or 'lens'.
+        ranges (dict): Metric column mapped to an inclusive (minimum, maximum) tuple, None leaves a side open,
+            e.g. {'weight_g': (None, 700), 'resolution_mp': (24, None)}.
+        limit (int): Maximum number of results, all if omitted.
+
+    Returns:
+        list: (brand, model) tuples ordered by brand and model.
+
+    Raises:
+        ValueError: If a range refers to an unknown metric.
+    """
+    conditions, params = ["kind = ?"], [kind]
+    for metric, (minimum, maximum) in ranges.items():
+        if metric not in metric_columns:
+            raise ValueError(f"Unknown metric: {metric}")
+        if minimum is not None:
+            conditions.append(f"{metric} >= ?")
+            params.append(minimum)
+        if maximum is not None:
+            conditions.append(f"{metric} <= ?")
+            params.append(maximum)
+
+    query = f"SELECT brand, model FROM specMetrics WHERE {' AND '.join(conditions)} ORDER BY brand, model"
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    return conn.execute(query, params).fetchall()
+
+
+def create_history_table(conn):
+    """
+    Creates the spec history if it doesn't exist yet and records the current archive as its baseline.
+
+    specHistory holds a row for every spec value a product got in a scrape run: the baseline row from the run
+    the history was started in, and afterwards only the specs that changed (see 'write_spec_history'). Any
+    product can be rebuilt as it was after any run from these deltas (see 'product_as_of').
+    """
+    if object_type(conn, 'specHistory') is not None:
+        return
+    conn.executescript(history_schema)
+    baseline_run = conn.execute("SELECT COALESCE(MAX(run_id), 0) FROM scrapeRuns").fetchone()[0]
+    for kind in archive_tables:
+        conn.executemany("INSERT OR REPLACE INTO specHistory (kind, model, attribute, run_id, value) "
+                         "VALUES (?, ?, ?, ?, ?)",
+                         [(kind, product['model'], attribute, baseline_run, value)
+                          for product in archive_products(conn, kind)
+                          for attribute, value in product.items() if attribute.lower() not in ('brand', 'model')])
+    conn.commit()
+
+
+def write_spec_history(cursor, kind, model, run_id, column_values):
+    """
+    Records the specs of a product that changed in a scrape run, without committing.
+
+    The latest history value of every spec is its current value, so the comparison doesn't depend on the storage
+    mode and reads only the product's own history rows.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the writing connection.
+        kind (str): 'camera' or 'lens'.
+        model (str): The model name of the product.
+        run_id (int): The scrape run writing the product.
+        column_values (list): (transformed column name, value) pairs of the product.
+    """
+    cursor.execute("SELECT attribute, value FROM specHistory WHERE kind = ? AND model = ? ORDER BY run_id",
+                   (kind, model))
+    current = {attribute.lower(): value for attribute, value in cursor.fetchall()}
+    cursor.executemany("INSERT OR REPLACE INTO specHistory (kind, model, attribute, run_id, value) "
+                       "VALUES (?, ?, ?, ?, ?)",
+                       [(kind, model, column, run_id, value) for column, value in column_values
+                        if current.get(column.lower()) != value])
+
+
+def product_as_of(conn, kind, model, run_id):
+    """
+    Rebuilds the specs of a product as they were after a scrape run.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the archive.
+        kind (str): 'camera' or 'lens'.
+        model (str): The model name of the product.
+        run_id (int): The scrape run.
+
+    Returns:
+        dict: Attribute mapped to its value, empty if the product wasn't in the archive yet.
+    """
+    product = {}
+    for attribute, value in conn.execute("""SELECT attribute, value FROM specHistory
+                                            WHERE kind = ? AND model = ? AND run_id <= ? ORDER BY run_id""",
+                                         (kind, model, run_id)):
+        product[attribute] = value
+    return product
+
+
+def product_changes(conn, kind, model):
+    """
+    Lists every change to the specs of a product, oldest first.
+
+    Args:
+        conn (sqlite3.Connection): Connection to the archive.
+        kind (str): 'camera' or 'lens'.
+        model (str): The model name of the product.
+
+    Returns:
+        list: (run_id, started_at, attribute, value) tuples, the baseline run included.
+    """
+    return conn.execute("""SELECT h.run_id, r.started_at, h.attribute, h.value
+                           FROM specHistory h LEFT JOIN scrapeRuns r ON r.run_id = h.run_id
+                           WHERE h.kind = ? AND h.model = ? ORDER BY h.run_id, h.attribute""",
+                        (kind, model)).fetchall()
+
+
+catalog_version_schema = """
+    CREATE TABLE IF NOT EXISTS catalogVersion (
+    version INTEGER NOT NULL
+    );
+    INSERT INTO catalogVersion (version) SELECT 0 WHERE NOT EXISTS (SELECT 1 FROM catalogVersion);
+"""
+
+
+def create_catalog_version(conn):
+    """
+    Creates the catalog version counter if it doesn't exist yet and the triggers keeping it current.
+
+    catalogVersion holds a single number that triggers increase whenever a product is added, removed or renamed
+    or its camera classes change, whoever writes to the archive. The guis compare it with the version of their
+    catalog snapshot (see 'archive_catalog.Catalog.open_snapshot') to tell whether the snapshot is still valid.
+    Triggers on wide tables are dropped along with them, so this has to run after a migration to long-form
+    storage as well.
+    """
+    conn.executescript(catalog_version_schema)
+    if is_eav(conn):
+        tables = ['products']
+    else:
+        tables = [table for table in archive_tables.values() if object_type(conn, table) == 'table']
+    bump = "BEGIN UPDATE catalogVersion SET version = version + 1; END"
+    for table in tables:
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_catalog_insert AFTER INSERT ON {table} {bump}")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_catalog_delete AFTER DELETE ON {table} {bump}")
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_catalog_update AFTER UPDATE OF brand, model ON {table} "
+                     f"WHEN OLD.brand IS NOT NEW.brand OR OLD.model IS NOT NEW.model {bump}")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS cameraClasses_catalog_insert AFTER INSERT ON cameraClasses {bump}")
+    conn.execute(f"CREATE TRIGGER IF NOT EXISTS cameraClasses_catalog_delete AFTER DELETE ON cameraClasses {bump}")
+    conn.commit()
+
+
+def catalog_version(conn):
+    """
+    Returns the current catalog version of the archive, or None for archives without the counter.
+    """
+    try:
+        return conn.execute("SELECT version FROM catalogVersion").fetchone()[0]
+    except sqlite3.OperationalError:
+        return None
@@ -0,0 +1,346 @@
+"""
+data access layer of the guis
+keeps a pool of long-lived read-only connections to the archive and offers the queries the guis need
+"""
+import contextlib
+import queue
+import sys
+import threading
+from bisect import bisect_left
+
+import archive_db
+from archive_catalog import Catalog, snapshot_path
+
+# Adjustable Variables
+db_file = "CamerAarchive.db"  # archive database, opened read-only
+pool_size = 4  # connections kept open at most, one per concurrently running query
+cached_statements = 256  # prepared statements every connection keeps for reuse
+models_per_query = 500  # models looked up per query when paging through specs, stays below SQLite's parameter limit
+spec_rows_per_query = 200  # spec rows 'spec_rows' returns at most per call
+
+
+class ArchiveRepository:
+    """
+    Read access to the archive for the guis.
+
+    Connections are opened once (read-only, see 'archive_db.connect') and handed out from a pool, so a query only
+    costs its own execution. Every query uses a constant SQL string with parameters, so it is prepared once per
+    connection and taken from the connection's statement cache afterwards.
+
+    Methods:
+        brands(kind): Brands of cameras, lenses or both.
+        classes(brand): Camera classes of a brand.
+        products(kind, brand, product_class): Models of a brand, optionally of one class.
+        product_specs(kind, model): All specs of a product.
+        spec_rows(kind, models, after, limit): Pages through the specs of many products.
+        search(text, kind, limit): Ranked full-text search.
+        products_in_ranges(kind, ranges): Range filter on the typed specs.
+        catalog(): In-memory index of all brands, classes and models.
+        changed_catalog(version): The catalog, if the archive changed since a version.
+        close(): Closes all connections.
+    """
+
+    def __init__(self, db_path=db_file, max_connections=pool_size):
+        """
+        Initializes the repository, connections are opened on first use.
+
+        Args:
+            db_path (str): The archive database.
+            max_connections (int): Connections kept open at most.
+        """
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self.pool = queue.LifoQueue()
+        self.opened = 0
+        self.lock = threading.Lock()
+        self.borrowed = threading.local()
+
+    @contextlib.contextmanager
+    def connection(self):
+        """
+        Borrows a connection from the pool, opening one if none is idle and the pool isn't full yet.
+
+        A thread that already borrowed a connection gets the same one again, so queries run inside a 'with
+        connection()' block (like those of 'query_executor.QueryExecutor') all use the connection borrowed first.
+
+        Yields:
+            sqlite3.Connection: A read-only connection, usable from any thread while borrowed.
+        """
+        if (conn := getattr(self.borrowed, 'conn', None)) is not None:
+            yield conn
+            return
+        try:
+            conn = self.pool.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                open_new = self.opened < self.max_connections
+                if open_new:
+                    self.opened += 1
+            if open_new:
+                try:
+                    conn = archive_db.connect(self.db_path, read_only=True, check_same_thread=False,
+                                              cached_statements=cached_statements)
+                except Exception:
+                    with self.lock:
+                        self.opened -= 1
+                    raise
+            else:
+                conn = self.pool.get()
+        self.borrowed.conn = conn
+        try:
+            yield conn
+        finally:
+            self.borrowed.conn = None
+            self.pool.put(conn)
+
+    def close(self):
+        """
+        Closes the idle connections of the pool.
+        """
+        while True:
+            try:
+                conn = self.pool.get_nowait()
+            except queue.Empty:
+                break
+            conn.close()
+            with self.lock:
+                self.opened -= 1
+
+    def brands(self, kind=None):
+        """
+        Returns the brands in the archive.
+
+        Args:
+            kind (str): 'camera' or 'lens', both if omitted.
+
+        Returns:
+            list: Brand names in alphabetical order.
+        """
+        kinds = [kind] if kind is not None else list(archive_db.archive_tables)
+        with self.connection() as conn:
+            if archive_db.is_eav(conn):
+                brands = {row[0] for kind in kinds for row in
+                          conn.execute("SELECT DISTINCT brand FROM products WHERE kind = ?", (kind,))}
+            else:
+                brands = {row[0] for kind in kinds for row in
+                          conn.execute(f"SELECT DISTINCT brand FROM {archive_db.archive_tables[kind]}")}
+        return sorted(brand for brand in brands if brand)
+
+    def classes(self, brand):
+        """
+        Returns the camera classes of a brand.
+
+        Args:
+            brand (str): The brand.
+
+        Returns:
+            list: Class names in alphabetical order.
+        """
+        with self.connection() as conn:
+            return archive_db.camera_classes(conn, brand)
+
+    def products(self, kind, brand, product_class=None, after='', limit=-1):
+        """
+        Returns the models of a brand.
+
+        Args:
+            kind (str): 'camera' or 'lens'.
+            brand (str): The brand.
+            product_class (str): Only return cameras of this class (see 'classes'), or lenses whose Lensklassen
+                spec is exactly this value.
+            after (str): Only return models sorting after this one, for keyset pagination.
+            limit (int): Maximum number of models, -1 for all of them.
+
+        Returns:
+            list: Model names in alphabetical order.
+        """
+        with self.connection() as conn:
+            if product_class is None:
+                return [row[0] for row in
+                        conn.execute(f"SELECT model FROM {archive_db.archive_tables[kind]} "
+                                     "WHERE brand = ? AND model > ? ORDER BY model LIMIT ?", (brand, after, limit))]
+            if kind == 'camera':
+                return archive_db.camera_models(conn, brand, product_class, after, limit)
+            models = sorted(model for product_brand, model, value in
+                            archive_db.products_by_attribute(conn, kind, 'Lensklassen', product_class)
+                            if product_brand == brand and model > after)
+            return models if limit < 0 else models[:limit]
+
+    def product_specs(self, kind, model):
+        """
+        Returns all specs of a product.
+
+        Args:
+            kind (str): 'camera' or 'lens'.
+            model (str): The model name.
+
+        Returns:
+            dict: Brand, model and every non-empty spec, in column order. Empty if the product doesn't exist.
+        """
+        with self.connection() as conn:
+            if archive_db.is_eav(conn):
+                # straight from the long-form tables, the view would pivot every attribute of the kind
+                row = conn.execute("SELECT product_id, brand, model FROM products WHERE kind = ? AND model = ?",
+                                   (kind, model)).fetchone()
+                if row is None:
+                    return {}
+                specs = {'brand': row[1], 'model': row[2]}
+                specs.update(conn.execute("""SELECT a.name, v.value FROM product_attribute_values v
+                                             JOIN attributes a ON a.attribute_id = v.attribute_id
+                                             WHERE v.product_id = ? ORDER BY a.attribute_id""", (row[0],)))
+                return specs
+
+            cursor = conn.execute(f"SELECT * FROM {archive_db.archive_tables[kind]} WHERE model = ?", (model,))
+            row = cursor.fetchone()
+            if row is None:
+                return {}
+            return {description[0]: value for description, value in zip(cursor.description, row)
+                    if value is not None}
+
+    def spec_rows(self, kind, models, after=None, limit=spec_rows_per_query):
+        """
+        Returns the next non-empty specs of products, for views that show them a chunk at a time.
+
+        Every call runs its own bounded queries, continuing after the key the previous call returned, and gives the
+        connection back before it returns. So a view can keep its place for as long as it likes without holding a
+        connection or a read snapshot that would keep the scraper's WAL from being checkpointed.
+
+        Args:
+            kind (str): 'camera' or 'lens'.
+            models (list): The model names, sorted and without duplicates.
+            after (tuple): Key returned by the previous call, None to start with the first product.
+            limit (int): Rows returned at most.
+
+        Returns:
+            tuple: (rows, key). rows are (model, spec, value) tuples, ordered by model and, within a product, like
+            'product_specs'. key is passed as 'after' to get the following rows, None once there are no more.
+        """
+        rows = []
+        after = after or ('', -1)
+        start = bisect_left(models, after[0])
+        with self.connection() as conn:
+            fetch = self.eav_spec_rows if archive_db.is_eav(conn) else self.wide_spec_rows
+            while len(rows) < limit:
+                chunk = models[start:start + models_per_query]
+                if not chunk:
+                    return [row[2:] for row in rows], None
+                found, key = fetch(conn, kind, chunk, after, limit - len(rows))
+                rows.extend(found)
+                if key is None:
+                    # every product of the chunk is done
+                    start += len(chunk)
+                    after = chunk[-1], sys.maxsize
+                else:
+                    start = bisect_left(models, key[0], start)
+                    after = key
+        return [row[2:] for row in rows], after
+
+    @staticmethod
+    def wide_spec_rows(conn, kind, models, after, limit):
+        """
+        Returns up to 'limit' spec rows of wide products after a key, as (model, column index, model, spec, value).
+
+        Returns:
+            tuple: (rows, key of the last row), the key is None if the products ran out first.
+        """
+        placeholders = ', '.join('?' * len(models))
+        # the product of the key is only read again if some of its specs are left
+        operator = '>' if after[1] == sys.maxsize else '>='
+        # a product has a row per spec, so 'limit' products are always enough
+        cursor = conn.execute(f"SELECT * FROM {archive_db.archive_tables[kind]} "
+                              f"WHERE model IN ({placeholders}) AND model {operator} ? ORDER BY model LIMIT ?",
+                              (*models, after[0], limit))
+        columns = [description[0] for description in cursor.description]
+        model_index = columns.index('model')
+        rows = []
+        products = cursor.fetchall()
+        for row in products:
+            model = row[model_index]
+            for position, (column, value) in enumerate(zip(columns, row)):
+                if value is not None and column != 'model' and (model, position) > after:
+                    rows.append((model, position, model, column, value))
+                    if len(rows) == limit:
+                        return rows, (model, position)
+        if len(products) < limit:
+            return rows, None
+        # products without specs used up the limit
+        return rows, (products[-1][model_index], sys.maxsize)
+
+    @staticmethod
+    def eav_spec_rows(conn, kind, models, after, limit):
+        """
+        Returns up to 'limit' spec rows of long-form products after a key, as (model, attribute ID, model, spec,
+        value). The brand comes first as attribute 0.
+
+        Returns:
+            tuple: (rows, key of the last row), the key is None if the products ran out first.
+        """
+        placeholders = ', '.join('?' * len(models))
+        # straight from the long-form tables, the view would pivot every attribute of the kind
+        found = conn.execute(f"""
+            SELECT p.model, p.brand, COALESCE(v.attribute_id, 0) AS position, a.name, v.value FROM products p
+            LEFT JOIN product_attribute_values v ON v.product_id = p.product_id
+            LEFT JOIN attributes a ON a.attribute_id = v.attribute_id
+            WHERE p.kind = ? AND p.model IN ({placeholders}) AND (p.model, position) > (?, ?)
+            ORDER BY p.model, position LIMIT ?""", (kind, *models, *after, limit)).fetchall()
+        rows = []
+        for model, brand, attribute_id, name, value in found:
+            if (not rows or rows[-1][0] != model) and (model, 0) > after:
+                rows.append((model, 0, model, 'brand', brand))
+            # products without specs only have their brand
+            if name is not None:
+                rows.append((model, attribute_id, model, name, value))
+        if len(rows) >= limit:
+            return rows[:limit], rows[limit - 1][:2]
+        return rows, None
+
+    def search(self, text, kind=None, limit=50):
+        """
+        Searches model names and spec values, see 'archive_db.search'.
+
+        Returns:
+            list: (kind, brand, model) tuples, best matches first.
+        """
+        with self.connection() as conn:
+            return archive_db.search(conn, text, kind, limit)
+
+    def products_in_ranges(self, kind, ranges, limit=None):
+        """
+        Filters products by ranges of their typed specs, see 'archive_db.products_in_ranges'.
+
+        Returns:
+            list: (brand, model) tuples.
+        """
+        with self.connection() as conn:
+            return archive_db.products_in_ranges(conn, kind, ranges, limit)
+
+    def catalog(self):
+        """
+        Loads the in-memory index of all brands, camera classes and models, see 'archive_catalog.Catalog'.
+
+        The snapshot the scraper saved next to the database is mapped if it matches the archive's catalog
+        version, otherwise the catalog is built from the database.
+
+        Returns:
+            Catalog: The catalog.
+        """
+        with self.connection() as conn:
+            version = archive_db.catalog_version(conn)
+            if version is not None and (catalog := Catalog.open_snapshot(snapshot_path(self.db_path), version)):
+                return catalog
+            return Catalog.load(conn)
+
+    def changed_catalog(self, version):
+        """
+        Loads the catalog again if the archive's catalog version moved on, for guis following a running scrape.
+
+        Args:
+            version (int): Catalog version of the catalog the gui has.
+
+        Returns:
+            Catalog: The current catalog, or None if it is still the same.
+        """
+        with self.connection() as conn:
+            if archive_db.catalog_version(conn) == version:
+                return None
+            return self.catalog()
@@ -0,0 +1,264 @@
+"""
+local read-only HTTP/JSON server over the archive
+lets several people browse CamerAarchive.db without a copy of the file or a Qt install
+Console controlled, see --help
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import archive_db
+from archive_repository import ArchiveRepository
+
+# Adjustable Variables
+db_file = "CamerAarchive.db"  # archive database, opened read-only
+host = "127.0.0.1"  # address to serve on, "0.0.0.0" serves the whole network
+port = 8765  # port to serve on
+pool_size = 8  # database connections shared by the request threads
+page_size = 100  # models per page if the client doesn't ask for a limit
+max_page_size = 1000  # largest page a client may ask for
+response_cache_size = 256  # responses kept in memory until the archive changes
+
+
+def query_param(params, name, default=None, required=False):
+    """
+    Returns a query string parameter.
+
+    Raises:
+        ValueError: If a required parameter is missing.
+    """
+    values = params.get(name)
+    if not values or not values[0]:
+        if required:
+            raise ValueError(f"Missing parameter: {name}")
+        return default
+    return values[0]
+
+
+def kind_param(params, required=True):
+    """
+    Returns the 'kind' parameter, 'camera' or 'lens'.
+
+    Raises:
+        ValueError: If the kind is missing (and required) or unknown.
+    """
+    kind = query_param(params, 'kind', required=required)
+    if kind is not None and kind not in archive_db.archive_tables:
+        raise ValueError(f"Unknown kind: {kind}")
+    return kind
+
+
+def limit_param(params, default):
+    """
+    Returns the 'limit' parameter, capped at 'max_page_size'.
+
+    Raises:
+        ValueError: If the limit isn't a positive number.
+    """
+    try:
+        limit = int(query_param(params, 'limit', default))
+    except ValueError:
+        raise ValueError("The limit has to be a number") from None
+    if limit < 1:
+        raise ValueError("The limit has to be positive")
+    return min(limit, max_page_size)
+
+
+def get_brands(repository, params):
+    """
+    /brands?kind= : brands of cameras, lenses or both
+    """
+    return {'items': repository.brands(kind_param(params, required=False))}
+
+
+def get_classes(repository, params):
+    """
+    /classes?brand= : camera classes of a brand
+    """
+    return {'items': repository.classes(query_param(params, 'brand', required=True))}
+
+
+def get_products(repository, params):
+    """
+    /products?kind=&brand=&class=&after=&limit= : models of a brand, one page at a time
+
+    Pages are keyset paginated: 'next' is the last model of a full page, passing it as 'after' returns the
+    following page. Unlike an offset, this stays fast on late pages and doesn't skip or repeat models when the
+    archive changes in between.
+    """
+    limit = limit_param(params, page_size)
+    models = repository.products(kind_param(params), query_param(params, 'brand', required=True),
+                                 query_param(params, 'class'), query_param(params, 'after', ''), limit)
+    return {'items': models, 'next': models[-1] if len(models) == limit else None}
+
+
+def get_specs(repository, params):
+    """
+    /specs?kind=&model= : all specs of a product
+
+    Raises:
+        LookupError: If the product doesn't exist.
+    """
+    model = query_param(params, 'model', required=True)
+    if not (specs := repository.product_specs(kind_param(params), model)):
+        raise LookupError(f"Unknown product: {model}")
+    return specs
+
+
+def get_search(repository, params):
+    """
+    /search?q=&kind=&limit= : ranked full-text search over model names and specs
+    """
+    results = repository.search(query_param(params, 'q', required=True), kind_param(params, required=False),
+                                limit_param(params, 50))
+    return {'items': [{'kind': kind, 'brand': brand, 'model': model} for kind, brand, model in results]}
+
+
+endpoints = {
+    '/brands'  : get_brands,
+    '/classes' : get_classes,
+    '/products': get_products,
+    '/specs'   : get_specs,
+    '/search'  : get_search,
+}
+
+
+class ArchiveServer(ThreadingHTTPServer):
+    """
+    HTTP server answering every request on its own thread, with the database connections pooled by an
+    'ArchiveRepository'.
+
+    Responses carry an ETag that changes whenever the archive does: a monitor connection polls SQLite's
+    'data_version', which changes when any other connection (i.e. the scraper) commits. Clients revalidate with
+    If-None-Match and get a 304 while nothing changed, and the server keeps rendered responses in memory until the
+    next change.
+    """
+    daemon_threads = True
+
+    def __init__(self, address, db_path=db_file):
+        """
+        Initializes the server.
+
+        Args:
+            address (tuple): (host, port) to serve on.
+            db_path (str): The archive database.
+        """
+        super().__init__(address, ArchiveRequestHandler)
+        self.repository = ArchiveRepository(db_path, pool_size)
+        self.monitor = archive_db.connect(db_path, read_only=True, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.data_version = None
+        self.generation = 0
+        # ETags from an earlier server process must not match
+        self.instance = os.urandom(4).hex()
+        self.responses = OrderedDict()
+
+    def current_etag(self):
+        """
+        Returns the ETag of the archive's current state, dropping the cached responses if it changed.
+        """
+        with self.lock:
+            data_version = self.monitor.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self.data_version:
+                self.data_version = data_version
+                self.generation += 1
+                self.responses.clear()
+            return f'"{self.instance}-{self.generation}"'
+
+    def cached_response(self, key, etag):
+        """
+        Returns a cached response body, or None.
+        """
+        with self.lock:
+            if (cached := self.responses.get(key)) and cached[0] == etag:
+                self.responses.move_to_end(key)
+                return cached[1]
+        return None
+
+    def cache_response(self, key, etag, body):
+        """
+        Keeps a response body until the archive changes, the least recently used ones are dropped first.
+        """
+        with self.lock:
+            self.responses[key] = etag, body
+            while len(self.responses) > response_cache_size:
+                self.responses.popitem(last=False)
+
+    def server_close(self):
+        super().server_close()
+        self.repository.close()
+        self.monitor.close()
+
+
+class ArchiveRequestHandler(BaseHTTPRequestHandler):
+    """
+    Answers GET requests to the 'endpoints' with JSON.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if (endpoint := endpoints.get(url.path)) is None:
+            self.send_json(404, {'error': f"Unknown endpoint: {url.path}", 'endpoints': list(endpoints)})
+            return
+
+        try:
+            etag = self.server.current_etag()
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+
+            if (body := self.server.cached_response(self.path, etag)) is None:
+                data = endpoint(self.server.repository, parse_qs(url.query))
+                body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+                self.server.cache_response(self.path, etag, body)
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+            return
+        except LookupError as e:
+            self.send_json(404, {'error': str(e)})
+            return
+        except sqlite3.Error as e:
+            # e.g. the database is locked or missing, the client gets an answer instead of a dropped connection
+            self.send_json(500, {'error': f"Database error: {e}"})
+            return
+
+        self.send_body(200, body, etag)
+
+    def send_json(self, status, data):
+        self.send_body(status, json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+    def send_body(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if etag is not None:
+            self.send_header('ETag', etag)
+            # clients may keep the response, but have to revalidate it
+            self.send_header('Cache-Control', 'no-cache')
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Serves CamerAarchive.db read-only as JSON over HTTP")
+    arg_parser.add_argument('--host', default=host, help="address to serve on, 0.0.0.0 for the whole network")
+    arg_parser.add_argument('--port', type=int, default=port, help="port to serve on")
+    arg_parser.add_argument('--db', default=db_file, help="archive database")
+    args = arg_parser.parse_args()
+
+    server = ArchiveServer((args.host, args.port), args.db)
+    print(f"Serving {args.db} on http://{args.host}:{args.port}/ ({', '.join(endpoints)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
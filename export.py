@@ -0,0 +1,174 @@
+"""
+Exports the archive to NDJSON, CSV or Parquet files
+Streams the products in chunks, so memory use doesn't grow with the archive
+Console controlled, see --help
+"""
+
+import argparse
+import csv
+import json
+
+import archive_db
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# Adjustable Variables
+db_file = "CamerAarchive.db"  # archive database, opened read-only
+chunk_size = 500  # products fetched from the database and written at a time
+
+
+def export_query(kind, brands=None, classes=None, changed_since=None):
+    """
+    Builds the query selecting the products of a kind that pass the filters.
+
+    Args:
+        kind (str): 'camera' or 'lens'.
+        brands (list): Only export these brands.
+        classes (list): Only export cameras of these classes (see 'archive_db.camera_classes').
+        changed_since (int): Only export products whose content changed in a scrape run after this one.
+
+    Returns:
+        tuple: (query, params)
+    """
+    conditions, params = [], []
+    if brands:
+        conditions.append(f"brand IN ({', '.join('?' * len(brands))})")
+        params.extend(brands)
+    if classes:
+        conditions.append("model IN (SELECT model FROM cameraClasses "
+                          f"WHERE class IN ({', '.join('?' * len(classes))}))")
+        params.extend(classes)
+    if changed_since is not None:
+        # the ledger's name is brand and model, cutting off the brand gives the model, so the changed products are
+        # looked up by primary key instead of scanning the archive
+        conditions.append("model IN (SELECT substr(model, length(brand) + 2) FROM scrapeLedger "
+                          "WHERE kind = ? AND changed_run_id > ? AND brand IS NOT NULL)")
+        params.extend([kind, changed_since])
+
+    query = f"SELECT * FROM {archive_db.archive_tables[kind]}"
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    return query, params
+
+
+def iter_chunks(cursor):
+    """
+    Yields the remaining rows of a cursor in lists of 'chunk_size' rows.
+    """
+    while rows := cursor.fetchmany(chunk_size):
+        yield rows
+
+
+def write_ndjson(path, columns, chunks):
+    """
+    Writes one JSON object per product and line, leaving out the specs the product doesn't have.
+
+    Returns:
+        int: Number of products written.
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8') as file:
+        for rows in chunks:
+            for row in rows:
+                file.write(json.dumps({column: value for column, value in zip(columns, row) if value is not None},
+                                      ensure_ascii=False) + '\n')
+            count += len(rows)
+    return count
+
+
+def write_csv(path, columns, chunks):
+    """
+    Writes a CSV file with a header row and one row per product.
+
+    Returns:
+        int: Number of products written.
+    """
+    count = 0
+    with open(path, 'w', encoding='utf-8', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(columns)
+        for rows in chunks:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def write_parquet(path, columns, chunks):
+    """
+    Writes a Parquet file with one string column per spec, one row group per chunk.
+
+    Returns:
+        int: Number of products written.
+    """
+    schema = pa.schema([(column, pa.string()) for column in columns])
+    count = 0
+    with pq.ParquetWriter(path, schema) as writer:
+        for rows in chunks:
+            writer.write_table(pa.Table.from_pydict(
+                {column: [row[index] for row in rows] for index, column in enumerate(columns)}, schema=schema))
+            count += len(rows)
+    return count
+
+
+writers = {'ndjson': write_ndjson, 'csv': write_csv, 'parquet': write_parquet}
+
+
+def export(output_prefix, output_format, kinds, brands=None, classes=None, changed_since=None, db_path=db_file):
+    """
+    Exports the archive, one file per kind of product named '<output_prefix>.<kind>.<output_format>'.
+
+    Args:
+        output_prefix (str): Path and name the output files start with.
+        output_format (str): 'ndjson', 'csv' or 'parquet'.
+        kinds (list): 'camera' and/or 'lens'.
+        brands (list): Only export these brands.
+        classes (list): Only export cameras of these classes.
+        changed_since (int): Only export products changed in a scrape run after this one.
+        db_path (str): The archive database.
+
+    Returns:
+        dict: Output file mapped to the number of products written to it.
+    """
+    conn = archive_db.connect(db_path, read_only=True)
+    written = {}
+    try:
+        for kind in kinds:
+            query, params = export_query(kind, brands, classes, changed_since)
+            cursor = conn.execute(query, params)
+            columns = [description[0] for description in cursor.description]
+            path = f"{output_prefix}.{kind}.{output_format}"
+            written[path] = writers[output_format](path, columns, iter_chunks(cursor))
+    finally:
+        conn.close()
+    return written
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description="Exports CamerAarchive.db to NDJSON, CSV or Parquet files")
+    arg_parser.add_argument('--db', default=db_file, help="archive database to export")
+    arg_parser.add_argument('--format', choices=list(writers), default='ndjson', help="output format")
+    arg_parser.add_argument('--output', default='CamerAarchive', help="output file prefix")
+    arg_parser.add_argument('--kind', choices=['camera', 'lens', 'all'], default='all',
+                            help="kind of products to export")
+    arg_parser.add_argument('--brands', nargs='+', help="only export these brands")
+    arg_parser.add_argument('--classes', nargs='+', help="only export cameras of these classes")
+    arg_parser.add_argument('--changed-since', type=int, metavar='RUN_ID',
+                            help="only export products that changed in a scrape run after this one")
+    args = arg_parser.parse_args()
+
+    if args.format == 'parquet' and pa is None:
+        arg_parser.error("Parquet export needs pyarrow, install it or choose another format")
+    if args.classes and args.kind == 'lens':
+        arg_parser.error("--classes only applies to cameras")
+
+    # camera classes only exist for cameras
+    selected_kinds = ['camera'] if args.classes or args.kind == 'camera' else \
+        ['lens'] if args.kind == 'lens' else ['camera', 'lens']
+
+    for output_path, product_count in export(args.output, args.format, selected_kinds, args.brands, args.classes,
+                                             args.changed_since, args.db).items():
+        print(f"Exported {product_count} Products to {output_path}")
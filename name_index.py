@@ -0,0 +1,221 @@
+"""
+type-ahead index over the camera and lens model names
+finds models by prefix, by abbreviation ("a7riv" for "Alpha 7R IV") and despite typos, within milliseconds
+"""
+import heapq
+import math
+import re
+import unicodedata
+from bisect import bisect_left, insort
+from collections import Counter
+
+# Adjustable Variables
+suggestion_limit = 15  # suggestions returned per query
+min_similarity = 0.3  # share of trigrams a name needs in common with a query to be suggested despite typos
+abbreviated_length = 4  # words at least this long only contribute their first letter to a name's abbreviation
+prefix_scan_limit = 2000  # prefix matches looked at per query, only short queries have more
+common_trigram_limit = 1000  # trigrams in more keys than this don't bring up typo matches on their own
+compaction_ratio = 0.25  # share of removed products at which the index is rebuilt without them
+
+# letters and digits are separate words, so "7R" can be typed as "7r" or "7 r"
+word_pattern = re.compile(r'\d+|[^\W\d_]+')
+
+
+def name_words(text):
+    """
+    Splits a name into lowercase words without diacritics, e.g. "Alpha 7R IV" into alpha, 7, r, iv.
+    """
+    text = unicodedata.normalize('NFKD', text.lower())
+    return word_pattern.findall(''.join(char for char in text if not unicodedata.combining(char)))
+
+
+def trigrams(key):
+    """
+    Returns the trigrams of a key, padded so its start and end count as well.
+    """
+    padded = f" {key} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+def display_name(brand, model):
+    """
+    Returns the name a product is suggested as, with its brand unless the model name starts with it already.
+    """
+    return model if model.lower().startswith(brand.lower()) else f"{brand} {model}"
+
+
+class NameIndex:
+    """
+    Suggests products for what has been typed so far.
+
+    Every product gets search keys: its model name without spaces and punctuation ("alpha7riv"), the same with
+    the brand in front ("sonyalpha7riv") and its abbreviation, in which long words only keep their first letter
+    ("a7riv"). A query matches
+        - by prefix: a key, or the model name from any of its words on ("7riv"), starts with the query. Found by
+          binary search in the sorted 'prefixes'.
+        - by similarity: the query shares enough trigrams with a key, which catches typos and abbreviations
+          that are off by a letter. Found through the trigram 'postings'.
+    Prefix matches rank first, the shorter the better, then the most similar names.
+
+    Products can be added and removed one at a time, so the index follows changes of the archive without being
+    rebuilt. Removed products leave empty slots behind, once they make up 'compaction_ratio' of the index it is
+    rebuilt without them.
+
+    Methods:
+        add(kind, brand, model): Adds a product.
+        remove(kind, model): Removes a product.
+        search(text, limit): Suggests products.
+    """
+
+    def __init__(self, entries=()):
+        """
+        Builds the index.
+
+        Args:
+            entries (iterable): (kind, brand, model) of the products, e.g. 'Catalog.entries()'.
+        """
+        self.build(entries)
+
+    def build(self, entries):
+        """
+        Fills the index from scratch.
+        """
+        self.entries = []
+        self.removed = 0
+        self.entry_ids = {}
+        self.keys = []
+        self.postings = {}
+        self.prefixes = []
+        # 'remove' needs sorted prefixes, so duplicates are dropped up front
+        for (kind, model), brand in {(kind, model): brand for kind, brand, model in entries}.items():
+            self.add(kind, brand, model, keep_sorted=False)
+        self.prefixes.sort()
+
+    @staticmethod
+    def search_keys(brand, model):
+        """
+        Returns the trigram keys and the prefix keys of a product.
+        """
+        words = name_words(model)
+        compact = ''.join(words)
+        abbreviation = ''.join(word[0] if word.isalpha() and len(word) >= abbreviated_length else word
+                               for word in words)
+        keys = {compact, ''.join(name_words(brand)) + compact, abbreviation} - {''}
+        prefixes = keys | {''.join(words[index:]) for index in range(1, len(words))}
+        return keys, prefixes
+
+    def add(self, kind, brand, model, keep_sorted=True):
+        """
+        Adds a product, replacing it if it is in the index already.
+
+        Args:
+            kind (str): 'camera' or 'lens'.
+            brand (str): The brand.
+            model (str): The model name.
+            keep_sorted (bool): Keeps 'prefixes' sorted, only the constructor sorts them once at the end instead.
+                Without it, the product must not be in the index yet.
+        """
+        if (kind, model) in self.entry_ids:
+            self.remove(kind, model)
+        entry_id = len(self.entries)
+        keys, prefixes = self.search_keys(brand, model)
+        key_ids = []
+        for key in keys:
+            key_grams = trigrams(key)
+            key_ids.append(len(self.keys))
+            for gram in key_grams:
+                self.postings.setdefault(gram, set()).add(len(self.keys))
+            self.keys.append((entry_id, len(key_grams), key))
+        for prefix in prefixes:
+            if keep_sorted:
+                insort(self.prefixes, (prefix, entry_id))
+            else:
+                self.prefixes.append((prefix, entry_id))
+        self.entries.append((kind, brand, model, key_ids))
+        self.entry_ids[kind, model] = entry_id
+
+    def remove(self, kind, model):
+        """
+        Removes a product, if it is in the index.
+
+        Args:
+            kind (str): 'camera' or 'lens'.
+            model (str): The model name.
+        """
+        if (entry_id := self.entry_ids.pop((kind, model), None)) is None:
+            return
+        kind, brand, model, key_ids = self.entries[entry_id]
+        for key_id in key_ids:
+            key = self.keys[key_id][2]
+            for gram in trigrams(key):
+                self.postings[gram].discard(key_id)
+            self.keys[key_id] = None
+        for prefix in self.search_keys(brand, model)[1]:
+            index = bisect_left(self.prefixes, (prefix, entry_id))
+            if index < len(self.prefixes) and self.prefixes[index] == (prefix, entry_id):
+                del self.prefixes[index]
+        self.entries[entry_id] = None
+        self.removed += 1
+        if self.removed > compaction_ratio * len(self.entries):
+            self.build([entry[:3] for entry in self.entries if entry is not None])
+
+    def search(self, text, limit=suggestion_limit):
+        """
+        Suggests products for a query.
+
+        Args:
+            text (str): What has been typed so far.
+            limit (int): Maximum number of suggestions.
+
+        Returns:
+            list: (kind, brand, model) of the suggested products, best first.
+        """
+        query = ''.join(name_words(text))
+        if not query:
+            return []
+        scores = {}
+
+        # prefix matches score above 1, an exact match above any other one
+        index = bisect_left(self.prefixes, (query,))
+        for prefix, entry_id in self.prefixes[index:index + prefix_scan_limit]:
+            if not prefix.startswith(query):
+                break
+            score = 1 + len(query) / len(prefix)
+            if score > scores.get(entry_id, 0):
+                scores[entry_id] = score
+
+        # prefix matches outrank every similar name
+        if len(scores) >= limit:
+            return self.best_entries(scores, limit)
+
+        # trigram similarity (Jaccard) scores up to 1. A key needs 'required' of the query's trigrams for that, so
+        # it has at least one of its rarest ones: only their postings are collected, the other trigrams are just
+        # looked up for the keys found that way. Trigrams that are common anyway ("mm f") are never collected.
+        query_grams = sorted(trigrams(query), key=lambda gram: len(self.postings.get(gram, ())))
+        required = math.ceil(min_similarity * len(query_grams))
+        collected = [gram for gram in query_grams[:len(query_grams) - required + 1]
+                     if len(self.postings.get(gram, ())) <= common_trigram_limit]
+        shared_grams = Counter()
+        for gram in collected:
+            shared_grams.update(self.postings.get(gram, ()))
+        for gram in query_grams:
+            if gram in collected:
+                continue
+            postings = self.postings.get(gram, ())
+            for key_id in shared_grams:
+                if key_id in postings:
+                    shared_grams[key_id] += 1
+        for key_id, shared in shared_grams.items():
+            entry_id, key_size, key = self.keys[key_id]
+            similarity = shared / (len(query_grams) + key_size - shared)
+            if similarity >= min_similarity and similarity > scores.get(entry_id, 0):
+                scores[entry_id] = similarity
+
+        return self.best_entries(scores, limit)
+
+    def best_entries(self, scores, limit):
+        """
+        Returns the products with the highest scores, best first.
+        """
+        best = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [self.entries[entry_id][:3] for entry_id, score in best]
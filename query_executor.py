@@ -0,0 +1,146 @@
+"""
+runs the database queries of the guis on a thread pool
+keeps the event loop free and drops the results of selections the user already moved past
+"""
+import threading
+
+from PyQt6.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal, pyqtSlot
+
+
+class QueryTask(QRunnable):
+    """
+    Runs one query on a pool thread and hands its result to the executor.
+    """
+
+    def __init__(self, executor, channel, generation, function, args):
+        super().__init__()
+        self.executor = executor
+        self.channel = channel
+        self.generation = generation
+        self.function = function
+        self.args = args
+
+    def run(self):
+        result, error = None, None
+        try:
+            with self.executor.repository.connection() as conn:
+                # superseded while it was still queued
+                if not self.executor.register(self.channel, self.generation, conn):
+                    return
+                try:
+                    result = self.function(*self.args)
+                finally:
+                    self.executor.unregister(self.channel, self.generation)
+        except Exception as e:
+            error = e
+        self.executor.query_finished.emit(self.channel, self.generation, result, error)
+
+
+class QueryExecutor(QObject):
+    """
+    Runs queries on a 'QThreadPool' and delivers their results on the gui thread.
+
+    Every query is submitted on a channel, e.g. 'classes' or 'products', and gets the next generation number of
+    that channel. Submitting a query supersedes the previous one of its channel: its result is dropped when it
+    arrives, it is skipped if it hasn't started yet, and if it is running its SQLite statement is interrupted.
+    So quickly scrolling through a selection only ever shows the results of the last selected entry.
+
+    The queries are functions using the 'ArchiveRepository' (or anything else), the connection they borrow from
+    it is the one the executor interrupts.
+
+    Signals:
+        query_finished: Emitted by the pool threads with (channel, generation, result, error).
+
+    Methods:
+        submit(channel, function, args, callback): Runs function(*args) and passes the result to callback.
+        cancel(channel): Supersedes the query of a channel without submitting a new one.
+    """
+    query_finished = pyqtSignal(str, int, object, object)
+
+    def __init__(self, repository, parent=None):
+        """
+        Initializes the executor.
+
+        Args:
+            repository (ArchiveRepository): Repository the queries borrow their connections from.
+            parent (QObject): Qt parent of the executor.
+        """
+        super().__init__(parent)
+        self.repository = repository
+        self.pool = QThreadPool(self)
+        # more threads would only wait for a connection
+        self.pool.setMaxThreadCount(repository.max_connections)
+        self.generations = {}
+        self.callbacks = {}
+        self.running = {}
+        self.lock = threading.Lock()
+        self.query_finished.connect(self.on_query_finished)
+
+    def submit(self, channel, function, args, callback):
+        """
+        Runs a query on the pool, superseding the previous query of the channel.
+
+        Args:
+            channel (str): The channel.
+            function (callable): The query.
+            args (tuple): Arguments of the query.
+            callback (callable): Called on the gui thread with the result, unless the query gets superseded.
+        """
+        generation = self.cancel(channel)
+        self.callbacks[channel] = callback
+        self.pool.start(QueryTask(self, channel, generation, function, args))
+
+    def cancel(self, channel):
+        """
+        Supersedes the query of a channel and interrupts it if it is running.
+
+        Returns:
+            int: The channel's new generation.
+        """
+        with self.lock:
+            generation = self.generations.get(channel, 0) + 1
+            self.generations[channel] = generation
+            if (conn := self.running.pop(channel, (None, None))[1]) is not None:
+                conn.interrupt()
+        self.callbacks.pop(channel, None)
+        return generation
+
+    def is_current(self, channel, generation):
+        return self.generations.get(channel) == generation
+
+    def register(self, channel, generation, conn):
+        """
+        Notes the connection a query is about to run on, so superseding it can interrupt it.
+
+        Returns:
+            bool: False if the query has been superseded already and shouldn't run at all.
+        """
+        with self.lock:
+            if not self.is_current(channel, generation):
+                return False
+            self.running[channel] = generation, conn
+            return True
+
+    def unregister(self, channel, generation):
+        """
+        Forgets the connection of a finished query, before it goes back to the pool and serves other queries.
+        """
+        with self.lock:
+            if self.running.get(channel, (None,))[0] == generation:
+                del self.running[channel]
+
+    @pyqtSlot(str, int, object, object)
+    def on_query_finished(self, channel, generation, result, error):
+        if not self.is_current(channel, generation):
+            return
+        callback = self.callbacks.pop(channel, None)
+        if error is not None:
+            print(f"Query on {channel} failed: {error}")
+        elif callback is not None:
+            callback(result)
+
+    def wait(self):
+        """
+        Waits for all running queries, e.g. before closing the repository.
+        """
+        self.pool.waitForDone()
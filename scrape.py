@@ -5,11 +5,24 @@ GUI planned in the future
 various interactions via console for control over the process
 """
 
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import multiprocessing
 import os
+import queue
+import re
 import sqlite3
 import sys
+import threading
 import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from html.parser import HTMLParser
+from urllib.parse import urlparse
 
+import requests
 from selenium import webdriver
 from selenium.common import TimeoutException
 from selenium.webdriver.chrome.service import Service
@@ -18,6 +31,45 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from unidecode import unidecode
 
+import archive_catalog
+import archive_db
+
+# Adjustable Variables
+db_file = "CamerAarchive.db"  # archive database file
+available_brands = ['Nikon', 'Sony', 'Canon', 'Leica', 'Fujifilm']  # brands offered for scraping
+pool_size = 1  # number of parallel workers (browser or HTTP sessions) for datasheet pages (1 = no pool)
+site_root = "https://www.digitalkamera.de/"  # used to seed worker sessions with the consent cookies
+engine = "selenium"  # datasheet engine: "selenium" renders pages in Chrome, "http" downloads and parses them
+crawl_mode = "loop"  # "loop" (sequential or pool), "async" (asyncio engine) or "pipeline" (fetch/parse/write stages)
+max_concurrency = 8  # datasheet requests in flight at once in the asyncio engine
+host_rate_limit = 4.0  # requests per second per host in the asyncio engine
+host_burst = 4  # requests a host may get in a burst before the rate limit applies
+write_queue_size = 100  # scraped pages waiting for the database before fetching pauses
+pipeline_queue_size = 50  # pages each pipeline queue (fetch -> parse, parse -> write) holds before blocking
+parse_threads = 2  # parse stage threads of the pipeline
+queue_report_interval = 5  # seconds between queue depth reports of the pipeline
+write_batch_size = 50  # products committed per database transaction
+storage_mode = "wide"  # "wide" (one column per spec) or "eav" (products/attributes/values tables behind wide views)
+column_alias_rules = [
+    (r'[^A-Za-z0-9_]+', '_'),  # characters SQL doesn't allow in bare column names
+    (r'__+', '_'),  # punctuation variants of the same legend ('inkl. Akku' / 'inkl Akku')
+    (r'^_+|_+$', ''),
+]  # regex substitutions turning a transformed legend into its column name
+column_aliases = {}  # column name -> column it is merged into, for variants the rules don't catch
+ledger_max_age = 7 * 24 * 60 * 60  # seconds a scraped link stays fresh and is skipped by the next run
+html_cache_dir = "html_cache"  # raw datasheet HTML cache for offline re-parsing, None disables it
+html_cache_max_bytes = 512 * 1024 * 1024  # size limit of the compressed HTML cache
+parse_processes = None  # processes parsing the cache in rebuild mode (None = one per core)
+http_timeout = 20  # seconds before an HTTP datasheet request is given up
+http_headers = {
+    "User-Agent"     : "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) "
+                       "Chrome/118.0.5993.70 Safari/537.36",
+    "Accept-Language": "de-DE,de;q=0.9",
+}
+
+# the aliases by lowercase column name, as 'normalize_column_name' looks them up
+column_alias_keys = {alias.lower(): column for alias, column in column_aliases.items()}
+
 
 class UserInteraction:
     """
@@ -40,7 +92,7 @@ class UserInteraction:
             tuple: A tuple containing a list of selected camera brands and a boolean indicating whether to scrape
             lenses.
         """
-        brands = ['Nikon', 'Sony', 'Canon', 'Leica', 'Fujifilm']
+        brands = list(available_brands)
         selected_brands = []
         scrape_lenses = False
 
@@ -220,6 +272,651 @@ class UserInteraction:
             print()
 
 
+class DatasheetNode:
+    """
+    Minimal element node built by the DatasheetParser.
+
+    Only offers what the datasheet extraction needs: descendant lookup by tag or class, direct child elements and
+    a rendered text that follows the rules of Selenium's 'WebElement.text' closely enough for the datasheet cells
+    (collapsed whitespace, line breaks for <br> and block elements, stripped lines).
+    """
+
+    block_tags = {'address', 'article', 'aside', 'blockquote', 'dd', 'div', 'dl', 'dt', 'fieldset', 'figcaption',
+                  'figure', 'footer', 'form', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'hr', 'li', 'main',
+                  'nav', 'ol', 'p', 'pre', 'section', 'table', 'tbody', 'thead', 'tfoot', 'tr', 'ul'}
+    hidden_tags = {'script', 'style', 'template', 'noscript'}
+
+    def __init__(self, tag, attrs, parent=None):
+        self.tag = tag
+        self.attrs = dict(attrs)
+        self.parent = parent
+        self.children = []
+
+    @property
+    def classes(self):
+        return (self.attrs.get('class') or '').split()
+
+    def elements(self):
+        """
+        Returns the direct child elements, skipping text nodes.
+        """
+        return [child for child in self.children if isinstance(child, DatasheetNode)]
+
+    def iter_descendants(self):
+        """
+        Yields all descendant elements in document order.
+        """
+        for child in self.elements():
+            yield child
+            yield from child.iter_descendants()
+
+    def find_all(self, tag):
+        return [node for node in self.iter_descendants() if node.tag == tag]
+
+    def find(self, tag=None, class_name=None):
+        for node in self.iter_descendants():
+            if (tag is None or node.tag == tag) and (class_name is None or class_name in node.classes):
+                return node
+        return None
+
+    @property
+    def text(self):
+        parts = []
+        self._collect_text(parts)
+        lines = (' '.join(line.split()) for line in ''.join(parts).split('\n'))
+        return '\n'.join(line for line in lines if line)
+
+    def _collect_text(self, parts):
+        if self.tag in self.hidden_tags:
+            return
+        if self.tag == 'br':
+            parts.append('\n')
+            return
+        block = self.tag in self.block_tags
+        if block:
+            parts.append('\n')
+        for child in self.children:
+            if isinstance(child, DatasheetNode):
+                child._collect_text(parts)
+                if child.tag in ('td', 'th'):
+                    parts.append(' ')
+            else:
+                parts.append(' '.join(child.split('\n')))
+        if block:
+            parts.append('\n')
+
+
+class DatasheetParser(HTMLParser):
+    """
+    Builds a DatasheetNode tree of the first '.dkDataSheet' element of a page.
+
+    Everything outside the datasheet is skipped. Like a browser, the parser closes implied end tags of table cells,
+    rows and paragraphs and wraps bare table rows in a tbody, so descendant lookups match what the rendered DOM
+    returns.
+    """
+
+    void_tags = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'param', 'source',
+                 'track', 'wbr'}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = None
+        self.stack = []
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if self.done:
+            return
+        if not self.stack:
+            if 'dkDataSheet' in (dict(attrs).get('class') or '').split():
+                self.root = DatasheetNode(tag, attrs)
+                if tag not in self.void_tags:
+                    self.stack.append(self.root)
+            return
+
+        self.close_implied(tag)
+        if tag == 'tr' and self.stack[-1].tag == 'table':
+            self.open_node('tbody', [])
+        self.open_node(tag, attrs)
+        if tag in self.void_tags:
+            self.stack.pop()
+
+    def handle_startendtag(self, tag, attrs):
+        # browsers ignore the self-closing slash, '<td/>' still opens a cell
+        self.handle_starttag(tag, attrs)
+
+    def handle_endtag(self, tag):
+        if not self.stack:
+            return
+        for depth in range(len(self.stack) - 1, -1, -1):
+            if self.stack[depth].tag == tag:
+                del self.stack[depth:]
+                break
+            # an end tag never closes elements outside of the table it belongs to
+            if self.stack[depth].tag == 'table' and tag != 'table':
+                return
+        if not self.stack:
+            self.done = True
+
+    def handle_data(self, data):
+        if self.stack:
+            self.stack[-1].children.append(data)
+
+    def open_node(self, tag, attrs):
+        node = DatasheetNode(tag, attrs, self.stack[-1])
+        self.stack[-1].children.append(node)
+        self.stack.append(node)
+        return node
+
+    def close_implied(self, tag):
+        """
+        Closes open elements whose end tag is implied by the start of 'tag'.
+        """
+        if tag in ('td', 'th'):
+            closes, scope = ('td', 'th'), ('tr', 'table')
+        elif tag == 'tr':
+            closes, scope = ('tr', 'td', 'th'), ('tbody', 'thead', 'tfoot', 'table')
+        elif tag in ('tbody', 'thead', 'tfoot'):
+            closes, scope = ('tbody', 'thead', 'tfoot', 'tr', 'td', 'th'), ('table',)
+        elif tag == 'li':
+            closes, scope = ('li', 'p'), ('ul', 'ol', 'td', 'th', 'table')
+        elif tag in ('p', 'div', 'table', 'ul', 'ol'):
+            closes, scope = ('p',), ('td', 'th', 'table', 'div', 'ul', 'ol', 'li')
+        else:
+            return
+
+        for depth in range(len(self.stack) - 1, 0, -1):
+            node_tag = self.stack[depth].tag
+            if node_tag in scope:
+                return
+            if node_tag in closes:
+                del self.stack[depth:]
+                return
+
+
+def parse_datasheet_html(html):
+    """
+    Parses a datasheet page and returns its rows in the shape the info builders expect.
+
+    Args:
+        html (str): Source of a digitalkamera.de datasheet page.
+
+    Returns:
+        list: One dict per 'tr' below the datasheet's tbody (see 'datasheet_rows'), or None if the page has no
+        datasheet.
+    """
+    parser = DatasheetParser()
+    parser.feed(html)
+    parser.close()
+
+    if parser.root is None:
+        return None
+
+    tbody = parser.root.find('tbody') or parser.root
+    return datasheet_rows(tbody.find_all('tr'))
+
+
+# Serializes the rows of a datasheet element (arguments[0]) the same way as 'datasheet_rows', in one round trip,
+# along with the page source for the HTML cache if arguments[1] is set
+datasheet_script = r"""
+const sheet = arguments[0];
+const tbody = sheet.querySelector('tbody') || sheet;
+const text = el => (el.getClientRects().length ? el.innerText : '')
+    .split('\n')
+    .map(line => line.replace(/\s+/g, ' ').trim())
+    .filter(line => line)
+    .join('\n');
+const rows = Array.from(tbody.querySelectorAll('tr'), tr => {
+    const colData = tr.querySelector('.colData1');
+    return {
+        colData1: colData ? text(colData) : null,
+        cells: Array.from(tr.querySelectorAll('td'), td => {
+            const table = td.querySelector('table');
+            return {
+                text: text(td),
+                table: table ? Array.from(table.querySelectorAll('tr'),
+                                          subRow => Array.from(subRow.querySelectorAll('td'), text)) : null,
+                children: Array.from(td.children, text),
+            };
+        }),
+    };
+});
+return {rows: rows, html: arguments[1] ? document.documentElement.outerHTML : null};
+"""
+
+
+def datasheet_rows(tr_nodes):
+    """
+    Serializes datasheet rows into plain dicts.
+
+    Mirrors the WebDriver lookups of the original extraction: 'cells' are all descendant tds of the row, 'table'
+    holds the td texts per tr of the first nested table of a cell and 'children' the texts of its direct child
+    elements.
+
+    Args:
+        tr_nodes (list): DatasheetNode rows.
+
+    Returns:
+        list: Row dicts with the keys 'colData1' and 'cells'.
+    """
+    rows = []
+    for tr in tr_nodes:
+        col_data = tr.find(class_name='colData1')
+        cells = []
+        for td in tr.find_all('td'):
+            nested_table = td.find('table')
+            cells.append({
+                'text'    : td.text,
+                'table'   : [[col.text for col in sub_row.find_all('td')] for sub_row in nested_table.find_all('tr')]
+                if nested_table is not None else None,
+                'children': [child.text for child in td.elements()],
+            })
+        rows.append({'colData1': col_data.text if col_data is not None else None, 'cells': cells})
+    return rows
+
+
+def content_hash(brand, model, info):
+    """
+    Hashes the extracted content of a datasheet.
+
+    The hash is taken over the parsed product rather than the page source, so it only changes when the specs do
+    and is the same for both engines.
+
+    Args:
+        brand (str): The brand of the product.
+        model (str): The model name of the product.
+        info (dict): Legend/data pairs of the product.
+
+    Returns:
+        str: Hex digest of the product content.
+    """
+    content = json.dumps([brand, model, info], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+def normalize_column_name(name):
+    """
+    Turns a datasheet legend (or an existing column name) into its column name.
+
+    The legend is transliterated, spaces and punctuation are replaced like the archive always did, then the
+    'column_alias_rules' and 'column_aliases' are applied. Existing column names come out unchanged unless the
+    rules or aliases merge them into another column.
+
+    Args:
+        name (str): The legend or column name.
+
+    Returns:
+        str: The column name.
+    """
+    column_name = unidecode(name).replace(' ', '_').replace('(', '').replace(')', '').replace('.', '_') \
+        .replace('*', '').replace('-', '_').replace(',', '_').replace('/', '_').replace('"', '')
+    for pattern, replacement in column_alias_rules:
+        column_name = re.sub(pattern, replacement, column_name)
+    return column_alias_keys.get(column_name.lower(), column_name)
+
+
+def build_camera_info(rows, debug=False):
+    """
+    Builds brand, model and the legend/data dictionary of a camera datasheet.
+
+    Args:
+        rows (list): Serialized datasheet rows (see 'datasheet_rows').
+        debug (bool): Prints every legend/data pair if enabled.
+
+    Returns:
+        tuple: (brand, model, info) with info being a dictionary of legend/data pairs.
+    """
+    brand_model = rows[0]['colData1']
+    if brand_model is None:
+        raise ValueError("Datasheet has no brand/model row")
+
+    brand_model_split = brand_model.split(' ', 1)
+
+    brand = brand_model_split[0]
+    model = brand_model_split[1]
+
+    info = {}
+
+    for row in rows[1:]:
+        try:
+            elements = row['cells']
+            legend = elements[0]['text']
+            if (nested_table := elements[1]['table']) is not None:
+                # If there's a nested table, concatenate the tds of each of its rows
+                data = [', '.join(sub_row) for sub_row in nested_table]
+            else:
+                data = elements[1]['text']
+            if debug:
+                print(UserInteraction.format_print("UPDATE", f"{legend} = {data}"))
+            if legend is not None and data is not None and not legend[0].isdigit():
+                info[legend] = data
+            elif debug:
+                print("Couldn't populate info")
+        except Exception as e:
+            if debug:
+                print(f"An error occurred trying to get legend/data pairs: {e}")
+            continue
+
+    return brand, model, info
+
+
+def build_lens_info(rows, debug=False):
+    """
+    Builds brand, model and the legend/data dictionary of a lens datasheet.
+
+    Args:
+        rows (list): Serialized datasheet rows (see 'datasheet_rows').
+        debug (bool): Prints every legend/data pair and rows that couldn't be used if enabled.
+
+    Returns:
+        tuple: (brand, model, info) with info being a dictionary of legend/data pairs.
+    """
+    brand = rows[0]['colData1']
+    model = rows[1]['colData1']
+    if brand is None or model is None:
+        raise ValueError("Datasheet has no brand/model rows")
+
+    info = {}
+
+    for index, row in enumerate(rows[2:]):
+        try:
+            elements = row['cells']
+            if len(elements) > 1:
+                legend = elements[0]['text']
+
+                # If there's a nested table, concatenate all of its tds
+                if (nested_table := elements[1]['table']) is not None:
+                    data = ', '.join(col for sub_row in nested_table for col in sub_row)
+                # If there are multiple direct elements (links, br-separated text), concatenate them
+                elif len(children := elements[1]['children']) > 1:
+                    data = ', '.join(children)
+                else:
+                    data = elements[1]['text']
+                if debug:
+                    print(UserInteraction.format_print("UPDATE", f"{legend} = {data}"))
+
+                if legend and data and not legend[0].isdigit():
+                    info[legend] = data
+                elif debug:
+                    print("Couldn't populate info")
+            elif debug:
+                print(f"\nError Trace-> Row {index + 2} doesn't have at least 2 elements.")
+                print(f"Text: {[element['text'] for element in elements]}")
+        except Exception as e:
+            if debug:
+                print(f"Error occurred in row {index + 2} trying to get legend/data pairs: {e}")
+            continue
+
+    return brand, model, info
+
+
+class HtmlCache:
+    """
+    Content-addressed, compressed on-disk cache of fetched datasheet HTML.
+
+    Pages are stored gzip-compressed under the SHA-256 of their source, so identical pages share one file. A small
+    SQLite index next to the files maps each URL to its content hash and kind and tracks the last access for
+    least-recently-used eviction once the cache grows beyond its size limit. The cache can be used from several
+    worker threads and processes (brand shards) at once: the index is in WAL mode, and every store checks for its
+    file, records the page and evicts in one write transaction, computing the cache size from the index, so no
+    process evicts a file another one is just recording a page for.
+    """
+
+    def __init__(self, directory, max_bytes):
+        """
+        Opens (and creates if needed) the cache in the given directory.
+
+        Args:
+            directory (str): Directory holding the cache files and index.
+            max_bytes (int): Size limit for the compressed files, older pages are evicted beyond it.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+        os.makedirs(os.path.join(directory, 'objects'), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(directory, 'index.db'), timeout=archive_db.busy_timeout,
+                                    check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS pages (
+            url TEXT PRIMARY KEY,
+            kind TEXT,
+            content_hash TEXT,
+            stored_at REAL,
+            last_access REAL
+            );
+            CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access);
+            CREATE INDEX IF NOT EXISTS pages_content_hash ON pages (content_hash);
+            CREATE TABLE IF NOT EXISTS blobs (
+            content_hash TEXT PRIMARY KEY,
+            size INTEGER
+            );
+        """)
+
+    def blob_path(self, content_hash):
+        return os.path.join(self.directory, 'objects', content_hash[:2], f"{content_hash}.html.gz")
+
+    def store(self, url, kind, html):
+        """
+        Stores the source of a page, replacing what was cached for the URL before.
+
+        Args:
+            url (str): Link of the datasheet.
+            kind (str): 'camera' or 'lens'.
+            html (str): Page source.
+        """
+        data = html.encode('utf-8')
+        content_hash = hashlib.sha256(data).hexdigest()
+        path = self.blob_path(content_hash)
+        now = time.time()
+
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with self.lock:
+            written = False
+            try:
+                # takes the write lock up front, other processes can't evict in between
+                self.conn.execute("BEGIN IMMEDIATE")
+                if (compressed := self.record_page(url, kind, content_hash, data, path, now)) is not None:
+                    # the file comes last, so only a failing commit can leave it behind
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    # unique per process, shards may write the same page at once
+                    with open(temp_path, 'wb') as file:
+                        file.write(compressed)
+                    os.replace(temp_path, path)
+                    written = True
+                self.conn.commit()
+            except (sqlite3.OperationalError, OSError) as e:
+                # the page itself is scraped fine, it just isn't cached
+                self.conn.rollback()
+                if written:
+                    os.remove(path)
+                elif os.path.exists(temp_path):
+                    os.remove(temp_path)
+                print(UserInteraction.format_print("CACHE", f"Couldn't cache {url}: {e}"))
+
+    def record_page(self, url, kind, content_hash, data, path, now):
+        """
+        Records a page and evicts old ones, inside the write transaction of 'store'.
+
+        Returns:
+            bytes: The compressed page if its file has to be written, None if it is stored already.
+        """
+        compressed = None
+        # a file missing after a failed commit is written again
+        if (not self.conn.execute("SELECT 1 FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone()
+                or not os.path.exists(path)):
+            compressed = gzip.compress(data)
+            self.conn.execute("INSERT OR REPLACE INTO blobs (content_hash, size) VALUES (?, ?)",
+                              (content_hash, len(compressed)))
+
+        previous = self.conn.execute("SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+        self.conn.execute("""
+            INSERT INTO pages (url, kind, content_hash, stored_at, last_access) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                kind = excluded.kind, content_hash = excluded.content_hash,
+                stored_at = excluded.stored_at, last_access = excluded.last_access
+        """, (url, kind, content_hash, now, now))
+        if previous and previous[0] != content_hash:
+            self.drop_unreferenced(previous[0])
+
+        self.evict()
+        if compressed is not None and not self.conn.execute("SELECT 1 FROM blobs WHERE content_hash = ?",
+                                                            (content_hash,)).fetchone():
+            # larger than the whole cache, evicted right away
+            return None
+        return compressed
+
+    def load(self, url):
+        """
+        Returns the cached source of a page.
+
+        Args:
+            url (str): Link of the datasheet.
+
+        Returns:
+            str: The page source, or None if the URL isn't cached.
+        """
+        with self.lock:
+            row = self.conn.execute("SELECT content_hash FROM pages WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            try:
+                self.conn.execute("UPDATE pages SET last_access = ? WHERE url = ?", (time.time(), url))
+                self.conn.commit()
+            except sqlite3.OperationalError:
+                # only the eviction order suffers
+                self.conn.rollback()
+        try:
+            return read_cached_html(self.blob_path(row[0]))
+        except FileNotFoundError:
+            # evicted by another process in the meantime
+            return None
+
+    def entries(self):
+        """
+        Lists all cached pages.
+
+        Returns:
+            list: (url, kind, blob path) tuples.
+        """
+        with self.lock:
+            rows = self.conn.execute("SELECT url, kind, content_hash FROM pages ORDER BY url").fetchall()
+        return [(url, kind, self.blob_path(content_hash)) for url, kind, content_hash in rows]
+
+    def evict(self):
+        """
+        Drops the least recently used pages until the cache fits its size limit again, inside the write
+        transaction of 'store'.
+        """
+        total_size = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        while total_size > self.max_bytes:
+            row = self.conn.execute("SELECT url, content_hash FROM pages ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            self.conn.execute("DELETE FROM pages WHERE url = ?", (row[0],))
+            total_size -= self.drop_unreferenced(row[1])
+
+    def drop_unreferenced(self, content_hash):
+        """
+        Deletes a stored file once no URL refers to it anymore.
+
+        Returns:
+            int: Bytes freed.
+        """
+        if self.conn.execute("SELECT 1 FROM pages WHERE content_hash = ? LIMIT 1", (content_hash,)).fetchone():
+            return 0
+        row = self.conn.execute("SELECT size FROM blobs WHERE content_hash = ?", (content_hash,)).fetchone()
+        self.conn.execute("DELETE FROM blobs WHERE content_hash = ?", (content_hash,))
+        try:
+            os.remove(self.blob_path(content_hash))
+        except FileNotFoundError:
+            pass
+        return row[0] if row else 0
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def read_cached_html(path):
+    """
+    Reads and decompresses a cached page source.
+    """
+    with open(path, 'rb') as file:
+        return gzip.decompress(file.read()).decode('utf-8')
+
+
+def parse_cached_datasheet(job):
+    """
+    Parses a cached datasheet, meant to run in a worker process of the cache rebuild.
+
+    Args:
+        job (tuple): (url, kind, blob path) as returned by 'HtmlCache.entries'.
+
+    Returns:
+        tuple: (url, kind, product, error) with product being (brand, model, info), or None and the error message
+        if the page couldn't be parsed.
+    """
+    url, kind, path = job
+    try:
+        rows = parse_datasheet_html(read_cached_html(path))
+        if not rows:
+            raise ValueError("No datasheet found")
+        product = build_camera_info(rows) if kind == 'camera' else build_lens_info(rows)
+        return url, kind, product, None
+    except Exception as e:
+        return url, kind, None, str(e)
+
+
+class TokenBucket:
+    """
+    Token bucket limiting the request rate to one host in the asyncio crawl.
+
+    The bucket holds up to 'burst' tokens and refills at 'rate' tokens per second, every request takes one token
+    and waits for the refill if the bucket is empty. Only used from the event loop, so it needs no locking.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def shard_path(archive_path, brand):
+    """
+    Returns the shard database file of a brand, next to the archive.
+    """
+    return f"{os.path.splitext(archive_path)[0]}.{brand}.db"
+
+
+def scrape_shard(archive_path, brand, options, run_id, storage):
+    """
+    Scrapes one brand into its shard database, meant to run in a worker process of 'Scrape.run_sharded'.
+
+    Args:
+        archive_path (str): The archive database, its ledger seeds the shard's.
+        brand (str): The brand to scrape.
+        options (dict): Keyword arguments for 'Scrape.configure' besides the brands.
+        run_id (int): The archive's scrape run the shard writes into.
+        storage (str): Storage mode of the archive, the shard has to match it.
+    """
+    scrape = Scrape(shard_path(archive_path, brand), storage)
+    scrape.configure([brand], **options)
+    scrape.run(run_id, ledger_source=archive_path)
+
+
 class Scrape:
     """
     Manages the web scraping process for camera and lens data.
@@ -230,11 +927,16 @@ class Scrape:
 
     """
 
-    def __init__(self):
+    def __init__(self, db_path=db_file, storage=storage_mode):
         """
         Initializes the Scrape instance.
+
+        Args:
+            db_path (str): Database file to scrape into, brand shards use their own files.
+            storage (str): "wide" or "eav", see 'storage_mode'.
         """
-        return
+        self.db_path = db_path
+        self.storage = storage
 
     def main(self):
         """
@@ -248,13 +950,273 @@ class Scrape:
         self.headless_mode = UserInteraction.enable_headless()
         self.skip_cameras = UserInteraction.skip_camera_scraping()
         self.progress_log_enabled, self.debug_log_enabled = UserInteraction.enable_feedback()
+        self.run()
+
+    def configure(self, brands, scrape_lenses=False, headless=True, skip_cameras=False, progress_log=True,
+                  debug_log=False):
+        """
+        Sets the scraping options without asking, for non-interactive runs.
+
+        Args:
+            brands (list): Brands to scrape.
+            scrape_lenses (bool): Whether to scrape lenses.
+            headless (bool): Whether to run the web driver in headless mode.
+            skip_cameras (bool): Whether to skip camera scraping.
+            progress_log (bool): Whether to print progress updates.
+            debug_log (bool): Whether to print debug logs as well.
+        """
+        self.selected_brands = list(brands)
+        self.scrape_lenses = scrape_lenses
+        self.headless_mode = headless
+        self.skip_cameras = skip_cameras
+        self.progress_log_enabled = progress_log
+        self.debug_log_enabled = progress_log and debug_log
+
+    def run(self, run_id=None, ledger_source=None):
+        """
+        Runs the configured scrape: database setup, link gathering and datasheet scraping.
+
+        Args:
+            run_id (int): Scrape run to write into instead of starting one, used by brand shards.
+            ledger_source (str): Database whose scrape ledger is copied first, used by brand shards.
+        """
+        self.setup_db()
+        if ledger_source:
+            self.seed_ledger(ledger_source)
+        if run_id is None:
+            self.start_run(self.selected_brands)
+        else:
+            self.join_run(run_id)
+        try:
+            self.driver = self.setup_driver(self.headless_mode)
+            self.scrape_for_links()
+            # the http engine reuses the consent cookies the browser got on the link pages
+            self.session = self.setup_session(self.driver.get_cookies()) if engine == "http" else None
+            if crawl_mode == "async":
+                self.process_links_async()
+            elif crawl_mode == "pipeline":
+                self.process_links_pipeline()
+            else:
+                self.process_cameras(self.skip_cameras)
+            if run_id is None:
+                self.finish_run()
+            # self.driver.quit()
+        except KeyboardInterrupt:
+            print(UserInteraction.format_print("STOPPED", "Scraping interrupted, saving completed products"))
+        finally:
+            # commit the last batch so no completed page is lost
+            self.flush_writes()
+            # brand shards are merged into the archive, which saves the snapshot then
+            if run_id is None:
+                self.save_catalog_snapshot()
+
+    def run_sharded(self):
+        """
+        Scrapes the configured brands in parallel, one process and one shard database per brand.
+
+        Every shard process scrapes into its own SQLite file (see 'shard_path'), so the processes never wait for
+        each other's write locks. Once all of them are done the shards are merged into the archive with
+        'merge_shards' and deleted. All shards write into one scrape run of the archive; if the crawl is
+        interrupted, the shards scraped so far are still merged and the run is resumed next time.
+        """
+        self.setup_db()
+        self.start_run(self.selected_brands)
+        options = {'scrape_lenses': self.scrape_lenses, 'headless': self.headless_mode,
+                   'skip_cameras' : self.skip_cameras, 'progress_log': self.progress_log_enabled,
+                   'debug_log'    : self.debug_log_enabled}
+        shard_paths = [shard_path(self.db_path, brand) for brand in self.selected_brands]
+
+        if self.progress_log_enabled:
+            print(UserInteraction.format_print("SHARDS", f"Scraping {len(shard_paths)} Brands in parallel"))
+
+        completed = False
+        try:
+            with ProcessPoolExecutor(max_workers=len(self.selected_brands)) as executor:
+                futures = {executor.submit(scrape_shard, self.db_path, brand, options, self.run_id,
+                                           self.storage): brand
+                           for brand in self.selected_brands}
+                for future in as_completed(futures):
+                    try:
+                        future.result()
+                        if self.progress_log_enabled:
+                            print(UserInteraction.format_print("SHARDS", f"Finished: {futures[future]}"))
+                    except Exception as e:
+                        print(UserInteraction.format_print("ERROR", f"Shard {futures[future]} failed: {e}"))
+            completed = True
+        except KeyboardInterrupt:
+            print(UserInteraction.format_print("STOPPED", "Scraping interrupted, merging completed shards"))
+        finally:
+            self.merge_shards([path for path in shard_paths if os.path.exists(path)])
+            if completed:
+                self.finish_run()
+            self.save_catalog_snapshot()
+
+    def merge_shards(self, paths):
+        """
+        Merges brand shard databases into the archive and deletes them.
+
+        Every shard is attached and copied with bulk 'INSERT ... SELECT' upserts. The dynamic column sets are
+        reconciled first: columns a shard has that the archive lacks are added to the archive, columns only the
+        archive has are left alone, and a NULL in the shard never overwrites a value of the archive, just like a
+        spec missing from a datasheet doesn't in 'upsert_specs'. The scrape ledger is merged the same way, the
+        spec history with 'merge_shard_history'.
+        Archives in long-form storage are merged with 'merge_shard_attributes' instead.
+
+        Args:
+            paths (list): Shard database files.
+        """
+        self.flush_writes()
+
+        for path in paths:
+            if self.progress_log_enabled:
+                print(UserInteraction.format_print("MERGE", f"Merging Shard: {path}"))
+
+            self.c.execute("ATTACH DATABASE ? AS shard", (path,))
+            try:
+                if self.storage == "eav":
+                    self.merge_shard_attributes()
+                for table in (() if self.storage == "eav" else ('camerAarchive', 'lensAarchive')):
+                    self.c.execute(f"PRAGMA shard.table_info('{table}')")
+                    columns = [tup[1] for tup in self.c.fetchall()]
+                    if not columns:
+                        continue
+                    self.add_missing_columns(table, columns)
+                    self.merge_shard_table(table, columns, 'model')
+
+                self.c.execute("PRAGMA shard.table_info('scrapeLedger')")
+                if columns := [tup[1] for tup in self.c.fetchall()]:
+                    self.merge_shard_table('scrapeLedger', columns, 'url')
+                self.merge_shard_history()
+                self.conn.commit()
+            finally:
+                self.c.execute("DETACH DATABASE shard")
+
+            for suffix in ('', '-journal', '-wal', '-shm'):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+        if self.storage == "eav":
+            # the shards may have brought new attributes along
+            self.load_schema()
+            self.views_outdated = True
+            self.flush_writes()
+
+        # the bulk upserts bypass 'upsert_specs', so everything derived from the specs is rebuilt
+        archive_db.rebuild_derived_tables(self.conn)
+        self.conn.commit()
+
+    def merge_shard_table(self, table, columns, key):
+        """
+        Upserts all rows of a table of the attached shard into the archive.
+
+        Args:
+            table (str): Table present in both databases.
+            columns (list): Columns of the shard table, all of them present in the archive table.
+            key (str): The table's primary key column.
+        """
+        column_list = ', '.join(f'"{column}"' for column in columns)
+        update_statements = ', '.join(f'"{column}" = COALESCE(excluded."{column}", "{column}")'
+                                      for column in columns if column != key)
+        # 'WHERE true' keeps the ON CONFLICT clause from being parsed as a join constraint
+        self.c.execute(f'''INSERT INTO main.{table} ({column_list})
+                           SELECT {column_list} FROM shard.{table} WHERE true
+                           ON CONFLICT({key}) DO UPDATE SET {update_statements}''')
+
+    def merge_shard_attributes(self):
+        """
+        Upserts the long-form tables of the attached shard into the archive.
+
+        Product and attribute ids differ between the databases, so products are matched by kind and model and
+        attributes by name.
+        """
+        self.c.execute("SELECT 1 FROM shard.sqlite_master WHERE name = 'product_attribute_values'")
+        if not self.c.fetchone():
+            return
+
+        # 'WHERE true' keeps the ON CONFLICT clauses from being parsed as join constraints
+        self.c.execute("""INSERT INTO main.attributes (name) SELECT name FROM shard.attributes WHERE true
+                          ON CONFLICT(name) DO NOTHING""")
+        self.c.execute("""INSERT INTO main.products (kind, brand, model)
+                          SELECT kind, brand, model FROM shard.products WHERE true
+                          ON CONFLICT(kind, model) DO UPDATE SET brand = COALESCE(excluded.brand, brand)""")
+        self.c.execute("""INSERT INTO main.product_attribute_values (product_id, attribute_id, value)
+                          SELECT p.product_id, a.attribute_id, v.value
+                          FROM shard.product_attribute_values v
+                          JOIN shard.products sp ON sp.product_id = v.product_id
+                          JOIN shard.attributes sa ON sa.attribute_id = v.attribute_id
+                          JOIN main.products p ON p.kind = sp.kind AND p.model = sp.model
+                          JOIN main.attributes a ON a.name = sa.name
+                          WHERE true
+                          ON CONFLICT(product_id, attribute_id) DO UPDATE SET value = excluded.value""")
+
+    def merge_shard_history(self):
+        """
+        Copies the spec history of the attached shard into the archive.
+
+        A shard starts out empty, so its history holds every spec it scraped. Only the values that differ from the
+        archive's history up to the shard's run are copied, which keeps the history limited to actual changes.
+        """
+        self.c.execute("SELECT 1 FROM shard.sqlite_master WHERE name = 'specHistory'")
+        if not self.c.fetchone():
+            return
+
+        self.c.execute("""INSERT OR REPLACE INTO main.specHistory (kind, model, attribute, run_id, value)
+                          SELECT s.kind, s.model, s.attribute, s.run_id, s.value FROM shard.specHistory s
+                          WHERE s.value IS NOT (SELECT h.value FROM main.specHistory h
+                                                WHERE h.kind = s.kind AND h.model = s.model
+                                                AND h.attribute = s.attribute AND h.run_id <= s.run_id
+                                                ORDER BY h.run_id DESC LIMIT 1)""")
+
+    def rebuild_from_cache(self):
+        """
+        Re-parses every cached datasheet and re-inserts the whole archive, without a browser or network access.
+
+        Parsing is spread over 'parse_processes' worker processes, the results are written on this thread as one
+        run of their own. Every product is rewritten even if its content hash didn't change, so fixes to the
+        column name transformation reach the whole archive.
+        """
+        self.selected_brands, self.scrape_lenses, self.skip_cameras = [], True, False
+        self.progress_log_enabled, self.debug_log_enabled = True, False
         self.setup_db()
-        self.driver = self.setup_driver(self.headless_mode)
-        self.scrape_for_links()
-        self.process_cameras(self.skip_cameras)
-        # self.driver.quit()
 
-    def setup_driver(self, headless):
+        if self.html_cache is None:
+            print(UserInteraction.format_print("ERROR", "The HTML cache is disabled, nothing to rebuild"))
+            return
+
+        entries = self.html_cache.entries()
+        total_entries = len(entries)
+        print(UserInteraction.format_print("REBUILD", f"Rebuilding {total_entries} Products from the HTML Cache"))
+
+        self.start_run(['rebuild from cache'], resume=False)
+        failed = 0
+        try:
+            with ProcessPoolExecutor(max_workers=parse_processes) as executor:
+                for i, (url, kind, product, error) in enumerate(executor.map(parse_cached_datasheet, entries,
+                                                                                 chunksize=16)):
+                    UserInteraction.progress_bar(i + 1, total_entries)
+                    if product is None:
+                        failed += 1
+                        print(f"\nCouldn't parse cached page {url}: {error}")
+                        continue
+
+                    brand, model, info = product
+                    if kind == 'camera':
+                        self.insert_product_specs(brand, model, info)
+                    else:
+                        self.insert_lens_product_specs(brand, model, info)
+                    # the page wasn't downloaded again, only its content hash and change run move on
+                    self.c.execute("UPDATE scrapeLedger SET content_hash = ?, changed_run_id = ? WHERE url = ?",
+                                   (content_hash(brand, model, info), self.run_id, url))
+        except KeyboardInterrupt:
+            print(UserInteraction.format_print("STOPPED", "Rebuild interrupted, saving rebuilt products"))
+        finally:
+            # a rebuild is never resumed, mark it finished even if it was interrupted
+            self.finish_run()
+            self.save_catalog_snapshot()
+
+        print(UserInteraction.format_print("DONE", f"Rebuilt {total_entries - failed} Products, {failed} failed"))
+
+    def setup_driver(self, headless, announce=True):
         """
         Configures the web driver for the scraping application.
 
@@ -263,6 +1225,7 @@ class Scrape:
 
         Args:
             headless (bool): Indicates whether to run the web driver in headless mode.
+            announce (bool): Whether to print the headless/log status (disabled for pool workers).
 
         Returns:
             webdriver.Chrome: Configured Chrome webdriver instance.
@@ -278,22 +1241,23 @@ class Scrape:
         chrome_options.binary_location = os.path.join(base_path, 'chrome', 'win64-118.0.5993.70', 'chrome-win64',
                                                       'chrome.exe')
         if headless:
-            if self.progress_log_enabled:
+            if self.progress_log_enabled and announce:
                 print(UserInteraction.format_print("ENABLED", "Headless Mode Enabled"))
             # Enable headless mode
             chrome_options.add_argument("--headless")
             chrome_options.add_argument("--disable-gpu")  # Optional: speeds up headless mode on Windows
             chrome_options.add_argument("--no-sandbox")  # Recommended for certain environments
             chrome_options.add_argument("--disable-dev-shm-usage")  # Recommended for memory efficiency
-        elif self.progress_log_enabled:
+        elif self.progress_log_enabled and announce:
             print(UserInteraction.format_print("DISABLED", "Headless Mode Disabled"))
 
-        if self.progress_log_enabled and self.debug_log_enabled:
-            print(UserInteraction.format_print("ENABLED", "Progress and Debug Log Enabled"))
-        elif self.progress_log_enabled:
-            print(UserInteraction.format_print("ENABLED", "Progress Log Enabled"))
-        else:
-            print(UserInteraction.format_print("DISABLED", "All Logs Disabled"))
+        if announce:
+            if self.progress_log_enabled and self.debug_log_enabled:
+                print(UserInteraction.format_print("ENABLED", "Progress and Debug Log Enabled"))
+            elif self.progress_log_enabled:
+                print(UserInteraction.format_print("ENABLED", "Progress Log Enabled"))
+            else:
+                print(UserInteraction.format_print("DISABLED", "All Logs Disabled"))
 
         service = Service(chromedriver_path)
 
@@ -309,40 +1273,372 @@ class Scrape:
 
         This method creates a connection to a SQLite database named "CameraArchive.db" and creates the necessary
         tables if they do not already exist.
+
+        In long-form storage the products, attributes and product_attribute_values tables are created instead of
+        the wide tables, existing wide tables are migrated into them and replaced by views of the same name. An
+        archive that is already in long-form storage stays in it, whatever 'storage_mode' says.
         """
-        self.conn = sqlite3.connect("CamerAarchive.db")
+        # the pipeline's writer thread takes the connection over while the main thread waits
+        self.conn = archive_db.connect(self.db_path, check_same_thread=False)
         self.c = self.conn.cursor()
 
+        if self.storage != "eav" and archive_db.is_eav(self.conn):
+            print(UserInteraction.format_print("STORAGE", "The Archive uses long-form storage, keeping it"))
+            self.storage = "eav"
+
+        if self.storage == "eav":
+            archive_db.create_eav_tables(self.conn)
+            if any(archive_db.object_type(self.conn, table) == 'table'
+                   for table in archive_db.archive_tables.values()):
+                print(UserInteraction.format_print("MIGRATE", "Moving the wide tables into long-form storage"))
+                self.c.execute("BEGIN")
+                archive_db.migrate_wide_to_eav(self.conn)
+                self.conn.commit()
+            else:
+                # also catches up on views a crash kept from being rebuilt after their last batch
+                archive_db.rebuild_wide_views(self.conn)
+        else:
+            self.c.execute("""
+                CREATE TABLE IF NOT EXISTS camerAarchive (
+                brand TEXT,
+                model TEXT PRIMARY KEY
+                )
+            """)
+            self.conn.commit()
+
+            self.c.execute("""
+                CREATE TABLE IF NOT EXISTS lensAarchive (
+                brand TEXT,
+                model TEXT PRIMARY KEY
+                )
+            """)
+
+            # brand lookups of the guis
+            self.c.execute("CREATE INDEX IF NOT EXISTS camerAarchive_brand ON camerAarchive (brand)")
+            self.c.execute("CREATE INDEX IF NOT EXISTS lensAarchive_brand ON lensAarchive (brand)")
+
+            self.conn.commit()
+
+        archive_db.create_class_table(self.conn)
+        archive_db.create_catalog_version(self.conn)
+        archive_db.create_search_table(self.conn)
+        archive_db.create_metrics_table(self.conn)
+
+        self.c.execute("""
+            CREATE TABLE IF NOT EXISTS scrapeRuns (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started_at REAL,
+            finished_at REAL,
+            brands TEXT
+            )
+        """)
+
         self.c.execute("""
-            CREATE TABLE IF NOT EXISTS camerAarchive (
-            brand TEXT,
-            model TEXT PRIMARY KEY
+            CREATE TABLE IF NOT EXISTS scrapeLedger (
+            url TEXT PRIMARY KEY,
+            kind TEXT,
+            model TEXT,
+            last_scraped REAL,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,
+            run_id INTEGER,
+            changed_run_id INTEGER,
+            brand TEXT
             )
         """)
+        # the brand lets exports find the changed products by their model, ledgers from before it get it once
+        self.c.execute("PRAGMA table_info('scrapeLedger')")
+        if 'brand' not in {row[1] for row in self.c.fetchall()}:
+            self.c.execute("ALTER TABLE scrapeLedger ADD COLUMN brand TEXT")
+            for kind, table in archive_db.archive_tables.items():
+                if archive_db.object_type(self.conn, table) is not None:
+                    self.c.execute(f"UPDATE scrapeLedger SET brand = (SELECT brand FROM {table} "
+                                   f"WHERE brand || ' ' || model = scrapeLedger.model) WHERE kind = ?", (kind,))
+        self.c.execute("CREATE INDEX IF NOT EXISTS scrape_ledger_changed ON scrapeLedger (kind, changed_run_id)")
+
         self.conn.commit()
 
+        archive_db.create_history_table(self.conn)
+
         self.c.execute("""
-            CREATE TABLE IF NOT EXISTS lensAarchive (
-            brand TEXT,
-            model TEXT PRIMARY KEY
+            CREATE TABLE IF NOT EXISTS columnMapping (
+            legend TEXT PRIMARY KEY,
+            column_name TEXT NOT NULL
             )
         """)
 
         self.conn.commit()
 
-    def scrape_for_links(self):
-        """
-        Scrapes camera and/or lens links from digitalkamera.de based on user selection.
+        self.pending_writes = 0
+        self.load_schema()
+        self.load_column_mapping()
+        self.load_ledger()
+
+        self.html_cache = HtmlCache(html_cache_dir, html_cache_max_bytes) if html_cache_dir else None
+
+    def load_schema(self):
         """
-        if not self.skip_cameras:
-            if self.progress_log_enabled:
-                print(UserInteraction.format_print("GATHERING CAMERA LINKS",
-                                                   "Getting page: "
-                                                   "https://www.digitalkamera.de/Kamera/Schnellzugriff.aspx"))
+        Loads the column names of both archive tables into the in-memory schema registry.
 
-            self.driver.get("https://www.digitalkamera.de/Kamera/Schnellzugriff.aspx")
+        The registry maps each table to a set of lower-cased column names (SQLite compares column names case
+        insensitively), so the insert paths can check for new columns without querying the database. It is loaded
+        once here and kept up to date by 'add_missing_columns'.
 
-            # Handle cookie popup if present
+        In long-form storage the registry holds the attributes used by each kind of product instead, i.e. the
+        columns of its view, and 'attribute_ids' maps the lower-cased attribute names to their ids.
+        """
+        self.schema = {}
+        self.views_outdated = False
+        if self.storage == "eav":
+            self.c.execute("SELECT attribute_id, name FROM attributes")
+            self.attribute_ids = {name.lower(): attribute_id for attribute_id, name in self.c.fetchall()}
+            for kind, table in archive_db.archive_tables.items():
+                self.schema[table] = {'brand', 'model'} | {name.lower() for attribute_id, name
+                                                           in archive_db.kind_attributes(self.conn, kind)}
+            return
+
+        for table in ('camerAarchive', 'lensAarchive'):
+            self.c.execute(f"PRAGMA table_info('{table}')")
+            self.schema[table] = {tup[1].lower() for tup in self.c.fetchall()}
+
+    def load_column_mapping(self):
+        """
+        Loads the legend to column mapping into memory, merging columns that became aliases of each other first.
+
+        Existing columns (attributes in long-form storage) whose names normalize to the same column, e.g. after
+        'column_alias_rules' or 'column_aliases' were extended, are merged into the oldest of them: its values win,
+        the others only fill its gaps, then they are dropped. The spec history and the mapping follow the merge.
+
+        The persisted mapping is then re-checked against the current rules, so a legend is normalized once per
+        run at most and the inserts only need a dictionary lookup.
+        """
+        if self.storage == "eav":
+            self.c.execute("SELECT name, attribute_id FROM attributes ORDER BY attribute_id")
+            column_sets = [self.c.fetchall()]
+        else:
+            column_sets = []
+            for table in archive_db.archive_tables.values():
+                self.c.execute(f"PRAGMA table_info('{table}')")
+                column_sets.append([(tup[1], table) for tup in self.c.fetchall()
+                                    if tup[1].lower() not in ('brand', 'model')])
+
+        merges = []
+        self.column_keys = {}
+        for columns in column_sets:
+            groups = {}
+            for column_name, owner in columns:
+                groups.setdefault(normalize_column_name(column_name).lower(), []).append((column_name, owner))
+            for key, ((target, target_owner), *aliases) in groups.items():
+                self.column_keys.setdefault(key, target)
+                merges += [(target, target_owner, alias, alias_owner) for alias, alias_owner in aliases]
+
+        if merges:
+            self.c.execute("BEGIN")
+            for target, target_owner, alias, alias_owner in merges:
+                if self.progress_log_enabled:
+                    print(UserInteraction.format_print("MERGE", f"Merging Column {alias} into {target}"))
+                if self.storage == "eav":
+                    # rows of products that have the target already are skipped and deleted, the target wins
+                    self.c.execute("UPDATE OR IGNORE product_attribute_values SET attribute_id = ? "
+                                   "WHERE attribute_id = ?", (target_owner, alias_owner))
+                    self.c.execute("DELETE FROM product_attribute_values WHERE attribute_id = ?", (alias_owner,))
+                    self.c.execute("DELETE FROM attributes WHERE attribute_id = ?", (alias_owner,))
+                else:
+                    self.c.execute(f'UPDATE {alias_owner} SET "{target}" = COALESCE("{target}", "{alias}")')
+                    self.c.execute(f'ALTER TABLE {alias_owner} DROP COLUMN "{alias}"')
+                # attributes are shared by both kinds of product, wide columns belong to one of them
+                kinds = list(archive_db.archive_tables) if self.storage == "eav" else \
+                    [archive_db.archive_kinds[alias_owner]]
+                for kind in kinds:
+                    self.c.execute("UPDATE OR IGNORE specHistory SET attribute = ? WHERE kind = ? AND attribute = ?",
+                                   (target, kind, alias))
+                    self.c.execute("DELETE FROM specHistory WHERE kind = ? AND attribute = ?", (kind, alias))
+                self.c.execute("UPDATE columnMapping SET column_name = ? WHERE column_name = ?", (target, alias))
+            if self.storage == "eav":
+                archive_db.rebuild_wide_views(self.conn)
+            archive_db.rebuild_derived_tables(self.conn)
+            self.conn.commit()
+            self.load_schema()
+
+        self.c.execute("SELECT legend, column_name FROM columnMapping")
+        saved_mapping = dict(self.c.fetchall())
+        self.saved_legends = set(saved_mapping)
+        self.column_mapping = {}
+        changed = []
+        for legend, column_name in saved_mapping.items():
+            if (mapped_column := self.map_column_name(legend)) != column_name:
+                changed.append((mapped_column, legend))
+        if changed:
+            self.c.executemany("UPDATE columnMapping SET column_name = ? WHERE legend = ?", changed)
+            self.conn.commit()
+
+    def load_ledger(self):
+        """
+        Loads the scrape ledger into memory.
+
+        The ledger holds one entry per scraped datasheet link with the time it was last scraped, the HTTP
+        validators of the last response, the content hash of the parsed product and the run that scraped it.
+        """
+        self.c.execute("SELECT url, model, last_scraped, etag, last_modified, content_hash, run_id FROM scrapeLedger")
+        self.ledger = {url: {'model'        : model,
+                             'last_scraped' : last_scraped,
+                             'etag'         : etag,
+                             'last_modified': last_modified,
+                             'content_hash' : hash_value,
+                             'run_id'       : run_id}
+                       for url, model, last_scraped, etag, last_modified, hash_value, run_id in self.c.fetchall()}
+
+    def start_run(self, brands, resume=True):
+        """
+        Starts a new scrape run or resumes the last one if it was interrupted.
+
+        Only the latest run is resumed. An interrupted run followed by a finished one stays as it is, resuming it
+        would record the new changes under the older run.
+
+        Args:
+            brands (list): The brands selected for this run.
+            resume (bool): Whether an interrupted run may be resumed instead of starting a new one.
+        """
+        self.c.execute("SELECT run_id, finished_at FROM scrapeRuns ORDER BY run_id DESC LIMIT 1")
+        if resume and (row := self.c.fetchone()) and row[1] is None:
+            self.run_id = row[0]
+            resumed = sum(entry['run_id'] == self.run_id for entry in self.ledger.values())
+            print(UserInteraction.format_print("RESUMING", f"Resuming interrupted run {self.run_id}, "
+                                                           f"{resumed} Links already scraped"))
+        else:
+            self.c.execute("INSERT INTO scrapeRuns (started_at, brands) VALUES (?, ?)",
+                           (time.time(), ', '.join(brands)))
+            self.run_id = self.c.lastrowid
+        self.conn.commit()
+
+    def join_run(self, run_id):
+        """
+        Writes into a scrape run started elsewhere, used by brand shards to share the run of the archive.
+
+        Args:
+            run_id (int): The run started by the process that merges the shards.
+        """
+        self.c.execute("INSERT OR IGNORE INTO scrapeRuns (run_id, started_at, brands) VALUES (?, ?, ?)",
+                       (run_id, time.time(), ', '.join(self.selected_brands)))
+        self.conn.commit()
+        self.run_id = run_id
+
+    def seed_ledger(self, path):
+        """
+        Copies the scrape ledger of another database, so a brand shard skips what the archive already has.
+
+        Args:
+            path (str): Database to copy the ledger from.
+        """
+        if not os.path.exists(path):
+            return
+        self.c.execute("ATTACH DATABASE ? AS archive", (path,))
+        try:
+            self.c.execute("SELECT 1 FROM archive.sqlite_master WHERE name = 'scrapeLedger'")
+            if self.c.fetchone():
+                self.c.execute("INSERT OR IGNORE INTO scrapeLedger SELECT * FROM archive.scrapeLedger")
+                self.conn.commit()
+        finally:
+            self.c.execute("DETACH DATABASE archive")
+        self.load_ledger()
+
+    def finish_run(self):
+        """
+        Marks the current scrape run as finished, so the next run starts a new one.
+        """
+        self.flush_writes()
+        self.c.execute("UPDATE scrapeRuns SET finished_at = ? WHERE run_id = ?", (time.time(), self.run_id))
+        self.conn.commit()
+
+    def save_catalog_snapshot(self):
+        """
+        Saves the catalog of brands, camera classes and models next to the archive, so the guis can map it at
+        startup instead of building it from the database (see 'archive_catalog.Catalog').
+        """
+        try:
+            archive_catalog.Catalog.load(self.conn).save(archive_catalog.snapshot_path(self.db_path))
+        except OSError as e:
+            # e.g. a running gui still maps the old snapshot on Windows, the guis fall back to the database then
+            print(UserInteraction.format_print("CATALOG", f"Couldn't save the catalog snapshot: {e}"))
+
+    def links_to_scrape(self, links):
+        """
+        Drops the links that don't need to be scraped again.
+
+        A link is skipped if the current (resumed) run already scraped it or if it was scraped less than
+        'ledger_max_age' seconds ago.
+
+        Args:
+            links (list): Datasheet links.
+
+        Returns:
+            list: The links that still need to be scraped.
+        """
+        fresh_since = time.time() - ledger_max_age
+        remaining = []
+        for link in links:
+            entry = self.ledger.get(link)
+            if entry is None or (entry['run_id'] != self.run_id and entry['last_scraped'] < fresh_since):
+                remaining.append(link)
+
+        if self.progress_log_enabled and len(remaining) < len(links):
+            print(UserInteraction.format_print("LEDGER", f"Skipping {len(links) - len(remaining)} fresh Links, "
+                                                         f"{len(remaining)} left to scrape"))
+        return remaining
+
+    def record_scrape(self, link, kind, page, changed):
+        """
+        Records a scraped link in the scrape ledger as part of the current write batch.
+
+        Args:
+            link (str): Link of the datasheet.
+            kind (str): 'camera' or 'lens'.
+            page (dict): Page as returned by the page functions, with 'content_hash' set unless unchanged.
+            changed (bool): Whether the product content changed and was written in this run.
+        """
+        now = time.time()
+        entry = self.ledger.setdefault(link, {'model': None, 'etag': None, 'last_modified': None,
+                                              'content_hash': None})
+        entry['last_scraped'] = now
+        entry['run_id'] = self.run_id
+
+        if page.get('unchanged'):
+            self.c.execute("UPDATE scrapeLedger SET last_scraped = ?, run_id = ? WHERE url = ?",
+                           (now, self.run_id, link))
+            return
+
+        brand, model, info = page['product']
+        entry.update({'model'        : f"{brand} {model}",
+                      'etag'         : page.get('etag'),
+                      'last_modified': page.get('last_modified'),
+                      'content_hash' : page['content_hash']})
+
+        self.c.execute("""
+            INSERT INTO scrapeLedger (url, kind, model, last_scraped, etag, last_modified, content_hash, run_id,
+                                      changed_run_id, brand)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(url) DO UPDATE SET
+                kind = excluded.kind, model = excluded.model, last_scraped = excluded.last_scraped,
+                etag = excluded.etag, last_modified = excluded.last_modified, content_hash = excluded.content_hash,
+                run_id = excluded.run_id, changed_run_id = COALESCE(excluded.changed_run_id, changed_run_id),
+                brand = excluded.brand
+        """, (link, kind, entry['model'], now, entry['etag'], entry['last_modified'], entry['content_hash'],
+              self.run_id, self.run_id if changed else None, brand))
+
+    def scrape_for_links(self):
+        """
+        Scrapes camera and/or lens links from digitalkamera.de based on user selection.
+        """
+        if not self.skip_cameras:
+            if self.progress_log_enabled:
+                print(UserInteraction.format_print("GATHERING CAMERA LINKS",
+                                                   "Getting page: "
+                                                   "https://www.digitalkamera.de/Kamera/Schnellzugriff.aspx"))
+
+            self.driver.get("https://www.digitalkamera.de/Kamera/Schnellzugriff.aspx")
+
+            # Handle cookie popup if present
             try:
                 popup = self.wait(EC.visibility_of_element_located((By.CSS_SELECTOR, ".fc-dialog-container")))
                 reject_button = popup.find_element(By.CSS_SELECTOR, "button[aria-label='Nicht einwilligen']")
@@ -489,142 +1785,716 @@ class Scrape:
             self.process_lenses(lens_links)
             return
 
-        total_links = len(camera_links)
+        self.scrape_datasheets(camera_links, 'camera', self.insert_product_specs)
+
+        if self.scrape_lenses:
+            if self.progress_log_enabled:
+                print(UserInteraction.format_print("UPDATE", "Proceeding with Lenses"))
+            self.process_lenses(lens_links)
+
+    def process_lenses(self, lens_links):
+        """
+        Processes the lens links and extracts specifications.
+
+        This method navigates to each lens link, retrieves the relevant data, and stores it in the database.
+
+        Args:
+            lens_links (list): List of lens links to process.
+        """
+        self.scrape_datasheets(lens_links, 'lens', self.insert_lens_product_specs)
+
+    def page_function(self, kind):
+        """
+        Returns the page function of the configured engine for a kind of datasheet.
 
-        for i, link in enumerate(camera_links):
-            self.driver.get(link)
+        Args:
+            kind (str): 'camera' or 'lens'.
 
-            # wait for page to load and get parent element
-            parent_element = self.wait(EC.visibility_of_element_located((By.CSS_SELECTOR, ".dkDataSheet")))
+        Returns:
+            callable: Page function taking (client, link) and returning (brand, model, info), the client being a
+            WebDriver for the selenium engine and a requests session for the http engine.
+        """
+        if engine == "http":
+            return self.fetch_camera_page if kind == 'camera' else self.fetch_lens_page
+        return self.scrape_camera_page if kind == 'camera' else self.scrape_lens_page
 
-            datasheet = parent_element.find_element(By.TAG_NAME, 'tbody')
+    def scrape_datasheets(self, links, kind, insert_specs):
+        """
+        Scrapes a list of datasheet links and stores the results in the database.
 
-            data_rows = datasheet.find_elements(By.TAG_NAME, 'tr')
+        With a pool size of 1 the links are visited one by one on 'self.driver' (or 'self.session' for the http
+        engine), otherwise they are distributed over a pool of workers (see 'run_worker_pool'). Database writes
+        always happen on the calling thread.
 
-            brand_model = data_rows[0].find_element(By.CLASS_NAME, 'colData1').text
+        Links the scrape ledger considers fresh are skipped (see 'links_to_scrape').
 
-            brand_model_split = brand_model.split(' ', 1)
+        Args:
+            links (list): Datasheet links to scrape.
+            kind (str): 'camera' or 'lens'.
+            insert_specs (callable): Insert function taking (brand, model, info, transformed_columns).
+        """
+        links = self.links_to_scrape(links)
+        total_links = len(links)
+        scrape_page = self.page_function(kind)
 
-            brand = brand_model_split[0]
-            model = brand_model_split[1]
+        if pool_size > 1 and total_links > 1:
+            results = self.run_worker_pool(links, scrape_page)
+        else:
+            client = self.session if engine == "http" else self.driver
+            results = ((link, scrape_page(client, link)) for link in links)
 
+        for i, (link, page) in enumerate(results):
             if self.progress_log_enabled:
-                print(UserInteraction.format_print("UPDATE", f"Processing: {brand} {model}"))
                 UserInteraction.progress_bar(i + 1, total_links)
 
-            info = {}
+            if page is None:
+                continue
+
+            self.store_page(kind, link, page, insert_specs)
+
+    def store_page(self, kind, link, page, insert_specs):
+        """
+        Writes a scraped page to the database and records it in the scrape ledger.
+
+        Pages the server reported as not modified, or whose content hash matches the ledger, only refresh their
+        ledger entry, everything else is upserted with 'insert_specs'.
+
+        Args:
+            kind (str): 'camera' or 'lens'.
+            link (str): Link of the datasheet.
+            page (dict): Page as returned by the page functions.
+            insert_specs (callable): Insert function taking (brand, model, info, transformed_columns).
+        """
+        if page.get('unchanged'):
+            self.queue_write()
+            self.record_scrape(link, kind, page, changed=False)
+            return
+
+        brand, model, info = page['product']
+        page['content_hash'] = content_hash(brand, model, info)
+
+        entry = self.ledger.get(link)
+        if entry is not None and entry['content_hash'] == page['content_hash']:
+            if self.progress_log_enabled and self.debug_log_enabled:
+                print(UserInteraction.format_print("UNCHANGED", f"Skipping unchanged: {brand} {model}"))
+            self.queue_write()
+            self.record_scrape(link, kind, page, changed=False)
+            return
+
+        insert_specs(brand, model, info, page.get('columns'))
+        self.record_scrape(link, kind, page, changed=True)
+
+    def run_worker_pool(self, links, scrape_page):
+        """
+        Scrapes links with a pool of workers sharing one link queue.
 
-            for row in data_rows[1:]:
+        Each worker owns its own client (a WebDriver session, or a requests session for the http engine) and pulls
+        links from the queue until it is empty. A failing page only costs that link, and a worker whose browser died
+        replaces its driver; if that fails too, only that worker stops and the remaining workers keep draining the
+        queue.
+
+        Args:
+            links (list): Datasheet links to scrape.
+            scrape_page (callable): Page function taking (client, link) and returning a page dict.
+
+        Yields:
+            tuple: (link, page) pairs in completion order, page being None if the page failed.
+        """
+        link_queue = queue.Queue()
+        for link in links:
+            link_queue.put(link)
+        result_queue = queue.Queue()
+        stop_event = threading.Event()
+
+        # share the consent cookies of the main session so workers don't get the cookie popup
+        cookies = self.driver.get_cookies() if self.driver else []
+
+        total_workers = min(pool_size, len(links))
+        workers = [threading.Thread(target=self.pool_worker,
+                                    args=(worker_id, link_queue, result_queue, scrape_page, cookies, stop_event),
+                                    daemon=True)
+                   for worker_id in range(total_workers)]
+        for worker in workers:
+            worker.start()
+
+        if self.progress_log_enabled:
+            print(UserInteraction.format_print("POOL", f"Started {total_workers} {engine.upper()} Workers"))
+
+        finished_workers = 0
+        try:
+            while finished_workers < total_workers:
                 try:
-                    elements = row.find_elements(By.TAG_NAME, 'td')
-                    legend = elements[0].text
-                    if nested_table := elements[1].find_elements(
-                            By.TAG_NAME, 'table'
-                    ):
-                        # If there's a nested table, iterate through its tds and concatenate results
-                        sub_table_rows = nested_table[0].find_elements(By.TAG_NAME, 'tr')
-                        data = [', '.join([col.text for col in sub_row.find_elements(By.TAG_NAME, 'td')]) for sub_row in
-                                sub_table_rows]
-                    else:
-                        # If there's no nested table, just retrieve the corresponding text
-                        data = elements[1].text
-                    if self.progress_log_enabled and self.debug_log_enabled:
-                        print(UserInteraction.format_print("UPDATE", f"{legend} = {data}"))
-                    if legend is not None and data is not None and not legend[0].isdigit():
-                        info[legend] = data
-                    else:
-                        if self.progress_log_enabled and self.debug_log_enabled:
-                            print("Couldn't populate info")
-                        continue
-                except Exception as e:
-                    if self.progress_log_enabled and self.debug_log_enabled:
-                        print(f"An error occurred trying to get legend/data pairs: {e}")
+                    # wake up regularly so Ctrl-C isn't blocked by the wait
+                    result = result_queue.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if result is None:
+                    finished_workers += 1
                     continue
+                yield result
+        finally:
+            stop_event.set()
+            for worker in workers:
+                worker.join()
 
-            if self.progress_log_enabled and self.debug_log_enabled:
-                print(info)
+        if not link_queue.empty() and self.progress_log_enabled:
+            print(UserInteraction.format_print("ERROR", f"All Workers stopped, {link_queue.qsize()} Links left"))
 
-            self.insert_product_specs(brand, model, info)
+    def process_links_async(self):
+        """
+        Scrapes the camera and lens links of the selected brands with the asyncio crawl engine.
+
+        Replaces 'process_cameras' in the "async" crawl mode: both kinds are crawled in one session, the links
+        the scrape ledger considers fresh are skipped as usual.
+        """
+        if jobs := self.collect_jobs():
+            asyncio.run(self.crawl_async(jobs))
+
+    def collect_jobs(self):
+        """
+        Collects the camera and lens links of the selected brands that still need to be scraped.
 
+        Returns:
+            list: (kind, link) tuples, kind being 'camera' or 'lens'.
+        """
+        camera_links, lens_links = self.process_links(self.selected_brands)
+
+        jobs = []
+        if not self.skip_cameras:
+            jobs.extend(('camera', link) for link in self.links_to_scrape(camera_links))
         if self.scrape_lenses:
-            if self.progress_log_enabled:
-                print(UserInteraction.format_print("UPDATE", "Proceeding with Lenses"))
-            self.process_lenses(lens_links)
+            jobs.extend(('lens', link) for link in self.links_to_scrape(lens_links))
+        return jobs
 
-    def process_lenses(self, lens_links):
+    async def crawl_async(self, jobs):
         """
-        Processes the lens links and extracts specifications.
+        Crawls datasheet links on an event loop.
 
-        This method navigates to each lens link, retrieves the relevant data, and stores it in the database.
+        'max_concurrency' fetchers, each owning one client, take jobs from a shared queue. Every request first
+        takes a token from the bucket of its host, so no host gets more than 'host_rate_limit' requests per second.
+        Page loads run in worker threads, finished pages go through a bounded queue to a single writer, which
+        writes them on its own thread: once 'write_queue_size' pages are waiting for the database, the fetchers
+        pause. If writing fails, the fetchers stop, the queue is drained and the error is raised once all of them
+        have finished.
 
         Args:
-            lens_links (list): List of lens links to process.
+            jobs (list): (kind, link) tuples, kind being 'camera' or 'lens'.
+        """
+        loop = asyncio.get_running_loop()
+        fetch_executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        loop.set_default_executor(fetch_executor)
+
+        job_queue = asyncio.Queue()
+        for job in jobs:
+            job_queue.put_nowait(job)
+        write_queue = asyncio.Queue(maxsize=write_queue_size)
+        # a single thread, so the pages are written one after another like before
+        write_executor = ThreadPoolExecutor(max_workers=1)
+        stop_event = asyncio.Event()
+        self.writer_error = None
+        buckets = {}
+
+        cookies = self.driver.get_cookies() if self.driver else []
+        insert_functions = {'camera': self.insert_product_specs, 'lens': self.insert_lens_product_specs}
+        page_functions = {'camera': self.page_function('camera'), 'lens': self.page_function('lens')}
+
+        async def fetcher(worker_id):
+            client = await asyncio.to_thread(self.setup_pool_client, cookies)
+            try:
+                while client is not None and not stop_event.is_set():
+                    try:
+                        kind, link = job_queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        break
+
+                    host = urlparse(link).netloc
+                    bucket = buckets.setdefault(host, TokenBucket(host_rate_limit, host_burst))
+                    await bucket.acquire()
+
+                    try:
+                        page = await asyncio.to_thread(page_functions[kind], client, link)
+                    except Exception as e:
+                        if self.progress_log_enabled and self.debug_log_enabled:
+                            print(f"Fetcher {worker_id} failed to scrape {link}: {e}")
+                        page = None
+                        client = await asyncio.to_thread(self.revive_pool_client, client, cookies)
+
+                    # waits here while the writer is behind
+                    await write_queue.put((kind, link, page))
+            finally:
+                if client is not None:
+                    await asyncio.to_thread(self.close_pool_client, client)
+
+        async def writer():
+            written = 0
+            while (item := await write_queue.get()) is not None:
+                if self.writer_error is not None:
+                    # keep draining so the fetchers don't block forever
+                    continue
+                kind, link, page = item
+                written += 1
+                if self.progress_log_enabled:
+                    UserInteraction.progress_bar(written, len(jobs))
+                if page is None:
+                    continue
+                try:
+                    # off the event loop, so the fetchers keep going while the database writes
+                    await loop.run_in_executor(write_executor, self.store_page, kind, link, page,
+                                               insert_functions[kind])
+                except Exception as e:
+                    self.writer_error = e
+                    stop_event.set()
+
+        total_fetchers = min(max_concurrency, len(jobs))
+        if self.progress_log_enabled:
+            print(UserInteraction.format_print("ASYNC", f"Crawling {len(jobs)} Links with {total_fetchers} Fetchers"))
+
+        writer_task = asyncio.create_task(writer())
+        try:
+            await asyncio.gather(*(fetcher(worker_id) for worker_id in range(total_fetchers)))
+        finally:
+            await write_queue.put(None)
+            await writer_task
+            write_executor.shutdown()
+            fetch_executor.shutdown()
+
+        if self.writer_error is not None:
+            raise self.writer_error
+        if not job_queue.empty() and self.progress_log_enabled:
+            print(UserInteraction.format_print("ERROR", f"All Fetchers stopped, {job_queue.qsize()} Links left"))
+
+    def process_links_pipeline(self):
+        """
+        Scrapes the camera and lens links of the selected brands with the staged pipeline.
+
+        Replaces 'process_cameras' in the "pipeline" crawl mode, see 'run_pipeline'.
         """
-        for link in lens_links:
-            self.driver.get(link)
+        if jobs := self.collect_jobs():
+            self.run_pipeline(jobs)
 
-            # wait for page to load and get parent element
-            parent_element = self.wait(EC.visibility_of_element_located((By.CSS_SELECTOR, ".dkDataSheet")))
+    def run_pipeline(self, jobs):
+        """
+        Crawls datasheet links in three stages connected by bounded queues.
 
-            datasheet = parent_element.find_element(By.TAG_NAME, 'tbody')
+        - fetch: 'pool_size' threads, each with its own client, download pages
+        - parse: 'parse_threads' threads build the products and their column names
+        - write: one thread owns 'self.conn' and upserts the products, the main thread doesn't touch the database
+          until the pipeline is done
 
-            data_rows = datasheet.find_elements(By.TAG_NAME, 'tr')
+        A full queue blocks the stage in front of it, so a slow stage throttles the ones before it instead of piling
+        up pages in memory. The depth of every queue is available through 'queue_depths' and reported every
+        'queue_report_interval' seconds. On Ctrl-C the fetchers stop and everything already fetched is still
+        parsed and written.
 
-            brand = data_rows[0].find_element(By.CLASS_NAME, 'colData1').text
+        Args:
+            jobs (list): (kind, link) tuples, kind being 'camera' or 'lens'.
+        """
+        fetch_queue = queue.Queue()
+        for job in jobs:
+            fetch_queue.put(job)
+        parse_queue = queue.Queue(maxsize=pipeline_queue_size)
+        write_queue = queue.Queue(maxsize=pipeline_queue_size)
+        self.pipeline_queues = {'fetch': fetch_queue, 'parse': parse_queue, 'write': write_queue}
+
+        stop_event = threading.Event()
+        cookies = self.driver.get_cookies() if self.driver else []
+        total_fetchers = max(1, min(pool_size, len(jobs)))
+        total_parsers = max(1, parse_threads)
+        running = {'fetch': total_fetchers, 'parse': total_parsers}
+        running_lock = threading.Lock()
+        self.writer_error = None
+
+        def stage_done(stage, next_queue, sentinels):
+            # the last thread of a stage tells the next stage that no more pages will come
+            with running_lock:
+                running[stage] -= 1
+                last = running[stage] == 0
+            if last:
+                for _ in range(sentinels):
+                    next_queue.put(None)
+
+        def fetcher(worker_id):
+            client = self.setup_pool_client(cookies)
+            try:
+                while client is not None and not stop_event.is_set():
+                    try:
+                        kind, link = fetch_queue.get_nowait()
+                    except queue.Empty:
+                        break
+
+                    fetch = self.fetch_datasheet if engine == "http" else self.read_datasheet
+                    try:
+                        page = fetch(client, link, kind)
+                    except Exception as e:
+                        if self.progress_log_enabled and self.debug_log_enabled:
+                            print(f"Fetcher {worker_id} failed to load {link}: {e}")
+                        page = None
+                        client = self.revive_pool_client(client, cookies)
+                    parse_queue.put((kind, link, page))
+            finally:
+                if client is not None:
+                    self.close_pool_client(client)
+                stage_done('fetch', parse_queue, total_parsers)
+
+        def parser():
+            try:
+                while (item := parse_queue.get()) is not None:
+                    kind, link, page = item
+                    if page is not None:
+                        try:
+                            page = self.build_page_info(kind, page)
+                            if 'product' in page:
+                                page['columns'] = self.transform_column_names(page['product'][2].keys())
+                        except Exception as e:
+                            if self.progress_log_enabled and self.debug_log_enabled:
+                                print(f"Couldn't parse {link}: {e}")
+                            page = None
+                    write_queue.put((kind, link, page))
+            finally:
+                stage_done('parse', write_queue, 1)
+
+        def writer():
+            insert_functions = {'camera': self.insert_product_specs, 'lens': self.insert_lens_product_specs}
+            written = 0
+            while (item := write_queue.get()) is not None:
+                if self.writer_error is not None:
+                    # keep draining so the stages in front don't block forever
+                    continue
+                kind, link, page = item
+                written += 1
+                if self.progress_log_enabled:
+                    UserInteraction.progress_bar(written, len(jobs))
+                if page is None:
+                    continue
+                try:
+                    self.store_page(kind, link, page, insert_functions[kind])
+                except Exception as e:
+                    self.writer_error = e
+                    stop_event.set()
 
-            model = data_rows[1].find_element(By.CLASS_NAME, 'colData1').text
+        threads = [threading.Thread(target=fetcher, args=(worker_id,), daemon=True)
+                   for worker_id in range(total_fetchers)]
+        threads += [threading.Thread(target=parser, daemon=True) for _ in range(total_parsers)]
+        writer_thread = threading.Thread(target=writer, daemon=True)
+        threads.append(writer_thread)
 
-            if self.progress_log_enabled:
-                print(UserInteraction.format_print("UPDATE", f"Processing: {brand} {model}"))
+        if self.progress_log_enabled:
+            print(UserInteraction.format_print("PIPELINE", f"Crawling {len(jobs)} Links with {total_fetchers} "
+                                                           f"Fetchers and {total_parsers} Parsers"))
+        for thread in threads:
+            thread.start()
 
-            info = {}
+        try:
+            while writer_thread.is_alive():
+                writer_thread.join(queue_report_interval)
+                if writer_thread.is_alive() and self.progress_log_enabled:
+                    print(UserInteraction.format_print("QUEUES", ' | '.join(
+                        f"{stage}: {depth}" for stage, depth in self.queue_depths().items())))
+        except KeyboardInterrupt:
+            # stop fetching, but let the parser and writer finish the pages already fetched
+            stop_event.set()
+            writer_thread.join()
+            raise
+
+        if self.writer_error is not None:
+            raise self.writer_error
+
+    def queue_depths(self):
+        """
+        Returns the number of items waiting in each queue of the running pipeline.
 
-            for index, row in enumerate(data_rows[2:]):
+        Returns:
+            dict: Stage name ('fetch', 'parse', 'write') mapped to the depth of the queue feeding it.
+        """
+        return {stage: stage_queue.qsize() for stage, stage_queue in getattr(self, 'pipeline_queues', {}).items()}
+
+    def pool_worker(self, worker_id, link_queue, result_queue, scrape_page, cookies, stop_event):
+        """
+        Worker loop of the worker pool.
+
+        Args:
+            worker_id (int): Number of the worker, used for logging.
+            link_queue (queue.Queue): Shared queue of links still to scrape.
+            result_queue (queue.Queue): Queue receiving (link, page) pairs and a final None when the worker exits.
+            scrape_page (callable): Page function taking (client, link) and returning a page dict.
+            cookies (list): Cookies of the main session to seed the worker session with.
+            stop_event (threading.Event): Set by the consumer to stop all workers early.
+        """
+        client = self.setup_pool_client(cookies)
+        try:
+            while client is not None and not stop_event.is_set():
                 try:
-                    elements = row.find_elements(By.TAG_NAME, 'td')
-                    if len(elements) > 1:
-                        legend = elements[0].text
-
-                        # If there's a nested table, extract and concatenate its tds
-                        if nested_table := elements[1].find_elements(By.TAG_NAME, 'table'):
-                            sub_table_rows = nested_table[0].find_elements(By.TAG_NAME, 'tr')
-                            data = ', '.join(
-                                [col.text for sub_row in sub_table_rows for col in
-                                 sub_row.find_elements(By.TAG_NAME, 'td')])
-                        # If there are multiple direct elements (links, br-separated text), concatenate them
-                        elif len(children := elements[1].find_elements(By.XPATH, './*')) > 1:
-                            data = ', '.join(child.text for child in children)
-                        else:
-                            # Otherwise, just retrieve the corresponding text
-                            data = elements[1].text
-                        if self.progress_log_enabled and self.debug_log_enabled:
-                            print(UserInteraction.format_print("UPDATE", f"{legend} = {data}"))
+                    link = link_queue.get_nowait()
+                except queue.Empty:
+                    break
 
-                        if legend and data and not legend[0].isdigit():
-                            info[legend] = data
-                        else:
-                            if self.progress_log_enabled and self.debug_log_enabled:
-                                print("Couldn't populate info")
-                            continue
-                    elif self.progress_log_enabled and self.debug_log_enabled:
-                        print(f"\nError Trace-> Row HTML: {row.get_attribute('outerHTML')}")
-                        print(f"Elements: {elements} doesn't have at least 2 elements.")
-                        print(f"Text: {[element.text for element in elements]}")
-                        continue
-                    else:
-                        continue
+                try:
+                    result_queue.put((link, scrape_page(client, link)))
                 except Exception as e:
                     if self.progress_log_enabled and self.debug_log_enabled:
-                        print(f"Error occurred in row {index + 2} trying to get legend/data pairs: {e}")
-                    continue
+                        print(f"Worker {worker_id} failed to scrape {link}: {e}")
+                    result_queue.put((link, None))
+                    client = self.revive_pool_client(client, cookies)
+        finally:
+            self.close_pool_client(client)
+            result_queue.put(None)
+
+    def setup_pool_client(self, cookies):
+        """
+        Creates the client of a pool worker for the configured engine.
+
+        Args:
+            cookies (list): Cookies of the main session to seed the client with.
+
+        Returns:
+            A requests session for the http engine, a WebDriver otherwise (None if it couldn't be started).
+        """
+        if engine == "http":
+            return self.setup_session(cookies)
+        return self.setup_pool_driver(cookies)
+
+    def revive_pool_client(self, client, cookies):
+        """
+        Replaces a worker's driver after a failed page if the browser session itself died.
+
+        Args:
+            client: The worker's client.
+            cookies (list): Cookies of the main session to seed a new driver with.
 
+        Returns:
+            The client to continue with, None if a dead driver couldn't be replaced.
+        """
+        if engine == "http":
+            return client
+        try:
+            client.current_url
+            return client
+        except Exception:
+            self.quit_driver(client)
+            return self.setup_pool_driver(cookies)
+
+    def close_pool_client(self, client):
+        """
+        Closes the client of a pool worker.
+        """
+        if engine == "http":
+            client.close()
+        else:
+            self.quit_driver(client)
+
+    def setup_pool_driver(self, cookies):
+        """
+        Creates a WebDriver session for a pool worker and seeds it with the given cookies.
+
+        Args:
+            cookies (list): Cookies as returned by 'driver.get_cookies()'.
+
+        Returns:
+            webdriver.Chrome: The worker's driver, or None if it couldn't be started.
+        """
+        driver = self.setup_driver(self.headless_mode, announce=False)
+        if driver is None:
+            return None
+
+        try:
+            driver.get(site_root)
+            for cookie in cookies:
+                try:
+                    driver.add_cookie(cookie)
+                except Exception as e:
+                    if self.progress_log_enabled and self.debug_log_enabled:
+                        print(f"Couldn't copy cookie {cookie.get('name')}: {e}")
+        except Exception as e:
             if self.progress_log_enabled and self.debug_log_enabled:
-                print(info)
-            elif self.progress_log_enabled:
-                print(UserInteraction.format_print("UPDATE", f"Processed: {brand} {model}"))
-            self.insert_lens_product_specs(brand, model, info)
+                print(f"An error occurred seeding the worker session: {e}")
+            self.quit_driver(driver)
+            return None
+
+        return driver
 
-    def wait(self, condition):
+    def setup_session(self, cookies=()):
+        """
+        Creates a requests session for the http engine.
+
+        Args:
+            cookies (list): Cookies as returned by 'driver.get_cookies()' to copy into the session.
+
+        Returns:
+            requests.Session: Session sending browser-like headers and the given cookies.
+        """
+        session = requests.Session()
+        session.headers.update(http_headers)
+        for cookie in cookies:
+            session.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'),
+                                path=cookie.get('path', '/'))
+        return session
+
+    def quit_driver(self, driver):
+        """
+        Quits a WebDriver session, ignoring errors from sessions that already died.
+
+        Args:
+            driver (webdriver.Chrome): The driver to quit, may be None.
+        """
+        if driver is None:
+            return
+        try:
+            driver.quit()
+        except Exception as e:
+            if self.progress_log_enabled and self.debug_log_enabled:
+                print(f"An error occurred quitting a driver: {e}")
+
+    def read_datasheet(self, driver, link, kind):
+        """
+        Loads a datasheet page and serializes its rows with a single injected script.
+
+        The whole datasheet comes back in one 'execute_script' round trip instead of several WebDriver calls per
+        row and cell, the page source for the HTML cache comes back with it.
+
+        Args:
+            driver (webdriver.Chrome): The driver used to load the page.
+            link (str): Link to the datasheet.
+            kind (str): 'camera' or 'lens', stored with the page in the HTML cache.
+
+        Returns:
+            dict: Page with the serialized datasheet rows (see 'datasheet_rows') under 'rows'.
+        """
+        driver.get(link)
+
+        # wait for page to load and get parent element
+        parent_element = self.wait(EC.visibility_of_element_located((By.CSS_SELECTOR, ".dkDataSheet")), driver)
+
+        result = driver.execute_script(datasheet_script, parent_element, self.html_cache is not None)
+        if self.html_cache:
+            self.html_cache.store(link, kind, result['html'])
+        return {'rows': result['rows']}
+
+    def fetch_datasheet(self, session, link, kind):
+        """
+        Downloads a datasheet page without a browser.
+
+        The request is conditional on the ETag / Last-Modified validators stored in the scrape ledger, so pages
+        that didn't change since the last run aren't downloaded again.
+
+        Args:
+            session (requests.Session): The session used to download the page.
+            link (str): Link to the datasheet.
+            kind (str): 'camera' or 'lens', stored with the page in the HTML cache.
+
+        Returns:
+            dict: Page with the page source under 'html' (parsed by 'build_page_info') and the response validators
+            under 'etag' and 'last_modified', or {'unchanged': True} if the server answered 304.
+        """
+        headers = {}
+        if entry := self.ledger.get(link):
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        response = session.get(link, timeout=http_timeout, headers=headers)
+        if response.status_code == 304:
+            return {'unchanged': True}
+        response.raise_for_status()
+        if response.encoding is None or response.encoding.lower() == 'iso-8859-1':
+            # servers often omit the charset, let requests detect it instead of assuming latin-1
+            response.encoding = response.apparent_encoding
+
+        if self.html_cache:
+            self.html_cache.store(link, kind, response.text)
+        return {'html'         : response.text,
+                'etag'         : response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')}
+
+    def scrape_camera_page(self, driver, link):
+        """
+        Loads a camera datasheet in the browser and extracts its specifications.
+
+        Args:
+            driver (webdriver.Chrome): The driver used to load the page.
+            link (str): Link to the camera datasheet.
+
+        Returns:
+            dict: Page with (brand, model, info) under 'product', see 'build_page_info'.
+        """
+        return self.build_page_info('camera', self.read_datasheet(driver, link, 'camera'))
+
+    def scrape_lens_page(self, driver, link):
+        """
+        Loads a lens datasheet in the browser and extracts its specifications.
+
+        Args:
+            driver (webdriver.Chrome): The driver used to load the page.
+            link (str): Link to the lens datasheet.
+
+        Returns:
+            dict: Page with (brand, model, info) under 'product', see 'build_page_info'.
+        """
+        return self.build_page_info('lens', self.read_datasheet(driver, link, 'lens'))
+
+    def fetch_camera_page(self, session, link):
+        """
+        Downloads a camera datasheet over HTTP and extracts its specifications.
+
+        Args:
+            session (requests.Session): The session used to download the page.
+            link (str): Link to the camera datasheet.
+
+        Returns:
+            dict: Page with (brand, model, info) under 'product', see 'build_page_info'.
+        """
+        return self.build_page_info('camera', self.fetch_datasheet(session, link, 'camera'))
+
+    def fetch_lens_page(self, session, link):
+        """
+        Downloads a lens datasheet over HTTP and extracts its specifications.
+
+        Args:
+            session (requests.Session): The session used to download the page.
+            link (str): Link to the lens datasheet.
+
+        Returns:
+            dict: Page with (brand, model, info) under 'product', see 'build_page_info'.
+        """
+        return self.build_page_info('lens', self.fetch_datasheet(session, link, 'lens'))
+
+    def build_page_info(self, kind, page):
+        """
+        Builds brand, model and info of a fetched page and logs the result.
+
+        Args:
+            kind (str): 'camera' or 'lens'.
+            page (dict): Page as returned by 'read_datasheet' or 'fetch_datasheet'.
+
+        Returns:
+            dict: The page, with (brand, model, info) added under 'product' unless the page is unchanged. The raw
+            'rows' / 'html' are dropped.
+        """
+        if page.get('unchanged'):
+            return page
+
+        rows = page.pop('rows', None)
+        if rows is None:
+            rows = parse_datasheet_html(page.pop('html'))
+            if not rows:
+                raise ValueError("No datasheet found on the page")
+
+        debug = self.progress_log_enabled and self.debug_log_enabled
+        if kind == 'camera':
+            brand, model, info = build_camera_info(rows, debug)
+        else:
+            brand, model, info = build_lens_info(rows, debug)
+
+        if debug:
+            print(UserInteraction.format_print("UPDATE", f"Processed: {brand} {model}"))
+            print(info)
+        elif self.progress_log_enabled:
+            print(UserInteraction.format_print("UPDATE", f"Processed: {brand} {model}"))
+
+        page['product'] = brand, model, info
+        return page
+
+    def wait(self, condition, driver=None):
         """
         Waits for a specified condition to be met.
 
@@ -632,18 +2502,20 @@ class Scrape:
 
         Args:
             condition: The condition to wait for.
+            driver (webdriver.Chrome): The driver to wait on, defaults to 'self.driver'.
 
         Returns:
             The result of WebDriverWait's 'until' method.
         """
-        return WebDriverWait(self.driver, 10).until(condition)
+        return WebDriverWait(driver or self.driver, 10).until(condition)
 
     def transform_column_names(self, column_names):
         """
         Transforms column names to a standardized format.
 
-        This method modifies column names to ensure they are suitable for database storage by replacing spaces and
-        special characters.
+        Legends are looked up in the column mapping (see 'load_column_mapping'), so a legend is only normalized the
+        first time it is seen. This runs on the parse threads of the pipeline as well, it doesn't touch the
+        database; new legends are saved by 'upsert_specs'.
 
         Args:
             column_names (list): List of column names to transform.
@@ -651,71 +2523,88 @@ class Scrape:
         Returns:
             dict: A dictionary mapping original column names to transformed names.
         """
+        column_mapping = self.column_mapping
+        return {ori: column_mapping[ori] if ori in column_mapping else self.map_column_name(ori)
+                for ori in column_names}
 
-        def transform(column_name):
-            """
-            :param column_name:
-            :return:
-            """
-            column_name = unidecode(column_name).replace(' ', '_').replace('(', '').replace(')', '').replace(
-                '.',
-                '_') \
-                .replace('*', '').replace('-', '_').replace(',', '_').replace('/', '_').replace('"', '')
-            # if column_name and column_name[0].isdigit():
-            #     column_name = f"c{column_name}"
-            if self.progress_log_enabled and self.debug_log_enabled:
-                print(UserInteraction.format_print("FORMAT", f"Transformed Column Name, returning: {column_name}"))
-            return column_name
-
-        return {ori: transform(ori) for ori in column_names}
-
-    def add_column_if_not_exists(self, column_name):
+    def map_column_name(self, legend):
         """
-        Adds a new column to the SQLite3 database if it does not already exist.
+        Maps a legend to its column and adds it to the in-memory column mapping.
 
-        This method checks if a specified column exists in the database table and adds it if it does not.
+        A legend whose normalized name only differs in case from an existing column is mapped to that column.
 
         Args:
-            column_name (str): The name of the column to add.
-        """
+            legend (str): The datasheet legend.
 
-        column_name = self.transform_column_names([column_name])[column_name]
+        Returns:
+            str: The column name.
+        """
+        column_name = normalize_column_name(legend)
+        column_name = self.column_keys.get(column_name.lower(), column_name)
+        self.column_mapping[legend] = column_name
+        if self.progress_log_enabled and self.debug_log_enabled:
+            print(UserInteraction.format_print("FORMAT", f"Transformed Column Name, returning: {column_name}"))
+        return column_name
 
-        if not column_name:
-            return
+    def save_column_mapping(self, transformed_columns):
+        """
+        Saves the legends that aren't in the persisted column mapping yet, as part of the current write batch.
 
-        self.c.execute("PRAGMA table_info('camerAarchive')")
-        columns = [tup[1] for tup in self.c.fetchall()]
-        if column_name not in columns:
-            if self.progress_log_enabled:
-                print(UserInteraction.format_print("ADD", f"Adding new Column: {column_name}"))
-            self.c.execute(f"ALTER TABLE camerAarchive ADD COLUMN {column_name} TEXT")
-            self.conn.commit()
+        Args:
+            transformed_columns (dict): Result of 'transform_column_names'.
+        """
+        if new_legends := [(legend, column_name) for legend, column_name in transformed_columns.items()
+                           if legend not in self.saved_legends]:
+            self.c.executemany("INSERT OR REPLACE INTO columnMapping (legend, column_name) VALUES (?, ?)",
+                               new_legends)
+            self.saved_legends.update(legend for legend, column_name in new_legends)
 
-    def lens_add_column_if_not_exists(self, column_name):
+    def add_missing_columns(self, table, column_names):
         """
-        Adds a new column to the lens SQLite3 database if it does not already exist.
+        Adds the columns of a product that don't exist in a table yet.
+
+        Columns are looked up in the schema registry (see 'load_schema'). Schema changes are kept out of the batched
+        upserts: pending upserts are committed first and all new columns of the product are then added in one
+        transaction of their own.
 
-        This method checks if a specified column exists in the lens database table and adds it if it does not.
+        In long-form storage a new column is just a new attribute row (or an attribute new to this kind of
+        product), which is written as part of the batch; the views are rebuilt once the batch is committed.
 
         Args:
-            column_name (str): The name of the column to add.
+            table (str): 'camerAarchive' or 'lensAarchive'.
+            column_names (iterable): Transformed column names of the product.
         """
+        columns = self.schema[table]
+        missing_columns = {column_name.lower(): column_name for column_name in column_names
+                           if column_name and column_name.lower() not in columns}
 
-        column_name = self.transform_column_names([column_name])[column_name]
+        if not missing_columns:
+            return
 
-        if not column_name:
+        if self.storage == "eav":
+            for column_name in missing_columns.values():
+                if column_name.lower() in self.attribute_ids:
+                    continue
+                if self.progress_log_enabled:
+                    print(UserInteraction.format_print("ADD", f"Adding new Attribute: {column_name}"))
+                self.c.execute("INSERT INTO attributes (name) VALUES (?)", (column_name,))
+                self.attribute_ids[column_name.lower()] = self.c.lastrowid
+            columns.update(missing_columns)
+            self.views_outdated = True
             return
 
-        self.c.execute("PRAGMA table_info('lensAarchive')")
-        columns = [tup[1] for tup in self.c.fetchall()]
-        if column_name not in columns:
+        self.flush_writes()
+
+        self.c.execute("BEGIN")
+        for column_name in missing_columns.values():
             if self.progress_log_enabled:
                 print(UserInteraction.format_print("ADD", f"Adding new Column: {column_name}"))
-            self.c.execute(f"ALTER TABLE lensAarchive ADD COLUMN {column_name} TEXT")
-            self.conn.commit()
+            self.c.execute(f"ALTER TABLE {table} ADD COLUMN {column_name} TEXT")
+        self.conn.commit()
+
+        columns.update(missing_columns)
 
-    def insert_product_specs(self, brand, name, specs):
+    def insert_product_specs(self, brand, name, specs, transformed_columns=None):
         """
         Inserts or updates camera specifications in the database.
 
@@ -726,81 +2615,171 @@ class Scrape:
             brand (str): The brand of the camera.
             name (str): The model name of the camera.
             specs (dict): A dictionary of specifications to insert.
+            transformed_columns (dict): Result of 'transform_column_names' for the specs, if already known.
         """
-        transformed_columns = self.transform_column_names(specs.keys())
-        specs = {k: ' '.join(v) if isinstance(v, list) else v for k, v in specs.items() if
-                 transformed_columns.get(k, '').strip()}
+        self.upsert_specs('camerAarchive', brand, name, specs, transformed_columns)
 
-        for ori_key, new_key in transformed_columns.items():
-            if new_key.strip():
-                self.add_column_if_not_exists(new_key)
+    def insert_lens_product_specs(self, brand, name, specs, transformed_columns=None):
+        """
+        Inserts or updates lens specifications in the database.
 
-        placeholder_and_value_pairs = [
-            (col, '?', str(v).strip()) for col, v in zip(transformed_columns.values(), specs.values())
-            if col.strip() and v and str(v).strip()
-        ]
-        columns = ', '.join([col for col, ph, val in placeholder_and_value_pairs])
-        placeholders = ', '.join([ph for col, ph, val in placeholder_and_value_pairs])
-        values = [val for col, ph, val in placeholder_and_value_pairs]
+        This method takes the brand, model name, and specifications of a lens and inserts them into the database,
+        updating existing records if necessary.
+
+        Args:
+            brand (str): The brand of the lens.
+            name (str): The model name of the lens.
+            specs (dict): A dictionary of specifications to insert.
+            transformed_columns (dict): Result of 'transform_column_names' for the specs, if already known.
+        """
+        self.upsert_specs('lensAarchive', brand, name, specs, transformed_columns)
 
-        update_statements = ', '.join([f"{col} = ?" for col, ph, val in placeholder_and_value_pairs])
+    def upsert_specs(self, table, brand, name, specs, transformed_columns=None):
+        """
+        Inserts or updates the specifications of a product as part of the current write batch.
 
-        sql_query = f'''INSERT INTO camerAarchive (brand, model, {columns})
-                        VALUES (?, ?, {placeholders})
-                        ON CONFLICT(model) DO UPDATE SET {update_statements}'''
+        The upsert isn't committed right away, the batch is committed once 'write_batch_size' products are pending
+        (see 'queue_write') and when the scrape ends or is interrupted. In long-form storage the specs go to
+        'upsert_attribute_values' instead. The classes of a camera are written to the cameraClasses mapping in the
+        same batch, and so are the product's full-text search document, its typed specs and the specs that
+        changed in this run (see 'archive_db.write_spec_history').
 
-        combined_values = [brand, name] + 2 * values
+        Args:
+            table (str): 'camerAarchive' or 'lensAarchive'.
+            brand (str): The brand of the product.
+            name (str): The model name of the product.
+            specs (dict): A dictionary of specifications to insert.
+            transformed_columns (dict): Result of 'transform_column_names' for the specs, if already known.
+        """
+        if transformed_columns is None:
+            transformed_columns = self.transform_column_names(specs.keys())
+
+        self.queue_write()
+        self.save_column_mapping(transformed_columns)
+        self.add_missing_columns(table, (new_key for new_key in transformed_columns.values() if new_key.strip()))
+
+        column_values = {}
+        for k, v in specs.items():
+            if transformed_columns[k].strip() and v and str(v).strip():
+                # legends merged into one column keep the first value on the datasheet
+                column_values.setdefault(transformed_columns[k].lower(), (
+                    transformed_columns[k], '?', str(' '.join(v) if isinstance(v, list) else v).strip()))
+        placeholder_and_value_pairs = list(column_values.values())
+
+        if table == 'camerAarchive':
+            for col, ph, val in placeholder_and_value_pairs:
+                if col.lower() == archive_db.camera_class_column.lower():
+                    archive_db.write_camera_classes(self.c, brand, name, val)
+
+        metrics = archive_db.spec_metrics((col, val) for col, ph, val in placeholder_and_value_pairs)
+        archive_db.write_spec_metrics(self.c, archive_db.archive_kinds[table], brand, name, metrics)
+        archive_db.write_spec_history(self.c, archive_db.archive_kinds[table], name, self.run_id,
+                                      [(col, val) for col, ph, val in placeholder_and_value_pairs])
 
         if self.progress_log_enabled:
             print(UserInteraction.format_print("INSERTING", f"Inserting Product Specs for: {brand} {name}"))
 
-        self.c.execute(sql_query, combined_values)
-        self.conn.commit()
+        if self.storage == "eav":
+            self.upsert_attribute_values(table, brand, name,
+                                         [(col, val) for col, ph, val in placeholder_and_value_pairs])
+        else:
+            columns = ''.join([f", {col}" for col, ph, val in placeholder_and_value_pairs])
+            placeholders = ''.join([f", {ph}" for col, ph, val in placeholder_and_value_pairs])
+            values = [val for col, ph, val in placeholder_and_value_pairs]
 
-    def insert_lens_product_specs(self, brand, name, specs):
-        """
-        Inserts or updates lens specifications in the database.
+            update_statements = ', '.join(['brand = excluded.brand'] +
+                                          [f"{col} = excluded.{col}" for col, ph, val in placeholder_and_value_pairs])
 
-        This method takes the brand, model name, and specifications of a lens and inserts them into the database,
-        updating existing records if necessary.
+            sql_query = f'''INSERT INTO {table} (brand, model{columns})
+                            VALUES (?, ?{placeholders})
+                            ON CONFLICT(model) DO UPDATE SET {update_statements}'''
 
-        Args:
-            brand (str): The brand of the lens.
-            name (str): The model name of the lens.
-            specs (dict): A dictionary of specifications to insert.
+            self.c.execute(sql_query, [brand, name] + values)
+
+        archive_db.index_product(self.c, archive_db.archive_kinds[table], name)
+
+    def upsert_attribute_values(self, table, brand, name, column_values):
         """
-        transformed_columns = self.transform_column_names(specs.keys())
-        specs = {k: ' '.join(v) if isinstance(v, list) else v for k, v in specs.items() if
-                 transformed_columns.get(k, '').strip()}
+        Inserts or updates a product and its specs in the long-form tables, as part of the current write batch.
 
-        for ori_key, new_key in transformed_columns.items():
-            if new_key.strip():
-                self.lens_add_column_if_not_exists(new_key)
+        Args:
+            table (str): 'camerAarchive' or 'lensAarchive', i.e. the kind of product.
+            brand (str): The brand of the product.
+            name (str): The model name of the product.
+            column_values (list): (transformed column name, value) pairs, all of them registered attributes.
+        """
+        kind = archive_db.archive_kinds[table]
 
-        placeholder_and_value_pairs = [
-            (col, '?', str(v).strip()) for col, v in zip(transformed_columns.values(), specs.values())
-            if col.strip() and v and str(v).strip()
-        ]
-        columns = ', '.join([col for col, ph, val in placeholder_and_value_pairs])
-        placeholders = ', '.join([ph for col, ph, val in placeholder_and_value_pairs])
-        values = [val for col, ph, val in placeholder_and_value_pairs]
+        self.c.execute("""INSERT INTO products (kind, brand, model) VALUES (?, ?, ?)
+                          ON CONFLICT(kind, model) DO UPDATE SET brand = excluded.brand""", (kind, brand, name))
+        self.c.execute("SELECT product_id FROM products WHERE kind = ? AND model = ?", (kind, name))
+        product_id = self.c.fetchone()[0]
 
-        update_statements = ', '.join([f"{col} = ?" for col, ph, val in placeholder_and_value_pairs])
+        self.c.executemany("""INSERT INTO product_attribute_values (product_id, attribute_id, value) VALUES (?, ?, ?)
+                              ON CONFLICT(product_id, attribute_id) DO UPDATE SET value = excluded.value""",
+                           [(product_id, self.attribute_ids[column.lower()], value)
+                            for column, value in column_values])
 
-        sql_query = f'''INSERT INTO lensAarchive (brand, model, {columns})
-                        VALUES (?, ?, {placeholders})
-                        ON CONFLICT(model) DO UPDATE SET {update_statements}'''
+    def queue_write(self):
+        """
+        Counts a product towards the current write batch, committing the batch first if it is full.
 
-        combined_values = [brand, name] + 2 * values
+        Committing before rather than after the product keeps everything written for it (specs and ledger entry)
+        in the same transaction.
+        """
+        if self.pending_writes >= write_batch_size:
+            self.flush_writes()
+        self.pending_writes += 1
 
-        if self.progress_log_enabled:
-            print(UserInteraction.format_print("INSERTING", f"Inserting Product Specs for: {brand} {name}"))
+    def flush_writes(self):
+        """
+        Commits all pending upserts in one transaction.
 
-        self.c.execute(sql_query, combined_values)
-        self.conn.commit()
+        In long-form storage the wide views are rebuilt afterwards if the batch brought new attributes along.
+        """
+        if self.conn.in_transaction:
+            self.conn.commit()
+        if self.views_outdated:
+            self.c.execute("BEGIN")
+            archive_db.rebuild_wide_views(self.conn)
+            self.conn.commit()
+            self.views_outdated = False
+        if self.pending_writes and self.progress_log_enabled and self.debug_log_enabled:
+            print(UserInteraction.format_print("COMMIT", f"Committed {self.pending_writes} Products"))
+        self.pending_writes = 0
 
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()
+
+    arg_parser = argparse.ArgumentParser(description="Scrapes digitalkamera.de into CamerAarchive.db")
+    arg_parser.add_argument('--rebuild-from-cache', action='store_true',
+                            help="re-parse and re-insert the archive from the HTML cache, without a browser")
+    arg_parser.add_argument('--brands', nargs='+', choices=available_brands,
+                            help="scrape these brands without asking (non-interactive mode)")
+    arg_parser.add_argument('--lenses', action='store_true', help="scrape lenses as well")
+    arg_parser.add_argument('--skip-cameras', action='store_true', help="scrape lenses only")
+    arg_parser.add_argument('--show-browser', action='store_true', help="don't run the browser headless")
+    arg_parser.add_argument('--log', choices=['none', 'progress', 'debug'], default='progress',
+                            help="console output")
+    arg_parser.add_argument('--shards', action='store_true',
+                            help="scrape every brand in its own process and shard database, then merge them")
+    args = arg_parser.parse_args()
+
+    if args.shards and not args.brands:
+        arg_parser.error("--shards needs the brands to scrape, pass them with --brands")
+
     scrape = Scrape()
-    scrape.main()
+    if args.rebuild_from_cache:
+        scrape.rebuild_from_cache()
+    elif args.brands:
+        scrape.configure(args.brands, scrape_lenses=args.lenses or args.skip_cameras, headless=not args.show_browser,
+                         skip_cameras=args.skip_cameras, progress_log=args.log != 'none',
+                         debug_log=args.log == 'debug')
+        if args.shards:
+            scrape.run_sharded()
+        else:
+            scrape.run()
+    else:
+        scrape.main()
     time.sleep(2)
@@ -0,0 +1,89 @@
+"""
+table model showing the specs of the selected products
+rows are read from the database a chunk at a time while the view scrolls, instead of being loaded up front
+"""
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+# Adjustable Variables
+chunk_rows = 200  # spec rows fetched from the database whenever the view needs more
+headers = ("Produkt", "Eigenschaft", "Wert")  # column titles
+
+
+class SpecTableModel(QAbstractTableModel):
+    """
+    Lists the non-empty specs of the selected products, one row per product and spec.
+
+    The specs come from 'ArchiveRepository.spec_rows'. The view asks for more rows via 'canFetchMore' and
+    'fetchMore' as it scrolls towards the end, so only the rows scrolled to so far are ever fetched, whether it
+    shows one camera with hundreds of specs or thousands of lenses. Every chunk is a query of its own, in between
+    the model only keeps the key of its last row, no connection.
+
+    Methods:
+        show_products(kind, models): Replaces the listed products.
+        clear(): Lists nothing.
+    """
+
+    def __init__(self, repository, parent=None):
+        """
+        Initializes the model without any products.
+
+        Args:
+            repository (ArchiveRepository): Repository the specs are read from.
+            parent (QObject): Qt parent of the model.
+        """
+        super().__init__(parent)
+        self.repository = repository
+        self.rows = []
+        self.kind = None
+        self.models = []
+        # key of the last fetched row, see 'ArchiveRepository.spec_rows'
+        self.after = None
+        self.more = False
+
+    def show_products(self, kind, models):
+        """
+        Replaces the listed products, the view fetches their first rows right away.
+
+        Args:
+            kind (str): 'camera' or 'lens'.
+            models (list): The model names.
+        """
+        self.beginResetModel()
+        self.rows = []
+        self.kind = kind
+        self.models = sorted(set(models))
+        self.after = None
+        self.more = bool(self.models)
+        self.endResetModel()
+
+    def clear(self):
+        self.show_products(None, [])
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(headers)
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role not in (Qt.ItemDataRole.DisplayRole, Qt.ItemDataRole.ToolTipRole):
+            return None
+        return str(self.rows[index.row()][index.column()])
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return headers[section]
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.more
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or not self.more:
+            return
+        chunk, self.after = self.repository.spec_rows(self.kind, self.models, self.after, chunk_rows)
+        self.more = self.after is not None
+        if chunk:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(chunk) - 1)
+            self.rows.extend(chunk)
+            self.endInsertRows()
@@ -0,0 +1,20 @@
+import os
+import sys
+
+import pytest
+
+# the modules live at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import scrape  # noqa: E402
+
+
+@pytest.fixture
+def scraper(tmp_path):
+    """
+    A quiet Scrape on a temporary database, without a browser.
+    """
+    instance = scrape.Scrape(str(tmp_path / 'archive.db'))
+    instance.configure(['Sony'], progress_log=False)
+    instance.driver = None
+    return instance
@@ -0,0 +1,60 @@
+import pytest
+
+import archive_db
+from archive_repository import ArchiveRepository
+
+
+def write_archive(path, eav):
+    """
+    Writes a small camera archive with one product of 300 specs, one without specs and a few ordinary ones.
+    """
+    conn = archive_db.connect(str(path))
+    columns = [f"Spec_{index}" for index in range(300)]
+    conn.execute(f"CREATE TABLE camerAarchive (model TEXT PRIMARY KEY, brand TEXT, "
+                 f"{', '.join(column + ' TEXT' for column in columns)})")
+    conn.execute("CREATE TABLE lensAarchive (model TEXT PRIMARY KEY, brand TEXT)")
+    conn.execute(f"INSERT INTO camerAarchive (model, brand, {', '.join(columns)}) VALUES (?, ?, "
+                 f"{', '.join('?' * len(columns))})", ('Alpha 1', 'Sony', *(str(index) for index in range(300))))
+    conn.execute("INSERT INTO camerAarchive (model, brand) VALUES ('Empty', 'Sony')")
+    for index in range(5):
+        conn.execute("INSERT INTO camerAarchive (model, brand, Spec_0, Spec_7) VALUES (?, 'Nikon', ?, ?)",
+                     (f"Z {index}", f"a{index}", f"b{index}"))
+    if eav:
+        archive_db.create_eav_tables(conn)
+        archive_db.migrate_wide_to_eav(conn)
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture(params=[False, True], ids=['wide', 'eav'])
+def repository(tmp_path, request):
+    path = tmp_path / 'archive.db'
+    write_archive(path, request.param)
+    repository = ArchiveRepository(str(path))
+    yield repository
+    repository.close()
+
+
+def all_rows(repository, models, limit):
+    rows, after = [], None
+    while True:
+        chunk, after = repository.spec_rows('camera', models, after, limit)
+        assert len(chunk) <= limit
+        rows.extend(chunk)
+        if after is None:
+            return rows
+
+
+@pytest.mark.parametrize('limit', [1, 2, 7, 200, 1000])
+def test_spec_rows_pages_through_every_spec(repository, limit):
+    models = sorted(['Alpha 1', 'Empty', 'Missing'] + [f"Z {index}" for index in range(5)])
+    expected = [(model, spec, value) for model in models
+                for spec, value in repository.product_specs('camera', model).items() if spec != 'model']
+
+    assert all_rows(repository, models, limit) == expected
+
+
+def test_spec_rows_returns_the_connection(repository):
+    repository.spec_rows('camera', ['Alpha 1'], None, 10)
+
+    assert repository.pool.qsize() == repository.opened
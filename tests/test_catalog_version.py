@@ -0,0 +1,50 @@
+import pytest
+
+import archive_catalog
+import archive_db
+import scrape
+
+
+@pytest.fixture(params=['wide', 'eav'])
+def archive(tmp_path, request):
+    instance = scrape.Scrape(str(tmp_path / 'archive.db'), request.param)
+    instance.configure(['Sony'], progress_log=False)
+    instance.setup_db()
+    instance.start_run(['Sony'])
+    yield instance
+    instance.conn.close()
+
+
+def write(archive, model, specs):
+    archive.insert_product_specs('Sony', model, specs)
+    archive.flush_writes()
+    return archive_db.catalog_version(archive.conn)
+
+
+def test_version_follows_catalog_changes(archive):
+    version = archive_db.catalog_version(archive.conn)
+    specs = {'Kameraklassen': 'Spiegellos, Vollformat', 'Gewicht': '737 g'}
+
+    assert write(archive, 'Alpha 1', specs) > version
+    version = archive_db.catalog_version(archive.conn)
+
+    # rescraping the same camera, or specs outside the catalog changing, keep the version
+    assert write(archive, 'Alpha 1', specs) == version
+    assert write(archive, 'Alpha 1', {**specs, 'Gewicht': '740 g'}) == version
+    assert write(archive, 'Alpha 1', {**specs, 'Kameraklassen': 'Vollformat, Spiegellos'}) == version
+
+    # dropping a class changes the catalog
+    assert write(archive, 'Alpha 1', {**specs, 'Kameraklassen': 'Vollformat'}) > version
+
+
+def test_outdated_snapshot_is_ignored(archive, tmp_path):
+    write(archive, 'Alpha 1', {'Kameraklassen': 'Spiegellos'})
+    path = str(tmp_path / 'catalog.bin')
+    archive_catalog.Catalog.load(archive.conn).save(path)
+
+    catalog = archive_catalog.Catalog.open_snapshot(path, archive_db.catalog_version(archive.conn))
+    assert catalog is not None
+    assert catalog.classes('Sony') == ['Spiegellos']
+
+    write(archive, 'Alpha 7 IV', {'Kameraklassen': 'Spiegellos'})
+    assert archive_catalog.Catalog.open_snapshot(path, archive_db.catalog_version(archive.conn)) is None
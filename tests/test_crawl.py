@@ -0,0 +1,45 @@
+import asyncio
+import sqlite3
+
+import pytest
+
+import scrape
+
+
+def fail_store(*args):
+    raise sqlite3.OperationalError("database is locked")
+
+
+@pytest.fixture
+def crawl_jobs(scraper, monkeypatch):
+    """
+    50 jobs for clients that load every page at once and a writer that always fails.
+    """
+    monkeypatch.setattr(scrape, 'write_queue_size', 5)
+    monkeypatch.setattr(scrape, 'host_rate_limit', 10000.0)
+    monkeypatch.setattr(scrape, 'host_burst', 10000)
+    scraper.setup_pool_client = lambda cookies: object()
+    scraper.revive_pool_client = lambda client, cookies: client
+    scraper.close_pool_client = lambda client: None
+    scraper.store_page = fail_store
+    return [('camera', f"https://example.com/{index}") for index in range(50)]
+
+
+def test_async_writer_failure_stops_the_crawl(scraper, crawl_jobs):
+    scraper.page_function = lambda kind: lambda client, link: {'product': ('Sony', link, {})}
+
+    with pytest.raises(sqlite3.OperationalError):
+        asyncio.run(asyncio.wait_for(scraper.crawl_async(crawl_jobs), timeout=10))
+
+
+def test_pipeline_writer_failure_stops_the_crawl(scraper, crawl_jobs, monkeypatch):
+    monkeypatch.setattr(scrape, 'pipeline_queue_size', 5)
+    monkeypatch.setattr(scrape, 'pool_size', 4)
+    scraper.read_datasheet = lambda client, link, kind: {'rows': []}
+    scraper.build_page_info = lambda kind, page: {'product': ('Sony', 'Alpha 1', {})}
+    scraper.transform_column_names = lambda column_names: {}
+
+    with pytest.raises(sqlite3.OperationalError):
+        scraper.run_pipeline(crawl_jobs)
+    assert scraper.pipeline_queues['parse'].empty()
+    assert scraper.pipeline_queues['write'].empty()
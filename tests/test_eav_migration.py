@@ -0,0 +1,65 @@
+import sqlite3
+
+import archive_db
+import scrape
+
+
+def write_wide_tables(conn):
+    conn.execute('CREATE TABLE camerAarchive (brand TEXT, model TEXT PRIMARY KEY, Sensor TEXT, "Gewicht (g)" TEXT, '
+                 'Bildstabilisator TEXT)')
+    conn.execute("CREATE TABLE lensAarchive (brand TEXT, model TEXT PRIMARY KEY, Brennweite TEXT)")
+    conn.executemany("INSERT INTO camerAarchive VALUES (?, ?, ?, ?, ?)",
+                     [('Sony', 'Alpha 1', 'CMOS', '737', 'ja'),
+                      ('Nikon', 'Z 9', 'CMOS', '', None),
+                      ('Nikon', 'Empty', None, None, None)])
+    conn.execute("INSERT INTO lensAarchive VALUES ('Sony', 'FE 24-70 mm', '24-70 mm')")
+
+
+def product_specs(conn, table):
+    """
+    Returns the non-empty specs of every product of a table or view, by model.
+    """
+    cursor = conn.execute(f"SELECT * FROM {table}")
+    names = [description[0] for description in cursor.description]
+    return {row[names.index('model')]: {name: value for name, value in zip(names, row) if value not in (None, '')}
+            for row in cursor}
+
+
+def test_migration_keeps_every_spec():
+    conn = sqlite3.connect(':memory:')
+    write_wide_tables(conn)
+    expected = {table: product_specs(conn, table) for table in archive_db.archive_tables.values()}
+
+    archive_db.create_eav_tables(conn)
+    archive_db.migrate_wide_to_eav(conn)
+
+    assert archive_db.is_eav(conn)
+    assert all(archive_db.object_type(conn, table) == 'view' for table in archive_db.archive_tables.values())
+    assert {table: product_specs(conn, table) for table in archive_db.archive_tables.values()} == expected
+    # empty strings aren't stored as values
+    assert conn.execute("SELECT COUNT(*) FROM product_attribute_values").fetchone()[0] == 5
+    assert sorted(archive_db.products_by_attribute(conn, 'camera', 'Sensor', 'CMOS')) == [
+        ('Nikon', 'Z 9', 'CMOS'), ('Sony', 'Alpha 1', 'CMOS')]
+
+
+def test_setup_db_migrates_a_wide_archive(tmp_path):
+    path = str(tmp_path / 'archive.db')
+    conn = archive_db.connect(path)
+    write_wide_tables(conn)
+    conn.commit()
+    expected = product_specs(conn, 'camerAarchive')
+    conn.close()
+
+    instance = scrape.Scrape(path, 'eav')
+    instance.configure(['Sony'], progress_log=False)
+    instance.setup_db()
+    assert product_specs(instance.conn, 'camerAarchive') == expected
+    instance.conn.close()
+
+    # an archive in long-form storage stays in it
+    instance = scrape.Scrape(path, 'wide')
+    instance.configure(['Sony'], progress_log=False)
+    instance.setup_db()
+    assert instance.storage == 'eav'
+    assert product_specs(instance.conn, 'camerAarchive') == expected
+    instance.conn.close()
@@ -0,0 +1,62 @@
+import os
+import sqlite3
+
+import scrape
+
+
+class FailingCommit:
+    """
+    Passes everything on to a connection, except that committing fails.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+    def commit(self):
+        raise sqlite3.OperationalError("database is locked")
+
+
+def cached_files(directory):
+    return [name for _, _, names in os.walk(directory / 'objects') for name in names]
+
+
+def test_store_and_load(tmp_path):
+    cache = scrape.HtmlCache(str(tmp_path), 1024 * 1024)
+    cache.store('https://example.com/a', 'camera', '<html>a</html>')
+    cache.store('https://example.com/b', 'camera', '<html>a</html>')
+
+    assert cache.load('https://example.com/a') == '<html>a</html>'
+    assert cache.load('https://example.com/missing') is None
+    assert len(cached_files(tmp_path)) == 1
+    cache.close()
+
+
+def test_failed_commit_leaves_no_file(tmp_path):
+    cache = scrape.HtmlCache(str(tmp_path), 1024 * 1024)
+    conn = cache.conn
+    cache.conn = FailingCommit(conn)
+    cache.store('https://example.com/a', 'camera', '<html>a</html>')
+
+    assert cached_files(tmp_path) == []
+    assert conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0] == 0
+
+    # stored normally once committing works again
+    cache.conn = conn
+    cache.store('https://example.com/a', 'camera', '<html>a</html>')
+    assert cache.load('https://example.com/a') == '<html>a</html>'
+    cache.close()
+
+
+def test_eviction_keeps_the_size_limit(tmp_path):
+    cache = scrape.HtmlCache(str(tmp_path), 2000)
+    for index in range(50):
+        cache.store(f"https://example.com/{index}", 'camera', os.urandom(400).hex())
+
+    total = cache.conn.execute("SELECT SUM(size) FROM blobs").fetchone()[0]
+    assert total <= 2000
+    assert len(cached_files(tmp_path)) == cache.conn.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+    assert cache.load('https://example.com/49') is not None
+    cache.close()
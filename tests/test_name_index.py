@@ -0,0 +1,59 @@
+import pytest
+
+import name_index
+from name_index import NameIndex
+
+entries = [('camera', 'Sony', 'Alpha 7R IV'), ('camera', 'Sony', 'Alpha 7 IV'), ('camera', 'Sony', 'Alpha 1'),
+           ('camera', 'Nikon', 'Z 9'), ('camera', 'Canon', 'EOS R5'),
+           ('lens', 'Sony', 'FE 24-70 mm F2.8 GM II')]
+
+
+@pytest.fixture
+def index():
+    return NameIndex(entries)
+
+
+@pytest.mark.parametrize('query', ['Alpha 7R', 'alpha7r', 'a7riv', 'A7R IV', '7riv', 'sony alpha 7r'])
+def test_prefixes_and_abbreviations(index, query):
+    assert index.search(query)[0] == ('camera', 'Sony', 'Alpha 7R IV')
+
+
+@pytest.mark.parametrize('query, expected', [('Alpah 7R IV', ('camera', 'Sony', 'Alpha 7R IV')),
+                                             ('EOS R6', ('camera', 'Canon', 'EOS R5')),
+                                             ('FE 24-70 F2.8 GM', ('lens', 'Sony', 'FE 24-70 mm F2.8 GM II'))])
+def test_typos(index, query, expected):
+    assert index.search(query)[0] == expected
+
+
+def test_exact_match_ranks_first(index):
+    assert index.search('Alpha 7 IV')[0] == ('camera', 'Sony', 'Alpha 7 IV')
+
+
+def test_unrelated_query_finds_nothing(index):
+    assert index.search('Hasselblad') == []
+    assert index.search(' - ') == []
+
+
+def test_add_and_remove(index, monkeypatch):
+    # compaction is covered separately
+    monkeypatch.setattr(name_index, 'compaction_ratio', 1.0)
+    index.remove('camera', 'Alpha 7R IV')
+    assert ('camera', 'Sony', 'Alpha 7R IV') not in index.search('a7riv')
+
+    index.add('camera', 'Sony', 'Alpha 7R V')
+    assert index.search('a7rv')[0] == ('camera', 'Sony', 'Alpha 7R V')
+    # adding a product again replaces it
+    index.add('camera', 'Sony', 'Alpha 7R V')
+    assert index.search('a7rv').count(('camera', 'Sony', 'Alpha 7R V')) == 1
+
+
+def test_compaction_keeps_the_remaining_products(index):
+    for kind, brand, model in entries[:3]:
+        index.remove(kind, model)
+
+    # the index was rebuilt without the removed products, at most 'compaction_ratio' of it are empty slots
+    assert len(index.entries) < len(entries)
+    assert index.entries.count(None) == index.removed <= name_index.compaction_ratio * len(index.entries)
+    assert index.search('Alpha') == []
+    assert index.search('Z9') == [('camera', 'Nikon', 'Z 9')]
+    assert index.search('EOS R6')[0] == ('camera', 'Canon', 'EOS R5')
@@ -0,0 +1,66 @@
+import os
+
+import pytest
+
+import archive_db
+import scrape
+
+
+def open_scrape(path, storage, brand):
+    """
+    A quiet Scrape on 'path' with its database set up, without a browser.
+    """
+    instance = scrape.Scrape(str(path), storage)
+    instance.configure([brand], progress_log=False)
+    instance.driver = None
+    instance.setup_db()
+    return instance
+
+
+def camera_specs(instance, model):
+    instance.c.execute("SELECT * FROM camerAarchive WHERE model = ?", (model,))
+    row = instance.c.fetchone()
+    return {description[0]: value for description, value in zip(instance.c.description, row)
+            if value is not None}
+
+
+@pytest.fixture(params=['wide', 'eav'])
+def archive(tmp_path, request):
+    instance = open_scrape(tmp_path / 'archive.db', request.param, 'Sony')
+    instance.start_run(['Sony', 'Nikon'])
+    instance.insert_product_specs('Sony', 'Alpha 1', {'Sensor': 'CMOS', 'Gewicht': '737 g'})
+    instance.flush_writes()
+    yield instance
+    instance.conn.close()
+
+
+def write_shard(archive, brand, products):
+    path = scrape.shard_path(archive.db_path, brand)
+    shard = open_scrape(path, archive.storage, brand)
+    shard.seed_ledger(archive.db_path)
+    shard.join_run(archive.run_id)
+    for model, specs in products.items():
+        shard.store_page('camera', f"https://example.org/{model}", {'product': (brand, model, specs)},
+                         shard.insert_product_specs)
+    shard.flush_writes()
+    shard.conn.close()
+    return path
+
+
+def test_merge_shards(archive):
+    paths = [write_shard(archive, 'Sony', {'Alpha 1': {'Sensor': 'Stacked CMOS'}}),
+             write_shard(archive, 'Nikon', {'Z 9': {'Sensor': 'CMOS', 'Bildstabilisator': 'ja'}})]
+
+    archive.merge_shards(paths)
+
+    # a spec missing from the shard keeps the archive's value
+    assert camera_specs(archive, 'Alpha 1') == {'model': 'Alpha 1', 'brand': 'Sony', 'Sensor': 'Stacked CMOS',
+                                                'Gewicht': '737 g'}
+    # a column only the shard had is added to the archive
+    assert camera_specs(archive, 'Z 9') == {'model': 'Z 9', 'brand': 'Nikon', 'Sensor': 'CMOS',
+                                            'Bildstabilisator': 'ja'}
+    archive.c.execute("SELECT url FROM scrapeLedger ORDER BY url")
+    assert archive.c.fetchall() == [('https://example.org/Alpha 1',), ('https://example.org/Z 9',)]
+    # the derived tables are rebuilt from the merged specs
+    assert archive_db.search(archive.conn, 'Stacked') == [('camera', 'Sony', 'Alpha 1')]
+    assert not any(os.path.exists(path) for path in paths)
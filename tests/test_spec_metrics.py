@@ -0,0 +1,31 @@
+import pytest
+
+import archive_db
+
+
+def test_minimum_aperture_never_counts_as_maximum():
+    metrics = archive_db.spec_metrics([('Kleinste_Blende', 'F22'), ('Lichtstarke', 'F2,8'), ('Blendenlamellen', '9')])
+
+    assert metrics['aperture'] == 2.8
+
+
+def test_only_a_minimum_aperture_gives_no_aperture():
+    assert 'aperture' not in archive_db.spec_metrics([('Kleinste_Blende', 'F22')])
+
+
+@pytest.mark.parametrize('column', ['Bildstabilisator_ISO_Vergleich', 'Isolierung', 'Video_Empfindlichkeit'])
+def test_iso_only_from_iso_legends(column):
+    assert 'iso_min' not in archive_db.spec_metrics([(column, '100 bis 6400')])
+
+
+def test_iso_legends():
+    metrics = archive_db.spec_metrics([('ISO_Empfindlichkeit', 'ISO 100 bis 51.200 (erweiterbar auf ISO 50)')])
+
+    assert (metrics['iso_min'], metrics['iso_max']) == (50, 51200)
+
+
+def test_video_resolution_is_not_the_sensor_resolution():
+    metrics = archive_db.spec_metrics([('Videoaufloesung', '8,3 MP'),
+                                       ('Sensor', 'CMOS 25,3 Megapixel (gesamt), 24,2 Megapixel (effektiv)')])
+
+    assert metrics['resolution_mp'] == 24.2